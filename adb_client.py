@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Native ADB host protocol client
+Talks to the adb server (localhost:5037 by default) directly over a socket
+instead of forking the adb client binary for every command
+"""
+
+import asyncio
+import os
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = int(os.environ.get('ANDROID_ADB_SERVER_PORT', '5037'))
+
+# Device commands run with this service prefix (no PTY, exit status reported)
+SHELL_SERVICE = 'shell,v2,raw:'
+
+# ``shell,v2`` packet ids (adb's shell_protocol.h)
+SHELL_STDOUT = 1
+SHELL_EXIT = 3
+
+
+class AdbError(Exception):
+    """The adb server answered a request with FAIL"""
+
+
+class ShellProtocolReader:
+    """stdout of a ``shell,v2`` service
+
+    The service multiplexes stdout, stderr and the exit status into
+    ``<id:1><length:4 little-endian><data>`` packets. Packets are decoded
+    as ``read`` asks for data, so a slow reader holds the device back as a
+    plain stream would; stderr is dropped. ``exit_status`` is set by the
+    exit packet, or to 255 when the connection closes without one.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader):
+        self._reader = reader
+        self._pending = b''
+        self._eof = False
+        self.exit_status = None
+
+    def at_eof(self) -> bool:
+        return self._eof and not self._pending
+
+    async def read(self, n: int = -1) -> bytes:
+        """Up to ``n`` bytes of stdout (all of it when ``n`` is negative); b'' at the end"""
+        if n < 0:
+            chunks = []
+            while True:
+                chunk = await self.read(65536)
+                if not chunk:
+                    return b''.join(chunks)
+                chunks.append(chunk)
+        while not self._pending and not self._eof:
+            await self._next_packet()
+        data, self._pending = self._pending[:n], self._pending[n:]
+        return data
+
+    async def _next_packet(self) -> None:
+        try:
+            header = await self._reader.readexactly(5)
+            data = await self._reader.readexactly(int.from_bytes(header[1:], 'little'))
+        except asyncio.IncompleteReadError:
+            self._eof = True
+            self.exit_status = 255
+            return
+        if header[0] == SHELL_STDOUT:
+            self._pending = data
+        elif header[0] == SHELL_EXIT:
+            self._eof = True
+            self.exit_status = data[0] if data else 255
+
+
+class AdbServiceProcess:
+    """Process-like view of one adb service connection
+
+    Mirrors the parts of ``asyncio.subprocess.Process`` that the tool uses
+    (``stdout``, ``returncode``, ``wait()``, ``kill()`` and ``communicate()``)
+    so callers can treat a socket stream and a child process the same way.
+    For a ``shell,v2`` service ``stdout`` is a ``ShellProtocolReader`` and
+    ``returncode`` is the command's exit status; other services carry no
+    status, so a stream that ends normally reports 0.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: Optional[asyncio.StreamWriter] = None,
+                 returncode: Optional[int] = None,
+                 on_close: Optional[Callable[[], None]] = None):
+        self.stdout = reader
+        self.returncode = returncode
+        self._writer = writer
+        self._on_close = on_close
+
+    @classmethod
+    def from_bytes(cls, data: bytes, returncode: int = 0) -> 'AdbServiceProcess':
+        """Wrap an already-received response"""
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return cls(reader, returncode=returncode)
+
+    async def wait(self) -> int:
+        """Drain the stream until the server closes it"""
+        if self.returncode is None:
+            while await self.stdout.read(65536):
+                pass
+            self.returncode = getattr(self.stdout, 'exit_status', None) or 0
+            self._close()
+        return self.returncode
+
+    async def communicate(self) -> Tuple[bytes, None]:
+        """Read the whole stream"""
+        data = await self.stdout.read()
+        await self.wait()
+        return data, None
+
+    def kill(self) -> None:
+        """Abort the service by closing the connection"""
+        if self.returncode is None:
+            self.returncode = -9
+        self._close()
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            if self._on_close is not None:
+                self._on_close()
+
+
+class AdbClient:
+    """Client for the adb server's host protocol
+
+    Every adb service consumes the connection it is requested on, so the
+    pool keeps up to ``pool_size`` connected spare sockets ready for the
+    next request and caps simultaneous connections at ``max_connections``.
+    Spares are tied to the event loop that opened them and are dropped
+    when a different loop uses the client.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 pool_size: int = 2, max_connections: int = 16,
+                 timeout: float = 10):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._loop = None
+        self._idle = []
+        self._slots = None
+        self._refills = set()
+        self._features = {}
+
+    @classmethod
+    def from_address(cls, address: str, **kwargs) -> 'AdbClient':
+        """Create a client from a ``host:port`` (or bare ``host``) string"""
+        host, _, port = address.rpartition(':')
+        if not host:
+            return cls(host=port or DEFAULT_HOST, **kwargs)
+        return cls(host=host, port=int(port), **kwargs)
+
+    def _bind_loop(self) -> None:
+        """Reset per-loop state when called from a new event loop"""
+        loop = asyncio.get_event_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._idle = []
+            self._refills = set()
+            self._slots = asyncio.Semaphore(self.max_connections)
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        return await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Take a spare connection from the pool, or open a new one"""
+        self._bind_loop()
+        connection = None
+        while self._idle and connection is None:
+            reader, writer = self._idle.pop()
+            if reader.at_eof() or writer.is_closing():
+                writer.close()
+            else:
+                connection = reader, writer
+        if connection is None:
+            connection = await self._open()
+        if len(self._idle) + len(self._refills) < self.pool_size:
+            task = asyncio.ensure_future(self._refill())
+            self._refills.add(task)
+            task.add_done_callback(self._refills.discard)
+        return connection
+
+    async def _refill(self) -> None:
+        try:
+            self._idle.append(await self._open())
+        except (OSError, asyncio.TimeoutError):
+            pass
+
+    async def close(self) -> None:
+        """Close spare connections held by the pool"""
+        for task in list(self._refills):
+            task.cancel()
+        if self._refills:
+            await asyncio.gather(*self._refills, return_exceptions=True)
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+        self._refills = set()
+
+    @staticmethod
+    async def _send(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                    service: str) -> None:
+        """Send one request and check the OKAY/FAIL status"""
+        payload = service.encode('utf-8')
+        writer.write(b'%04x' % len(payload) + payload)
+        await writer.drain()
+        status = await reader.readexactly(4)
+        if status == b'OKAY':
+            return
+        if status == b'FAIL':
+            raise AdbError((await AdbClient._read_block(reader)).decode('utf-8', 'replace'))
+        raise AdbError(f'Unexpected adb server response: {status!r}')
+
+    @staticmethod
+    async def _read_block(reader: asyncio.StreamReader) -> bytes:
+        """Read a hex-length-prefixed block"""
+        length = int(await reader.readexactly(4), 16)
+        return await reader.readexactly(length)
+
+    async def query(self, service: str) -> bytes:
+        """Run a ``host:`` query (``host:version``, ``host:devices-l``, ...)
+        that answers with a single length-prefixed block"""
+        self._bind_loop()
+        async with self._slots:
+            reader, writer = await self._connect()
+            try:
+                await asyncio.wait_for(self._send(reader, writer, service), self.timeout)
+                return await asyncio.wait_for(self._read_block(reader), self.timeout)
+            finally:
+                writer.close()
+
+    async def version(self) -> int:
+        """Return the adb server's protocol version"""
+        return int(await self.query('host:version'), 16)
+
+    async def devices(self) -> List[Dict[str, str]]:
+        """List devices via ``host:devices-l``"""
+        return parse_device_list(await self.query('host:devices-l'))
+
+    async def open_service(self, serial: Optional[str], service: str) -> AdbServiceProcess:
+        """Open a device service (``shell:``, ``exec:``, ...) as a stream
+
+        ``serial`` selects the device with ``host:transport:<serial>``; with
+        no serial the server's single attached device is used. Raises
+        ``OSError`` when the server is unreachable and ``AdbError`` when it
+        refuses the request.
+        """
+        transport = f'host:transport:{serial}' if serial else 'host:transport-any'
+        return await self._open_stream([transport, service])
+
+    async def features(self, serial: Optional[str]) -> List[str]:
+        """Features the device's adbd supports (``shell_v2``, ...), cached per serial"""
+        if serial not in self._features:
+            service = f'host-serial:{serial}:features' if serial else 'host:features'
+            data = await self.query(service)
+            self._features[serial] = data.decode('utf-8', 'replace').strip().split(',')
+        return self._features[serial]
+
+    async def open_shell(self, serial: Optional[str], command: str) -> Optional[AdbServiceProcess]:
+        """Run ``command`` with the ``shell,v2`` service, which reports its exit status
+
+        Returns None when the device has no ``shell_v2`` (Android 6 and
+        older), whose services cannot tell a failed command from a
+        successful one. Raises like ``open_service``.
+        """
+        if 'shell_v2' not in await self.features(serial):
+            return None
+        process = await self.open_service(serial, SHELL_SERVICE + command)
+        process.stdout = ShellProtocolReader(process.stdout)
+        return process
+
+    async def open_host_service(self, service: str) -> AdbServiceProcess:
+        """Open a streaming ``host:`` service such as ``host:track-devices``"""
+        return await self._open_stream([service])
+
+    async def _open_stream(self, services: List[str]) -> AdbServiceProcess:
+        """Send ``services`` in order on one connection and hand it over as a stream"""
+        self._bind_loop()
+        await self._slots.acquire()
+        try:
+            reader, writer = await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+        try:
+            for service in services:
+                await asyncio.wait_for(self._send(reader, writer, service), self.timeout)
+        except BaseException:
+            writer.close()
+            self._slots.release()
+            raise
+        return AdbServiceProcess(reader, writer, on_close=self._slots.release)
+
+    async def exec_out(self, serial: Optional[str], command: str) -> bytes:
+        """Run ``command`` on the device and return its raw stdout"""
+        process = await self.open_service(serial, f'exec:{command}')
+        stdout, _ = await process.communicate()
+        return stdout
+
+
+def parse_device_list(data: bytes) -> List[Dict[str, str]]:
+    """Parse a ``host:devices(-l)`` / ``host:track-devices`` device list"""
+    devices = []
+    for line in data.decode('utf-8', 'replace').splitlines():
+        parts = line.split()
+        if len(parts) >= 2:
+            device = {'id': parts[0], 'status': parts[1]}
+            for field in parts[2:]:
+                if ':' in field:
+                    key, value = field.split(':', 1)
+                    device[key] = value
+            devices.append(device)
+    return devices
+
+
+async def read_device_updates(reader: asyncio.StreamReader) -> AsyncIterator[List[Dict[str, str]]]:
+    """Yield the full device list each time a ``track-devices`` stream reports a change
+
+    Works on the socket stream from ``host:track-devices`` as well as the
+    stdout of ``adb track-devices``, which relays the same framed blocks.
+    The iterator ends when the stream closes.
+    """
+    while True:
+        try:
+            header = await reader.readexactly(4)
+            data = await reader.readexactly(int(header, 16))
+        except (asyncio.IncompleteReadError, ValueError):
+            return
+        yield parse_device_list(data)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Content-addressed artifact store
+Keeps one copy of every distinct artifact under its SHA-256 and hardlinks
+it into each case directory that holds the same bytes, so repeat
+acquisitions from the same or similar devices take no extra disk space
+"""
+
+import argparse
+import json
+import os
+import shutil
+import stat
+import sys
+from typing import Dict, List, Optional
+
+
+class ArtifactStore:
+    """Objects under ``<root>/objects/<2 hex>/<sha256>``, shared by hardlink
+
+    Case directories reference objects by hardlink, so the filesystem's
+    link count is the reference count: an object whose only link is the
+    store itself is unreferenced and ``gc`` may delete it. Objects are
+    made read-only; a writer that must change a shared artifact in place
+    calls ``unshare`` first. The store must be on the same filesystem as
+    the case directories; otherwise artifacts simply stay full copies.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects = os.path.join(root, 'objects')
+        os.makedirs(self.objects, exist_ok=True)
+
+    def object_path(self, digest: str) -> str:
+        """Where the object with SHA-256 ``digest`` lives"""
+        return os.path.join(self.objects, digest[:2], digest)
+
+    def adopt(self, path: str, digest: str, sidecars: List[str] = ()) -> Optional[bool]:
+        """Share the finished artifact at ``path`` (SHA-256 ``digest``) through the store
+
+        If the store already holds the object, ``path`` is replaced by a
+        link to it and True is returned. Otherwise ``path`` becomes the
+        object and False is returned. None means the file could not be
+        linked (e.g. another filesystem) and stays a private copy. The
+        ``sidecars`` are suffixes of files derived from the artifact (such
+        as a compression index), shared along with it.
+        """
+        target = self.object_path(digest)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(path, target)
+        except FileExistsError:
+            pass
+        except OSError:
+            return None
+        else:
+            os.chmod(target, stat.S_IMODE(os.stat(target).st_mode) & ~0o222)
+            for suffix in sidecars:
+                self._link_sidecar(path + suffix, target + suffix)
+            return False
+        if os.path.samefile(path, target):
+            return False
+        try:
+            self._replace_with_link(target, path)
+        except OSError:
+            return None
+        for suffix in sidecars:
+            if os.path.exists(target + suffix):
+                self._replace_with_link(target + suffix, path + suffix)
+            else:
+                self._link_sidecar(path + suffix, target + suffix)
+        return True
+
+    @staticmethod
+    def _link_sidecar(path: str, target: str) -> None:
+        try:
+            os.link(path, target)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _replace_with_link(source: str, path: str) -> None:
+        """Atomically point ``path`` at ``source``"""
+        partial = path + '.link'
+        if os.path.lexists(partial):
+            os.remove(partial)
+        os.link(source, partial)
+        os.replace(partial, path)
+
+    @staticmethod
+    def unshare(path: str) -> None:
+        """Give ``path`` its own writable copy if it is a link to a shared object"""
+        if os.stat(path).st_nlink < 2:
+            return
+        partial = path + '.copy'
+        shutil.copyfile(path, partial)
+        os.replace(partial, path)
+
+    def gc(self, dry_run: bool = False) -> Dict[str, int]:
+        """Delete objects no case references any more
+
+        Returns counts of ``objects`` kept, ``removed`` and ``bytes_freed``.
+        """
+        stats = {'objects': 0, 'removed': 0, 'bytes_freed': 0}
+        for directory, _, files in os.walk(self.objects):
+            for name in files:
+                path = os.path.join(directory, name)
+                info = os.stat(path)
+                if info.st_nlink > 1:
+                    stats['objects'] += '.' not in name
+                    continue
+                stats['removed'] += 1
+                stats['bytes_freed'] += info.st_size
+                if not dry_run:
+                    os.remove(path)
+        return stats
+
+    def stats(self) -> Dict[str, int]:
+        """Object count, stored bytes, references and the bytes those references would take as copies"""
+        stats = {'objects': 0, 'bytes': 0, 'references': 0, 'referenced_bytes': 0}
+        for directory, _, files in os.walk(self.objects):
+            for name in files:
+                info = os.stat(os.path.join(directory, name))
+                stats['bytes'] += info.st_size
+                if '.' in name:
+                    # A sidecar (``<sha256>.idx``), counted with its object
+                    continue
+                stats['objects'] += 1
+                stats['references'] += info.st_nlink - 1
+                stats['referenced_bytes'] += info.st_size * (info.st_nlink - 1)
+        return stats
+
+
+def main():
+    """Artifact store CLI"""
+    parser = argparse.ArgumentParser(
+        description='Inspect or garbage-collect a content-addressed artifact store',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # How much do the cases share?
+  python artifact_store.py ./store stats
+
+  # Delete objects after their case directories were removed
+  python artifact_store.py ./store gc
+        """
+    )
+    parser.add_argument('store', help='Store directory (as given to --store)')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    commands.add_parser('stats', help='Count objects, references and space saved')
+    gc = commands.add_parser('gc', help='Delete objects no case directory links to')
+    gc.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+    args = parser.parse_args()
+
+    if not os.path.isdir(os.path.join(args.store, 'objects')):
+        print(f"Error: {args.store} is not an artifact store", file=sys.stderr)
+        sys.exit(1)
+    store = ArtifactStore(args.store)
+    if args.command == 'stats':
+        result = store.stats()
+    else:
+        result = store.gc(args.dry_run)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
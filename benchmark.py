@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Hermetic benchmark harness for the Mobile Forensic Tool
+Puts scripted stand-ins for adb and the libimobiledevice tools on PATH and
+measures how list/info/extract scale with device count, latency and output size
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+
+FAKE_TOOLS = ['adb', 'idevice_id', 'ideviceinfo', 'ideviceinstaller', 'idevicesyslog']
+
+ACTIONS = ['list', 'info', 'extract', 'extract_all']
+
+# Stand-in for every fake tool; it dispatches on the name it was invoked as and
+# reads its configuration from FAKE_* environment variables
+FAKE_TOOL_SOURCE = r'''
+import os, sys, time
+
+tool = os.path.basename(sys.argv[0])
+args = sys.argv[1:]
+with open(os.environ['FAKE_CALL_LOG'], 'a') as f:
+    f.write(tool + '\n')
+time.sleep(float(os.environ.get('FAKE_LATENCY', '0')))
+
+devices = int(os.environ.get('FAKE_DEVICES', '1'))
+serials = ['BENCH%04d' % i for i in range(devices)]
+out = sys.stdout.buffer
+
+
+def stream(line, total):
+    """Write about ``total`` bytes of repeated log lines in 1 MiB chunks"""
+    block = line * max(1, (1024 * 1024) // len(line))
+    written = 0
+    while written < total:
+        data = block[:total - written]
+        out.write(data)
+        written += len(data)
+    out.flush()
+
+
+if tool == 'adb':
+    if args[:1] == ['-s']:
+        if args[1] not in serials:
+            sys.stderr.write("error: device '%s' not found\n" % args[1])
+            sys.exit(1)
+        args = args[2:]
+    if args == ['version']:
+        print('Android Debug Bridge version 1.0.41 (benchmark stand-in)')
+    elif args == ['devices', '-l']:
+        print('List of devices attached')
+        for serial in serials:
+            print('%s device usb:1-1 product:bench model:Bench_Phone transport_id:1' % serial)
+    elif args == ['shell', 'getprop']:
+        for i in range(int(os.environ.get('FAKE_PROPERTIES', '600'))):
+            print('[bench.prop.%d]: [value %d]' % (i, i))
+        print('[ro.product.model]: [Bench Phone]')
+        print('[ro.product.manufacturer]: [Bench]')
+        print('[ro.build.version.release]: [14]')
+        print('[ro.build.version.sdk]: [34]')
+    elif args[:3] == ['shell', 'pm', 'list']:
+        for i in range(int(os.environ.get('FAKE_PACKAGES', '300'))):
+            print('package:com.bench.app%d' % i)
+    elif args[:2] == ['logcat', '-d']:
+        stream(b'10-17 10:00:00.000  1234  5678 I BenchTag: benchmark log line payload\n',
+               int(os.environ.get('FAKE_LOG_BYTES', '0')))
+    else:
+        sys.exit(1)
+elif tool == 'idevice_id':
+    for serial in serials:
+        print(serial)
+elif tool == 'ideviceinfo':
+    if args == ['--version']:
+        print('ideviceinfo 1.3.0 (benchmark stand-in)')
+    else:
+        print('DeviceName: Bench iPhone')
+        print('ProductType: iPhone15,2')
+        print('ProductVersion: 17.0')
+        print('BuildVersion: 21A329')
+        print('UniqueDeviceID: %s' % args[1])
+elif tool == 'ideviceinstaller':
+    print('CFBundleIdentifier, CFBundleVersion, CFBundleDisplayName')
+    for i in range(int(os.environ.get('FAKE_PACKAGES', '300'))):
+        print('com.bench.app%d, "1.0", "Bench App %d"' % (i, i))
+elif tool == 'idevicesyslog':
+    # The real tool streams until it is killed
+    stream(b'Oct 17 10:00:00 Bench-iPhone kernel[0] <Notice>: benchmark syslog line\n',
+           int(os.environ.get('FAKE_LOG_BYTES', '0')))
+    time.sleep(3600)
+'''
+
+
+def install_fake_tools(bin_dir: str) -> None:
+    """Write the stand-in executables into ``bin_dir``"""
+    for name in FAKE_TOOLS:
+        path = os.path.join(bin_dir, name)
+        with open(path, 'w') as f:
+            f.write('#!%s\n%s' % (sys.executable, FAKE_TOOL_SOURCE))
+        os.chmod(path, 0o755)
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process in KiB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_action(platform: str, action: str, work_dir: str, max_workers: int) -> Dict[str, any]:
+    """Run one action in this process and measure it (used by the child runner)"""
+    from mobile_forensic_tool import MobileForensicTool, Platform
+    tool = MobileForensicTool(Platform(platform))
+    output_dir = os.path.join(work_dir, 'output', platform, action)
+    start = time.perf_counter()
+    if action == 'list':
+        devices = len(tool.list_devices())
+    elif action == 'info':
+        devices = 0
+        for device in tool.list_devices():
+            tool.get_device_info(device['id'])
+            devices += 1
+    elif action == 'extract':
+        device_id = tool.list_devices()[0]['id']
+        tool.extract_data(device_id, output_dir)
+        devices = 1
+    elif action == 'extract_all':
+        devices = tool.extract_all_devices(output_dir, max_workers)['device_count']
+    else:
+        raise ValueError(f'Unknown action: {action}')
+    return {
+        'wall_time_s': round(time.perf_counter() - start, 4),
+        'peak_rss_kb': peak_rss_kb(),
+        'devices': devices
+    }
+
+
+def benchmark(platforms: List[str], actions: List[str], devices: int, latency: float,
+              log_bytes: int, packages: int, max_workers: int) -> Dict[str, any]:
+    """Run every action for every platform against the stand-in tools
+
+    Each action runs in its own interpreter so that peak RSS is measured
+    per action. Subprocess counts come from the stand-ins' call log.
+    """
+    config = {
+        'platforms': platforms,
+        'actions': actions,
+        'devices': devices,
+        'latency_s': latency,
+        'log_bytes': log_bytes,
+        'packages': packages,
+        'max_workers': max_workers,
+        'python': sys.version.split()[0]
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        bin_dir = os.path.join(work_dir, 'bin')
+        os.makedirs(bin_dir)
+        install_fake_tools(bin_dir)
+        call_log = os.path.join(work_dir, 'calls.log')
+        env = dict(os.environ)
+        env.update({
+            'PATH': bin_dir + os.pathsep + env.get('PATH', ''),
+            'FAKE_CALL_LOG': call_log,
+            'FAKE_DEVICES': str(devices),
+            'FAKE_LATENCY': str(latency),
+            'FAKE_LOG_BYTES': str(log_bytes),
+            'FAKE_PACKAGES': str(packages),
+            'PYTHONPATH': os.path.dirname(os.path.abspath(__file__))
+        })
+        for platform in platforms:
+            for action in actions:
+                open(call_log, 'w').close()
+                child = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--run-action',
+                     platform, action, work_dir, str(max_workers)],
+                    capture_output=True,
+                    text=True,
+                    env=env
+                )
+                entry = {'platform': platform, 'action': action}
+                if child.returncode == 0:
+                    entry.update(json.loads(child.stdout.strip().splitlines()[-1]))
+                else:
+                    lines = child.stderr.strip().splitlines()
+                    entry['error'] = lines[-1] if lines else 'failed'
+                with open(call_log) as f:
+                    calls = [line.strip() for line in f if line.strip()]
+                entry['subprocess_count'] = len(calls)
+                entry['subprocesses'] = {name: calls.count(name) for name in sorted(set(calls))}
+                results.append(entry)
+    return {'config': config, 'results': results}
+
+
+def main():
+    """Benchmark CLI"""
+    parser = argparse.ArgumentParser(
+        description='Hermetic benchmark for the Mobile Forensic Tool',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Quick run, both platforms, all actions
+  python benchmark.py
+
+  # 100 simulated Android devices, 20 ms per command, 500 MB logcat
+  python benchmark.py --platform android --devices 100 --latency 0.02 --log-mb 500 --output bench.json
+        """
+    )
+    parser.add_argument('--run-action', nargs=4, metavar=('PLATFORM', 'ACTION', 'WORK_DIR', 'WORKERS'),
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--platform', nargs='+', choices=['android', 'ios'],
+                        default=['android', 'ios'], help='Platforms to benchmark')
+    parser.add_argument('--action', nargs='+', choices=ACTIONS, default=ACTIONS,
+                        help='Actions to benchmark')
+    parser.add_argument('--devices', type=int, default=4,
+                        help='Number of simulated devices (default: 4)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds each stand-in command sleeps before answering (default: 0)')
+    parser.add_argument('--log-mb', type=float, default=1.0,
+                        help='Size of the simulated logcat/syslog in MB (default: 1)')
+    parser.add_argument('--packages', type=int, default=300,
+                        help='Number of simulated installed packages (default: 300)')
+    parser.add_argument('--max-workers', type=int, default=4,
+                        help='Concurrency cap for extract_all (default: 4)')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    if args.run_action:
+        platform, action, work_dir, workers = args.run_action
+        print(json.dumps(run_action(platform, action, work_dir, int(workers))))
+        return
+
+    report = benchmark(args.platform, args.action, args.devices, args.latency,
+                       int(args.log_mb * 1024 * 1024), args.packages, args.max_workers)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Block-compressed artifact format
+A stream is stored as a series of independent gzip members, so the file is
+still a valid .gz for zcat/gunzip, plus a small JSON sidecar index that maps
+uncompressed offsets to members for random access
+"""
+
+import bisect
+import json
+import os
+import zlib
+from typing import Callable, Iterator, List, Optional
+
+
+# Uncompressed bytes per gzip member
+BLOCK_SIZE = 1024 * 1024
+
+INDEX_FORMAT = 'gzip-blocks'
+
+
+def index_path(path: str) -> str:
+    """Sidecar index location for a block-compressed file"""
+    return path + '.idx'
+
+
+def write_index(path: str, blocks: List[List[int]], block_size: int = BLOCK_SIZE) -> None:
+    """Atomically write the sidecar index for ``path``
+
+    Each block is ``[compressed_offset, compressed_length,
+    uncompressed_offset, uncompressed_length]``.
+    """
+    partial = index_path(path) + '.part'
+    with open(partial, 'w') as f:
+        json.dump({'format': INDEX_FORMAT, 'block_size': block_size, 'blocks': blocks}, f)
+    os.replace(partial, index_path(path))
+
+
+def read_index(path: str) -> List[List[int]]:
+    """Load the block list of a block-compressed file"""
+    with open(index_path(path)) as f:
+        index = json.load(f)
+    if index.get('format') != INDEX_FORMAT:
+        raise ValueError(f'Not a {INDEX_FORMAT} index: {index_path(path)}')
+    return index['blocks']
+
+
+class BlockGzipWriter:
+    """Compress a stream into independently decodable gzip members
+
+    Compressed bytes are handed to ``sink`` as each block completes, so the
+    caller decides where they go (and can hash them on the way). To append
+    to an existing file, pass its current block list as ``blocks``.
+    """
+
+    def __init__(self, sink: Callable[[bytes], None], block_size: int = BLOCK_SIZE,
+                 level: int = 6, blocks: Optional[List[List[int]]] = None):
+        self.sink = sink
+        self.block_size = block_size
+        self.level = level
+        self.blocks = [list(block) for block in blocks or []]
+        self._buffer = bytearray()
+
+    @property
+    def compressed_size(self) -> int:
+        if not self.blocks:
+            return 0
+        offset, length = self.blocks[-1][:2]
+        return offset + length
+
+    @property
+    def uncompressed_size(self) -> int:
+        if not self.blocks:
+            return len(self._buffer)
+        offset, length = self.blocks[-1][2:]
+        return offset + length + len(self._buffer)
+
+    def write(self, data: bytes) -> None:
+        """Buffer ``data`` and emit every block that fills up"""
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            self._emit(bytes(self._buffer[:self.block_size]))
+            del self._buffer[:self.block_size]
+
+    def close(self) -> None:
+        """Emit the final, possibly short, block"""
+        if self._buffer:
+            self._emit(bytes(self._buffer))
+            self._buffer = bytearray()
+
+    def _emit(self, data: bytes) -> None:
+        # wbits=31 writes a gzip header (with a zero mtime, so output is reproducible)
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        member = compressor.compress(data) + compressor.flush()
+        uncompressed_offset = self.uncompressed_size - len(self._buffer)
+        self.blocks.append([self.compressed_size, len(member),
+                            uncompressed_offset, len(data)])
+        self.sink(member)
+
+
+class BlockGzipReader:
+    """Random access to a block-compressed file through its sidecar index
+
+    Only the blocks that cover the requested range are read and inflated.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.blocks = read_index(path)
+        self._starts = [block[2] for block in self.blocks]
+        self._file = open(path, 'rb')
+
+    def __enter__(self) -> 'BlockGzipReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __len__(self) -> int:
+        if not self.blocks:
+            return 0
+        return self.blocks[-1][2] + self.blocks[-1][3]
+
+    def read_block(self, number: int) -> bytes:
+        """Inflate a single block"""
+        offset, length = self.blocks[number][:2]
+        self._file.seek(offset)
+        return zlib.decompress(self._file.read(length), 31)
+
+    def iter_blocks(self) -> Iterator[bytes]:
+        """Inflate the blocks one at a time, in order"""
+        for number in range(len(self.blocks)):
+            yield self.read_block(number)
+
+    def read(self, offset: int, size: int) -> bytes:
+        """Return ``size`` uncompressed bytes starting at ``offset``"""
+        end = min(offset + size, len(self))
+        if offset >= end:
+            return b''
+        number = bisect.bisect_right(self._starts, offset) - 1
+        parts = []
+        position = offset
+        while position < end:
+            start = self.blocks[number][2]
+            data = self.read_block(number)
+            parts.append(data[position - start:end - start])
+            position = start + len(data)
+            number += 1
+        return b''.join(parts)
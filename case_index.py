@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+SQLite case index
+Ingests extraction directories (anything with a manifest.json) into one
+database: installed packages and device properties in indexed tables and
+log lines in an FTS5 table, so cross-case questions are answered without
+re-reading the artifacts
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from log_records import read_chunks
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS extractions (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    device_id TEXT,
+    platform TEXT,
+    manifest_mtime_ns INTEGER,
+    manifest_size INTEGER,
+    indexed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS extractions_device ON extractions (device_id);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY,
+    extraction_id INTEGER NOT NULL REFERENCES extractions (id),
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    sha256 TEXT,
+    size INTEGER,
+    first_line INTEGER,
+    line_count INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (extraction_id, name)
+);
+CREATE INDEX IF NOT EXISTS artifacts_first_line ON artifacts (first_line);
+CREATE TABLE IF NOT EXISTS packages (
+    artifact_id INTEGER NOT NULL REFERENCES artifacts (id),
+    package TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS packages_package ON packages (package);
+CREATE INDEX IF NOT EXISTS packages_artifact ON packages (artifact_id);
+CREATE TABLE IF NOT EXISTS properties (
+    artifact_id INTEGER NOT NULL REFERENCES artifacts (id),
+    key TEXT NOT NULL,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS properties_key_value ON properties (key, value);
+CREATE INDEX IF NOT EXISTS properties_artifact ON properties (artifact_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS log_lines USING fts5 (line);
+'''
+
+# Artifact kinds by stored name (see artifact_type)
+KINDS = {
+    'device_info.txt': 'properties',
+    'installed_packages.txt': 'packages',
+    'installed_apps.txt': 'packages',
+    'logcat.txt': 'log',
+    'syslog.txt': 'log'
+}
+
+# Log lines inserted per executemany batch
+BATCH_SIZE = 10000
+
+GETPROP_LINE = re.compile(r'^\[(.+?)\]: \[(.*)\]$')
+
+
+def artifact_type(name: str) -> str:
+    """Stored artifact name without compression, live-capture or segment suffixes"""
+    return re.sub(r'(_live)?(\.\d+)?\.txt(\.gz)?$', '.txt', name)
+
+
+def _text_lines(path: str) -> Iterator[str]:
+    """Lines of a plain or block-compressed artifact, without newlines"""
+    for _, data in read_chunks(path):
+        for line in data.decode('utf-8', 'replace').splitlines():
+            yield line
+
+
+def parse_packages(lines: Iterable[str]) -> Iterator[str]:
+    """Package / bundle IDs from ``pm list packages`` or ``ideviceinstaller -l`` output"""
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('CFBundleIdentifier') or line.startswith('Total:'):
+            continue
+        if line.startswith('package:'):
+            # ``pm list packages -f`` prints ``package:<apk path>=<name>``
+            yield line[len('package:'):].rpartition('=')[2]
+        else:
+            yield re.split(r',| - ', line, 1)[0].strip()
+
+
+def parse_properties(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """``(key, value)`` pairs from getprop (``[key]: [value]``) or ideviceinfo (``Key: Value``) output"""
+    for line in lines:
+        line = line.strip()
+        match = GETPROP_LINE.match(line)
+        if match is not None:
+            yield match.group(1), match.group(2)
+        elif ': ' in line and not line.startswith('['):
+            key, value = line.split(': ', 1)
+            yield key.strip(), value.strip()
+
+
+class CaseIndex:
+    """Index of many extraction directories in one SQLite database
+
+    ``update`` walks the given roots for ``manifest.json`` files and
+    ingests what changed since the last run: an extraction whose manifest
+    is unchanged is skipped, and within a changed one only artifacts whose
+    SHA-256 differs are re-read. Extractions that disappeared from a
+    scanned root are dropped. Raises ``RuntimeError`` if the SQLite build
+    has no FTS5.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        try:
+            self.db.executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            self.db.close()
+            raise RuntimeError(f'SQLite FTS5 is required for the case index: {e}')
+
+    def __enter__(self) -> 'CaseIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def update(self, roots: List[str]) -> Dict[str, int]:
+        """Bring the index up to date with the extractions under ``roots``
+
+        Returns counts of ``indexed``, ``unchanged`` and ``removed``
+        extractions.
+        """
+        stats = {'indexed': 0, 'unchanged': 0, 'removed': 0}
+        for root in roots:
+            root = os.path.abspath(root)
+            seen = set()
+            for directory, subdirectories, files in os.walk(root):
+                subdirectories.sort()
+                if 'manifest.json' not in files:
+                    continue
+                seen.add(directory)
+                stats['indexed' if self._update_extraction(directory) else 'unchanged'] += 1
+            prefix = root.rstrip(os.sep) + os.sep
+            for extraction_id, path in self.db.execute(
+                    'SELECT id, path FROM extractions').fetchall():
+                if (path == root or path.startswith(prefix)) and path not in seen:
+                    with self.db:
+                        self._remove_extraction(extraction_id)
+                    stats['removed'] += 1
+        return stats
+
+    def _update_extraction(self, directory: str) -> bool:
+        """Ingest one extraction directory; False if its manifest is unchanged"""
+        manifest_path = os.path.join(directory, 'manifest.json')
+        stat = os.stat(manifest_path)
+        row = self.db.execute(
+            'SELECT id, manifest_mtime_ns, manifest_size FROM extractions WHERE path = ?',
+            (directory,)).fetchone()
+        if row is not None and row[1:] == (stat.st_mtime_ns, stat.st_size):
+            return False
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        with self.db:
+            if row is None:
+                extraction_id = self.db.execute(
+                    'INSERT INTO extractions (path) VALUES (?)', (directory,)).lastrowid
+            else:
+                extraction_id = row[0]
+            self.db.execute(
+                'UPDATE extractions SET device_id = ?, platform = ?, manifest_mtime_ns = ?, '
+                'manifest_size = ?, indexed_at = ? WHERE id = ?',
+                (manifest.get('device_id'), manifest.get('platform'), stat.st_mtime_ns,
+                 stat.st_size, datetime.now(timezone.utc).isoformat(), extraction_id))
+            current = {}
+            for item in manifest.get('items', []):
+                kind = KINDS.get(artifact_type(item['name']))
+                if kind is not None:
+                    current[item['name']] = (kind, item)
+            known = {name: (artifact_id, sha256) for artifact_id, name, sha256 in self.db.execute(
+                'SELECT id, name, sha256 FROM artifacts WHERE extraction_id = ?', (extraction_id,))}
+            for name, (artifact_id, sha256) in known.items():
+                if name not in current or current[name][1].get('digests', {}).get('sha256') != sha256:
+                    self._remove_artifact(artifact_id)
+            for name, (kind, item) in current.items():
+                sha256 = item.get('digests', {}).get('sha256')
+                if name in known and known[name][1] == sha256:
+                    continue
+                artifact_path = os.path.join(directory, name)
+                if os.path.exists(artifact_path):
+                    self._ingest(extraction_id, name, kind, sha256, item.get('size'), artifact_path)
+        return True
+
+    def _ingest(self, extraction_id: int, name: str, kind: str, sha256: Optional[str],
+                size: Optional[int], path: str) -> None:
+        artifact_id = self.db.execute(
+            'INSERT INTO artifacts (extraction_id, name, kind, sha256, size) VALUES (?, ?, ?, ?, ?)',
+            (extraction_id, name, kind, sha256, size)).lastrowid
+        if kind == 'packages':
+            self.db.executemany('INSERT INTO packages (artifact_id, package) VALUES (?, ?)',
+                                ((artifact_id, package)
+                                 for package in parse_packages(_text_lines(path))))
+        elif kind == 'properties':
+            self.db.executemany('INSERT INTO properties (artifact_id, key, value) VALUES (?, ?, ?)',
+                                ((artifact_id, key, value)
+                                 for key, value in parse_properties(_text_lines(path))))
+        else:
+            # Lines get consecutive rowids so an artifact maps to one rowid range
+            first = self.db.execute('SELECT coalesce(max(rowid), 0) + 1 FROM log_lines').fetchone()[0]
+            count = 0
+            batch = []
+            for line in _text_lines(path):
+                batch.append((first + count, line))
+                count += 1
+                if len(batch) == BATCH_SIZE:
+                    self.db.executemany('INSERT INTO log_lines (rowid, line) VALUES (?, ?)', batch)
+                    batch = []
+            self.db.executemany('INSERT INTO log_lines (rowid, line) VALUES (?, ?)', batch)
+            self.db.execute('UPDATE artifacts SET first_line = ?, line_count = ? WHERE id = ?',
+                            (first, count, artifact_id))
+
+    def _remove_artifact(self, artifact_id: int) -> None:
+        first, count = self.db.execute(
+            'SELECT first_line, line_count FROM artifacts WHERE id = ?', (artifact_id,)).fetchone()
+        if count:
+            self.db.execute('DELETE FROM log_lines WHERE rowid BETWEEN ? AND ?',
+                            (first, first + count - 1))
+        self.db.execute('DELETE FROM packages WHERE artifact_id = ?', (artifact_id,))
+        self.db.execute('DELETE FROM properties WHERE artifact_id = ?', (artifact_id,))
+        self.db.execute('DELETE FROM artifacts WHERE id = ?', (artifact_id,))
+
+    def _remove_extraction(self, extraction_id: int) -> None:
+        for (artifact_id,) in self.db.execute(
+                'SELECT id FROM artifacts WHERE extraction_id = ?', (extraction_id,)).fetchall():
+            self._remove_artifact(artifact_id)
+        self.db.execute('DELETE FROM extractions WHERE id = ?', (extraction_id,))
+
+    def find_package(self, package: str) -> List[Dict[str, str]]:
+        """Extractions listing ``package`` (``%`` makes it a ``LIKE`` pattern)"""
+        operator = 'LIKE' if '%' in package else '='
+        rows = self.db.execute(
+            'SELECT DISTINCT e.device_id, e.platform, e.path, p.package '
+            'FROM packages p JOIN artifacts a ON a.id = p.artifact_id '
+            'JOIN extractions e ON e.id = a.extraction_id '
+            f'WHERE p.package {operator} ? ORDER BY e.device_id, e.path', (package,))
+        return [dict(zip(('device_id', 'platform', 'path', 'package'), row)) for row in rows]
+
+    def find_property(self, key: str, value: Optional[str] = None) -> List[Dict[str, str]]:
+        """Extractions with device property ``key`` (optionally equal to ``value``)"""
+        query = ('SELECT DISTINCT e.device_id, e.platform, e.path, p.key, p.value '
+                 'FROM properties p JOIN artifacts a ON a.id = p.artifact_id '
+                 'JOIN extractions e ON e.id = a.extraction_id WHERE p.key = ?')
+        params = [key]
+        if value is not None:
+            query += ' AND p.value = ?'
+            params.append(value)
+        rows = self.db.execute(query + ' ORDER BY e.device_id, e.path', params)
+        return [dict(zip(('device_id', 'platform', 'path', 'key', 'value'), row)) for row in rows]
+
+    def search_logs(self, query: str, limit: int = 100) -> List[Dict[str, any]]:
+        """Log lines matching an FTS5 ``query``, with the extraction and line number"""
+        rows = self.db.execute(
+            'SELECT l.rowid, l.line, a.name, a.first_line, e.device_id, e.path '
+            'FROM log_lines l '
+            'JOIN artifacts a ON a.id = (SELECT id FROM artifacts WHERE first_line <= l.rowid '
+            '                            ORDER BY first_line DESC LIMIT 1) '
+            'JOIN extractions e ON e.id = a.extraction_id '
+            'WHERE log_lines MATCH ? ORDER BY l.rowid LIMIT ?', (query, limit))
+        return [{'device_id': device_id, 'path': path, 'artifact': name,
+                 'line_no': rowid - first + 1, 'line': line}
+                for rowid, line, name, first, device_id, path in rows]
+
+
+def main():
+    """Case index CLI"""
+    parser = argparse.ArgumentParser(
+        description='Index extraction directories into SQLite and query across cases',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Index (or refresh) every extraction under ./cases
+  python case_index.py cases.db index ./cases
+
+  # Which devices had a package installed?
+  python case_index.py cases.db package com.whatsapp
+
+  # Which logs mention a token?
+  python case_index.py cases.db search '"deadbeef" AND ActivityManager'
+        """
+    )
+    parser.add_argument('database', help='SQLite index file (created if missing)')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    index = commands.add_parser('index', help='Ingest new or changed extractions')
+    index.add_argument('roots', nargs='+', help='Directories to scan for manifest.json')
+    package = commands.add_parser('package', help='Find extractions listing a package')
+    package.add_argument('package', help='Package or bundle ID (%% matches any text)')
+    prop = commands.add_parser('property', help='Find extractions by device property')
+    prop.add_argument('key')
+    prop.add_argument('value', nargs='?')
+    search = commands.add_parser('search', help='Full-text search across log lines')
+    search.add_argument('query', help='FTS5 query')
+    search.add_argument('--limit', type=int, default=100, help='Maximum lines (default: 100)')
+    args = parser.parse_args()
+
+    try:
+        case_index = CaseIndex(args.database)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    with case_index:
+        if args.command == 'index':
+            result = case_index.update(args.roots)
+        elif args.command == 'package':
+            result = case_index.find_package(args.package)
+        elif args.command == 'property':
+            result = case_index.find_property(args.key, args.value)
+        else:
+            result = case_index.search_logs(args.query, args.limit)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
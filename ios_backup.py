@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+iOS backup reader
+Opens a local (unencrypted) iTunes/Finder or ``idevicebackup2`` backup and
+answers file lookups from its ``Manifest.db`` through an indexed SQLite
+copy of the path columns. File contents are served as memory-mapped,
+zero-copy views, so browsing a backup of 100k files reads only what is
+asked for
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import plistlib
+import sqlite3
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+
+FORMAT = 'ios-backup-index'
+
+SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value);
+CREATE TABLE files (
+    file_id TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    path TEXT NOT NULL,
+    flags INTEGER NOT NULL
+);
+CREATE INDEX files_domain_path ON files (domain, path);
+CREATE INDEX files_path ON files (path);
+'''
+
+# Manifest.db ``flags``
+TYPES = {1: 'file', 2: 'dir', 4: 'symlink'}
+
+# Rows copied per executemany batch while indexing
+BATCH_SIZE = 10000
+
+# plistlib.UID is Python 3.8+; older versions cannot decode file metadata
+UID = getattr(plistlib, 'UID', ())
+
+
+class BackupError(ValueError):
+    """The directory is not a readable iOS backup"""
+
+
+def file_id(domain: str, path: str) -> str:
+    """The name a backup stores ``domain``/``path`` under (SHA-1 of ``domain-path``)"""
+    return hashlib.sha1(f'{domain}-{path}'.encode('utf-8')).hexdigest()
+
+
+def _prefix_range(prefix: str) -> Tuple[str, str]:
+    """Bounds ``[low, high)`` of every string starting with ``prefix``"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _file_metadata(blob: Optional[bytes]) -> Dict[str, any]:
+    """Decode the NSKeyedArchiver ``MBFile`` record of a Manifest.db row"""
+    if not blob:
+        return {}
+    try:
+        archive = plistlib.loads(blob)
+        objects = archive['$objects']
+        record = objects[archive['$top']['root'].data]
+    except (plistlib.InvalidFileException, ValueError, KeyError, IndexError,
+            TypeError, AttributeError):
+        return {}
+
+    def resolve(value):
+        return objects[value.data] if isinstance(value, UID) else value
+    metadata = {}
+    for key, field in [('Size', 'size'), ('LastModified', 'mtime'), ('Birth', 'birth'),
+                       ('UserID', 'uid'), ('GroupID', 'gid'),
+                       ('ProtectionClass', 'protection_class')]:
+        if key in record:
+            metadata[field] = resolve(record[key])
+    if 'Mode' in record:
+        metadata['mode'] = oct(resolve(record['Mode']) & 0o7777)
+    if 'Target' in record:
+        target = resolve(record['Target'])
+        metadata['link'] = target.decode('utf-8', 'replace') if isinstance(target, bytes) else target
+    return metadata
+
+
+class BackupReader:
+    """Indexed, read-only access to an iOS backup directory
+
+    ``Manifest.db`` is opened read-only and never modified. Its domain,
+    path and flags columns are copied once into an index database with an
+    index on ``(domain, path)`` and one on ``path``; pass ``index`` (a file
+    path) to keep that copy and reuse it while Manifest.db is unchanged,
+    otherwise it lives in memory. Entries are dicts with ``file_id``,
+    ``domain``, ``path`` and ``type``; ``metadata`` decodes size, times and
+    mode from the manifest on demand, and ``open`` maps a file's content
+    without copying it. Raises ``BackupError`` for encrypted backups and
+    directories without a Manifest.db (including pre-iOS 10 backups,
+    which use Manifest.mbdb).
+    """
+
+    def __init__(self, path: str, index: Optional[str] = None):
+        self.path = path
+        manifest = os.path.join(path, 'Manifest.db')
+        if not os.path.isfile(manifest):
+            raise BackupError(f'{path}: no Manifest.db (not an iOS 10+ backup)')
+        if self._manifest_plist().get('IsEncrypted'):
+            raise BackupError(f'{path}: encrypted backups are not supported')
+        self.db = sqlite3.connect(index or ':memory:', uri=True)
+        # immutable: no locks or journal files are created in the evidence directory
+        self.db.execute('ATTACH DATABASE ? AS manifest',
+                        (f'file:{quote(os.path.abspath(manifest))}?mode=ro&immutable=1',))
+        try:
+            self.rebuilt = self._ensure_index(manifest)
+        except sqlite3.DatabaseError as e:
+            self.db.close()
+            raise BackupError(f'{manifest}: {e}')
+
+    def __enter__(self) -> 'BackupReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _manifest_plist(self) -> Dict[str, any]:
+        try:
+            with open(os.path.join(self.path, 'Manifest.plist'), 'rb') as f:
+                return plistlib.load(f)
+        except (OSError, plistlib.InvalidFileException, ValueError):
+            return {}
+
+    def _ensure_index(self, manifest: str) -> bool:
+        """Build the path index unless the stored one matches Manifest.db; True if built"""
+        info = os.stat(manifest)
+        source = [FORMAT, info.st_size, info.st_mtime_ns]
+        try:
+            stored = self.db.execute("SELECT value FROM main.meta WHERE key = 'source'").fetchone()
+        except sqlite3.OperationalError:
+            stored = None
+        if stored is not None and json.loads(stored[0]) == source:
+            return False
+        with self.db:
+            for table in ('files', 'meta'):
+                self.db.execute(f'DROP TABLE IF EXISTS main.{table}')
+            self.db.executescript(SCHEMA)
+            rows = self.db.execute('SELECT fileID, domain, relativePath, flags FROM manifest.Files')
+            while True:
+                batch = rows.fetchmany(BATCH_SIZE)
+                if not batch:
+                    break
+                self.db.executemany('INSERT INTO main.files VALUES (?, ?, ?, ?)', batch)
+            self.db.execute("INSERT INTO main.meta VALUES ('source', ?)", (json.dumps(source),))
+        return True
+
+    @staticmethod
+    def _entry(row: Tuple[str, str, str, int]) -> Dict[str, any]:
+        identifier, domain, path, flags = row
+        return {'file_id': identifier, 'domain': domain, 'path': path,
+                'type': TYPES.get(flags, 'other')}
+
+    def count(self) -> int:
+        """Number of entries (files, directories and links)"""
+        return self.db.execute('SELECT count(*) FROM main.files').fetchone()[0]
+
+    def domains(self) -> List[Dict[str, any]]:
+        """Every domain with its entry count"""
+        rows = self.db.execute(
+            'SELECT domain, count(*) FROM main.files GROUP BY domain ORDER BY domain')
+        return [{'domain': domain, 'entries': entries} for domain, entries in rows]
+
+    def get(self, domain: str, path: str) -> Optional[Dict[str, any]]:
+        """The entry for ``path`` in ``domain``, or None"""
+        row = self.db.execute(
+            'SELECT file_id, domain, path, flags FROM main.files WHERE domain = ? AND path = ?',
+            (domain, path)).fetchone()
+        return self._entry(row) if row is not None else None
+
+    def entries(self, domain: Optional[str] = None, prefix: str = '',
+                kind: Optional[str] = None) -> Iterator[Dict[str, any]]:
+        """Entries filtered by ``domain``, path ``prefix`` and ``kind``, in path order
+
+        ``prefix`` is e.g. ``Library/SMS/``; ``kind`` is ``file``, ``dir`` or
+        ``symlink``. Without a domain, a prefix matches paths in every
+        domain. Rows are fetched from the index as the iterator advances.
+        """
+        conditions = []
+        params = []
+        if domain is not None:
+            conditions.append('domain = ?')
+            params.append(domain)
+        if prefix:
+            conditions.append('path >= ? AND path < ?')
+            params.extend(_prefix_range(prefix))
+        if kind is not None:
+            conditions.append('flags = ?')
+            params.append(next(flags for flags, name in TYPES.items() if name == kind))
+        query = 'SELECT file_id, domain, path, flags FROM main.files'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        order = ' ORDER BY path, domain' if domain is None and prefix else ' ORDER BY domain, path'
+        for row in self.db.execute(query + order, params):
+            yield self._entry(row)
+
+    def metadata(self, entry: Dict[str, any]) -> Dict[str, any]:
+        """Size, mtime, birth, mode, owner, protection class and link target of an entry"""
+        row = self.db.execute('SELECT file FROM manifest.Files WHERE fileID = ?',
+                              (entry['file_id'],)).fetchone()
+        return _file_metadata(row[0] if row is not None else None)
+
+    def blob_path(self, entry: Dict[str, any]) -> str:
+        """Where a file's content is stored in the backup (``<2 hex>/<file_id>``)"""
+        return os.path.join(self.path, entry['file_id'][:2], entry['file_id'])
+
+    @contextmanager
+    def open(self, entry: Dict[str, any]) -> Iterator[memoryview]:
+        """Map a file's content read-only and yield it as a ``memoryview``
+
+        Nothing is copied until the caller slices into bytes; the view is
+        released when the block ends, so keep ``bytes(...)`` copies of
+        anything needed afterwards. Raises ``FileNotFoundError`` when the
+        backup has no content for the entry.
+        """
+        with open(self.blob_path(entry), 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                # Empty files cannot be mapped
+                yield memoryview(b'')
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                view = memoryview(data)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def read(self, entry: Dict[str, any]) -> bytes:
+        """A copy of a file's content"""
+        with self.open(entry) as data:
+            return bytes(data)
+
+
+def main():
+    """iOS backup CLI"""
+    parser = argparse.ArgumentParser(
+        description='Browse and extract files from an iOS backup directory',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Domains and their entry counts (keep the path index for later runs)
+  python ios_backup.py ./backup/<udid> --index backup.idx domains
+
+  # Files under a path, as JSON lines with size and mtime
+  python ios_backup.py ./backup/<udid> ls --domain HomeDomain --prefix Library/SMS/ --metadata
+
+  # Copy one file out
+  python ios_backup.py ./backup/<udid> cat HomeDomain Library/SMS/sms.db -o sms.db
+        """
+    )
+    parser.add_argument('backup', help='Backup directory (containing Manifest.db)')
+    parser.add_argument('--index', help='Keep the path index in this file and reuse it')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    commands.add_parser('domains', help='List domains with their entry counts')
+    ls = commands.add_parser('ls', help='List entries as JSON lines')
+    ls.add_argument('--domain', help='Only this domain')
+    ls.add_argument('--prefix', default='', help='Only paths starting with this')
+    ls.add_argument('--type', choices=sorted(TYPES.values()), help='Only this entry type')
+    ls.add_argument('--metadata', action='store_true', help='Add size, times and mode')
+    cat = commands.add_parser('cat', help='Write a file\'s content to stdout or --output')
+    cat.add_argument('domain')
+    cat.add_argument('path')
+    cat.add_argument('-o', '--output', help='Output file')
+    args = parser.parse_args()
+
+    try:
+        backup = BackupReader(args.backup, args.index)
+    except BackupError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    with backup:
+        if args.command == 'domains':
+            print(json.dumps(backup.domains(), indent=2))
+        elif args.command == 'ls':
+            for entry in backup.entries(args.domain, args.prefix, args.type):
+                if args.metadata:
+                    entry.update(backup.metadata(entry))
+                print(json.dumps(entry))
+        else:
+            entry = backup.get(args.domain, args.path)
+            if entry is None or entry['type'] != 'file':
+                print(f"Error: no file {args.domain}/{args.path} in the backup", file=sys.stderr)
+                sys.exit(1)
+            with backup.open(entry) as data:
+                if args.output:
+                    with open(args.output, 'wb') as f:
+                        f.write(data)
+                else:
+                    sys.stdout.buffer.write(data)
+
+
+if __name__ == '__main__':
+    main()
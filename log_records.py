@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Columnar record store for logcat and iOS syslog captures
+Parses each log line once into typed arrays (timestamp, pid, tid, interned
+level and tag codes, and the line's offset and length in the raw file), so
+filtering by time, tag, pid or level runs in memory and only the matching
+lines are read back from the capture
+"""
+
+import argparse
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from calendar import isleap, timegm
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from block_gzip import BlockGzipReader, index_path
+
+
+FORMAT = 'log-records'
+
+# Column name and array typecode, in storage order
+COLUMNS = [
+    ('timestamp', 'q'),   # milliseconds since the epoch, device local time
+    ('pid', 'i'),
+    ('tid', 'i'),         # -1 where the format has none (syslog)
+    ('level', 'B'),       # index into ``levels``
+    ('tag', 'I'),         # index into ``tags``
+    ('offset', 'Q'),      # start of the line in the uncompressed capture
+    ('length', 'I')       # line length without the newline
+]
+
+# Bytes of the capture parsed at a time
+READ_SIZE = 4 * 1024 * 1024
+
+# Captures smaller than this are parsed in-process (worker start-up would dominate)
+PARALLEL_MIN_SIZE = 32 * 1024 * 1024
+
+# logcat -v threadtime: ``MM-DD hh:mm:ss.mmm  pid  tid L tag: message``
+LOGCAT_LINE = re.compile(
+    rb'^(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d)\.(\d{3})\s+(\d+)\s+(\d+) ([VDIWEFS]) (.*?)\s*: ',
+    re.M)
+
+# idevicesyslog: ``Mon DD hh:mm:ss[.ffffff] host process[(library)][pid] <Level>: message``
+SYSLOG_LINE = re.compile(
+    rb'^([A-Z][a-z]{2}) +(\d{1,2}) (\d\d):(\d\d):(\d\d)(?:\.(\d+))? \S+ '
+    rb'([^\s\[(]+)(?:\([^)]*\))?\[(\d+)\] <(\w+)>: ',
+    re.M)
+
+MONTHS = {name: number for number, name in enumerate(
+    [b'Jan', b'Feb', b'Mar', b'Apr', b'May', b'Jun',
+     b'Jul', b'Aug', b'Sep', b'Oct', b'Nov', b'Dec'], 1)}
+
+
+def records_path(path: str) -> str:
+    """Record store location for a capture"""
+    return path + '.records'
+
+
+def guess_kind(path: str) -> str:
+    """``logcat`` or ``syslog``, from the capture's file name"""
+    return 'syslog' if 'syslog' in os.path.basename(path) else 'logcat'
+
+
+def _month_starts(year: int) -> List[int]:
+    """Epoch milliseconds at the start of each month (index 1-12) of ``year``"""
+    days = [31, 29 if isleap(year) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    starts = [0, timegm((year, 1, 1, 0, 0, 0)) * 1000]
+    for length in days[:-1]:
+        starts.append(starts[-1] + length * 86400000)
+    return starts
+
+
+def parse_time(text: str, year: int) -> int:
+    """Epoch milliseconds for ``MM-DD hh:mm:ss[.mmm]`` (in ``year``) or an ISO 8601 time"""
+    match = re.match(r'^(\d\d)-(\d\d) (\d\d):(\d\d)(?::(\d\d)(?:\.(\d{1,3}))?)?$', text.strip())
+    if match is not None:
+        month, day, hour, minute = (int(group) for group in match.groups()[:4])
+        second = int(match.group(5) or 0)
+        millis = int((match.group(6) or '0').ljust(3, '0'))
+        return _month_starts(year)[month] + (((day - 1) * 24 + hour) * 60 + minute) * 60000 \
+            + second * 1000 + millis
+    moment = datetime.fromisoformat(text.strip())
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+def format_time(timestamp: int) -> str:
+    """Render epoch milliseconds as ``YYYY-MM-DD hh:mm:ss.mmm``"""
+    moment = datetime.fromtimestamp(timestamp / 1000, timezone.utc)
+    return moment.strftime('%Y-%m-%d %H:%M:%S.') + f'{timestamp % 1000:03d}'
+
+
+def source_size(path: str) -> int:
+    """Uncompressed size of a plain or block-compressed capture"""
+    if os.path.exists(index_path(path)):
+        with BlockGzipReader(path) as reader:
+            return len(reader)
+    return os.path.getsize(path)
+
+
+def read_chunks(path: str) -> Iterator[Tuple[int, bytes]]:
+    """Yield ``(offset, data)`` pieces of the uncompressed capture that end on a line boundary"""
+    if os.path.exists(index_path(path)):
+        reader = BlockGzipReader(path)
+        blocks = reader.iter_blocks()
+    else:
+        reader = open(path, 'rb')
+        blocks = iter(lambda: reader.read(READ_SIZE), b'')
+    with reader:
+        offset = 0
+        pending = b''
+        for block in blocks:
+            data = pending + block
+            cut = data.rfind(b'\n') + 1
+            if cut:
+                yield offset, data[:cut]
+                offset += cut
+            pending = data[cut:]
+        if pending:
+            yield offset, pending + b'\n'
+
+
+class LogRecords:
+    """Parsed log lines held column by column in typed arrays
+
+    Build one from a capture with ``build``, persist it with ``save`` and
+    reopen it with ``load``. ``select`` returns the row numbers matching a
+    filter and ``lines`` reads those rows back from the capture (plain or
+    block-compressed). Lines that do not parse (buffer separators,
+    continuation lines) get no row.
+    """
+
+    def __init__(self, kind: str, year: int, source: Optional[str] = None,
+                 source_size: int = 0):
+        self.kind = kind
+        self.year = year
+        self.source = source
+        self.source_size = source_size
+        self.tags = []
+        self.levels = []
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS}
+        self._codes = {'tag': {}, 'level': {}}
+
+    def __len__(self) -> int:
+        return len(self.columns['offset'])
+
+    def _code(self, column: str, value: bytes) -> int:
+        """Intern ``value`` in the ``tags``/``levels`` table"""
+        codes = self._codes[column]
+        code = codes.get(value)
+        if code is None:
+            table = self.tags if column == 'tag' else self.levels
+            code = codes[value] = len(table)
+            table.append(value.decode('utf-8', 'replace'))
+        return code
+
+    @classmethod
+    def build(cls, path: str, kind: Optional[str] = None,
+              year: Optional[int] = None, workers: Optional[int] = 1) -> 'LogRecords':
+        """Parse the capture at ``path``
+
+        logcat and syslog lines carry no year; ``year`` (default: the year
+        the file was last modified) is used to place them on the calendar.
+        Captures of at least ``PARALLEL_MIN_SIZE`` bytes are split at line
+        boundaries into one byte range per worker process (``workers``:
+        None for one per CPU); each worker maps the file instead of being
+        sent its data, and the partial results are merged in order.
+        """
+        kind = kind or guess_kind(path)
+        if year is None:
+            year = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).year
+        size = source_size(path)
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and size >= PARALLEL_MIN_SIZE:
+            ranges = split_ranges(path, size, workers)
+            # spawn: the caller may be a thread of a running event loop
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(len(ranges), mp_context=context) as pool:
+                parts = list(pool.map(_parse_range, *zip(*[(path, kind, year, start, end)
+                                                           for start, end in ranges])))
+            records = cls.merge(parts)
+        else:
+            records = _parse_range(path, kind, year, 0, size)
+        records.source = os.path.basename(path)
+        records.source_size = size
+        return records
+
+    @classmethod
+    def merge(cls, parts: List['LogRecords']) -> 'LogRecords':
+        """Concatenate stores parsed from consecutive ranges of one capture"""
+        records = cls(parts[0].kind, parts[0].year)
+        codes = {'tag': {}, 'level': {}}
+        for part in parts:
+            for column, table, merged in (('tag', part.tags, records.tags),
+                                          ('level', part.levels, records.levels)):
+                known = codes[column]
+                mapping = []
+                for value in table:
+                    if value not in known:
+                        known[value] = len(merged)
+                        merged.append(value)
+                    mapping.append(known[value])
+                values = part.columns[column]
+                if mapping != list(range(len(mapping))):
+                    values = array(values.typecode, (mapping[code] for code in values))
+                records.columns[column].extend(values)
+            for name, _ in COLUMNS:
+                if name not in ('tag', 'level'):
+                    records.columns[name].extend(part.columns[name])
+        return records
+
+    def _parse(self, data: bytes, base: int, start: int, end: int) -> None:
+        """Add the lines of ``data[start:end]`` (``data[0]`` is at ``base`` in the capture)"""
+        months = _month_starts(self.year)
+        columns = self.columns
+        timestamps, pids, tids = columns['timestamp'], columns['pid'], columns['tid']
+        levels, tags = columns['level'], columns['tag']
+        offsets, lengths = columns['offset'], columns['length']
+        code = self._code
+        if self.kind == 'logcat':
+            for match in LOGCAT_LINE.finditer(data, start, end):
+                month, day, hour, minute, second, millis, pid, tid, level, tag = match.groups()
+                timestamps.append(months[int(month)] + (((int(day) - 1) * 24 + int(hour)) * 60
+                                  + int(minute)) * 60000 + int(second) * 1000 + int(millis))
+                pids.append(int(pid))
+                tids.append(int(tid))
+                levels.append(code('level', level))
+                tags.append(code('tag', tag))
+                line_start = match.start()
+                line_end = data.find(b'\n', line_start, end)
+                offsets.append(base + line_start)
+                lengths.append((line_end if line_end >= 0 else end) - line_start)
+        else:
+            for match in SYSLOG_LINE.finditer(data, start, end):
+                month, day, hour, minute, second, fraction, tag, pid, level = match.groups()
+                millis = int((fraction or b'0')[:3].ljust(3, b'0'))
+                timestamps.append(months[MONTHS.get(month, 1)] + (((int(day) - 1) * 24
+                                  + int(hour)) * 60 + int(minute)) * 60000
+                                  + int(second) * 1000 + millis)
+                pids.append(int(pid))
+                tids.append(-1)
+                levels.append(code('level', level))
+                tags.append(code('tag', tag))
+                line_start = match.start()
+                line_end = data.find(b'\n', line_start, end)
+                offsets.append(base + line_start)
+                lengths.append((line_end if line_end >= 0 else end) - line_start)
+
+    def save(self, path: str) -> None:
+        """Atomically write the store: a JSON header line, then each column's raw bytes"""
+        header = {
+            'format': FORMAT,
+            'kind': self.kind,
+            'year': self.year,
+            'source': self.source,
+            'source_size': self.source_size,
+            'count': len(self),
+            'byteorder': sys.byteorder,
+            'columns': COLUMNS,
+            'levels': self.levels,
+            'tags': self.tags
+        }
+        partial = path + '.part'
+        with open(partial, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            for name, _ in COLUMNS:
+                self.columns[name].tofile(f)
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'LogRecords':
+        """Read a store written by ``save``"""
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            if header.get('format') != FORMAT:
+                raise ValueError(f'Not a {FORMAT} file: {path}')
+            records = cls(header['kind'], header['year'], header['source'],
+                          header['source_size'])
+            records.levels = header['levels']
+            records.tags = header['tags']
+            for name, typecode in header['columns']:
+                column = array(typecode)
+                column.fromfile(f, header['count'])
+                if header['byteorder'] != sys.byteorder:
+                    column.byteswap()
+                records.columns[name] = column
+        return records
+
+    def select(self, start: Optional[int] = None, end: Optional[int] = None,
+               tags: Optional[Iterable[str]] = None, pids: Optional[Iterable[int]] = None,
+               levels: Optional[Iterable[str]] = None) -> List[int]:
+        """Row numbers whose timestamp is in ``[start, end)`` and whose tag,
+        pid and level are among the given ones (None matches everything)"""
+        rows = range(len(self))
+        if tags is not None:
+            tags = set(tags)
+            wanted = {code for code, tag in enumerate(self.tags) if tag in tags}
+            column = self.columns['tag']
+            rows = [row for row in rows if column[row] in wanted]
+        if levels is not None:
+            levels = set(levels)
+            wanted = {code for code, level in enumerate(self.levels) if level in levels}
+            column = self.columns['level']
+            rows = [row for row in rows if column[row] in wanted]
+        if pids is not None:
+            wanted = set(pids)
+            column = self.columns['pid']
+            rows = [row for row in rows if column[row] in wanted]
+        if start is not None or end is not None:
+            low = start if start is not None else -2 ** 63
+            high = end if end is not None else 2 ** 63 - 1
+            column = self.columns['timestamp']
+            rows = [row for row in rows if low <= column[row] < high]
+        return list(rows)
+
+    def record(self, row: int) -> Dict[str, any]:
+        """One row as a dict"""
+        columns = self.columns
+        return {
+            'timestamp': format_time(columns['timestamp'][row]),
+            'pid': columns['pid'][row],
+            'tid': columns['tid'][row],
+            'level': self.levels[columns['level'][row]],
+            'tag': self.tags[columns['tag'][row]],
+            'offset': columns['offset'][row],
+            'length': columns['length'][row]
+        }
+
+    def lines(self, path: str, rows: Iterable[int]) -> Iterator[bytes]:
+        """Read the raw lines of ``rows`` back from the capture at ``path``"""
+        offsets, lengths = self.columns['offset'], self.columns['length']
+        if os.path.exists(index_path(path)):
+            with BlockGzipReader(path) as reader:
+                for row in rows:
+                    yield reader.read(offsets[row], lengths[row])
+        else:
+            with open(path, 'rb') as f:
+                for row in rows:
+                    f.seek(offsets[row])
+                    yield f.read(lengths[row])
+
+
+def split_ranges(path: str, size: int, parts: int) -> List[Tuple[int, int]]:
+    """Cut ``[0, size)`` of a capture into up to ``parts`` ranges that start on a line"""
+    cuts = [0]
+    with _open_capture(path) as capture:
+        for part in range(1, parts):
+            position = max(size * part // parts, cuts[-1])
+            while position < size:
+                piece = capture.read(position, 64 * 1024)
+                newline = piece.find(b'\n')
+                if newline >= 0:
+                    position += newline + 1
+                    break
+                position += len(piece)
+            if position >= size:
+                break
+            if position > cuts[-1]:
+                cuts.append(position)
+    cuts.append(size)
+    return list(zip(cuts, cuts[1:]))
+
+
+class _PlainCapture:
+    """``read(offset, size)`` over an uncompressed capture, like ``BlockGzipReader``"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+
+    def __enter__(self) -> '_PlainCapture':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._file.close()
+
+    def read(self, offset: int, size: int) -> bytes:
+        self._file.seek(offset)
+        return self._file.read(size)
+
+
+def _open_capture(path: str):
+    if os.path.exists(index_path(path)):
+        return BlockGzipReader(path)
+    return _PlainCapture(path)
+
+
+def _parse_range(path: str, kind: str, year: int, start: int, end: int) -> LogRecords:
+    """Parse the lines in ``[start, end)`` of a capture (a worker process entry point)
+
+    A plain capture is memory-mapped and parsed in place; a compressed one
+    is decoded piece by piece from its gzip blocks.
+    """
+    records = LogRecords(kind, year)
+    if start >= end:
+        return records
+    if not os.path.exists(index_path(path)):
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            records._parse(data, 0, start, end)
+        return records
+    with BlockGzipReader(path) as reader:
+        position = start
+        pending = b''
+        while position < end:
+            piece = reader.read(position, min(READ_SIZE, end - position))
+            if not piece:
+                break
+            position += len(piece)
+            data = pending + piece
+            cut = data.rfind(b'\n') + 1 if position < end else len(data)
+            records._parse(data, position - len(data), 0, cut)
+            pending = data[cut:]
+    return records
+
+
+def build_records(path: str, kind: Optional[str] = None,
+                  year: Optional[int] = None, workers: Optional[int] = 1) -> LogRecords:
+    """Parse ``path`` and save the store next to it as ``<path>.records``"""
+    records = LogRecords.build(path, kind, year, workers)
+    records.save(records_path(path))
+    return records
+
+
+def main():
+    """Record store CLI"""
+    parser = argparse.ArgumentParser(
+        description='Build and query columnar logcat/syslog record stores',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Parse a capture into logcat.txt.records
+  python log_records.py build forensic_output/logcat.txt
+
+  # Errors from ActivityManager in a ten-minute window
+  python log_records.py query forensic_output/logcat.txt --tag ActivityManager --level E \\
+      --since "10-17 10:00" --until "10-17 10:10"
+        """
+    )
+    parser.add_argument('command', choices=['build', 'query'])
+    parser.add_argument('capture', help='logcat.txt / syslog.txt (or their .gz)')
+    parser.add_argument('--kind', choices=['logcat', 'syslog'],
+                        help='Log format (default: guessed from the file name)')
+    parser.add_argument('--year', type=int,
+                        help='Year of the capture (default: the file modification year)')
+    parser.add_argument('--since', help='Start time, MM-DD hh:mm[:ss[.mmm]] or ISO 8601')
+    parser.add_argument('--until', help='End time (exclusive), same formats as --since')
+    parser.add_argument('--tag', nargs='+', help='Tags (syslog: process names) to keep')
+    parser.add_argument('--pid', nargs='+', type=int, help='Process IDs to keep')
+    parser.add_argument('--level', nargs='+', help='Levels to keep (V/D/I/W/E/F or Notice, Error, ...)')
+    parser.add_argument('--json', action='store_true', help='Print matching records as JSON lines')
+    parser.add_argument('--workers', type=int,
+                        help='Processes for parsing large captures (default: one per CPU)')
+    args = parser.parse_args()
+
+    store = records_path(args.capture)
+    if args.command == 'build':
+        records = build_records(args.capture, args.kind, args.year, args.workers)
+        print(f"Parsed {len(records)} records into {store}")
+        return
+
+    if os.path.exists(store):
+        records = LogRecords.load(store)
+        if records.source_size != source_size(args.capture):
+            records = build_records(args.capture, args.kind, args.year, args.workers)
+    else:
+        records = build_records(args.capture, args.kind, args.year, args.workers)
+    rows = records.select(
+        start=parse_time(args.since, records.year) if args.since else None,
+        end=parse_time(args.until, records.year) if args.until else None,
+        tags=args.tag,
+        pids=args.pid,
+        levels=args.level
+    )
+    out = sys.stdout.buffer
+    if args.json:
+        for row in rows:
+            out.write(json.dumps(records.record(row)).encode('utf-8') + b'\n')
+    else:
+        for line in records.lines(args.capture, rows):
+            out.write(line + b'\n')
+    out.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Metadata cache with TTL and size-bounded eviction
+Keeps tool discovery results and static per-device metadata between calls,
+optionally persisted to a JSON file so separate CLI runs can share it
+"""
+
+import base64
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+# Seconds an entry stays valid
+DEFAULT_TTL = 300
+
+# Entries kept before the least recently used ones are evicted
+DEFAULT_MAX_ENTRIES = 256
+
+
+def _encode(value: any) -> any:
+    """Make ``value`` JSON-serialisable (bytes become tagged base64)"""
+    if isinstance(value, bytes):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    return value
+
+
+def _decode(value: any) -> any:
+    """Reverse ``_encode``"""
+    if isinstance(value, dict):
+        if set(value) == {'__bytes__'}:
+            return base64.b64decode(value['__bytes__'])
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+class MetadataCache:
+    """Least-recently-used key/value cache whose entries expire after ``ttl`` seconds
+
+    Keys are strings; a common prefix (``device:<id>:``) groups the entries
+    that ``invalidate`` drops together. Expiry uses wall-clock time so a
+    persisted cache stays meaningful across processes. With ``path`` set,
+    the cache is loaded from that file and ``save`` writes it back
+    atomically; a missing or unreadable file simply starts empty.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()
+        self._dirty = False
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: str) -> Optional[any]:
+        """Return the value for ``key``, or None if it is missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            self._dirty = True
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value: any, ttl: Optional[float] = None) -> None:
+        """Store ``value`` (not None) under ``key`` for ``ttl`` seconds (default: ``self.ttl``)"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def invalidate(self, prefix: str = '') -> int:
+        """Drop every entry whose key starts with ``prefix``; return how many"""
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+        if keys:
+            self._dirty = True
+        return len(keys)
+
+    def save(self) -> None:
+        """Write unexpired entries to ``path`` if anything changed"""
+        if not self.path or not self._dirty:
+            return
+        now = time.time()
+        entries = [[key, expires, _encode(value)]
+                   for key, (expires, value) in self._entries.items() if expires > now]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        partial = self.path + '.part'
+        with open(partial, 'w') as f:
+            json.dump({'entries': entries}, f)
+        os.replace(partial, self.path)
+        self._dirty = False
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)['entries']
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        now = time.time()
+        for key, expires, value in entries[-self.max_entries:]:
+            if expires > now:
+                self._entries[key] = (expires, _decode(value))
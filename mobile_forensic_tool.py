@@ -5,12 +5,67 @@ Supports Android and iOS devices for forensic analysis and security testing
 """
 
 import argparse
+import asyncio
+import csv
+import io
+import hashlib
+import heapq
+import posixpath
+import shlex
 import subprocess
 import sys
 import os
 import json
+import re
+import shutil
+import time
+from collections import deque
+from datetime import datetime, timezone
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from adb_client import SHELL_SERVICE, AdbClient, AdbError, AdbServiceProcess, read_device_updates
+from artifact_store import ArtifactStore
+from block_gzip import BlockGzipReader, BlockGzipWriter, index_path, read_index, write_index
+from case_index import CaseIndex
+from log_records import build_records, read_chunks, records_path
+from metadata_cache import DEFAULT_TTL, MetadataCache
+from pipeline import STEPS, PlanError, load_plugins, parse_plan, produced, register_step, run_plan
+from rpc_server import RpcServer
+from tar_stream import TarInventory
+from timeline import build_timeline
+
+
+# Read size used when streaming command output straight to disk
+CHUNK_SIZE = 64 * 1024
+
+# Leading timestamp of a threadtime logcat line (``MM-DD hh:mm:ss.mmm``)
+LOGCAT_TIMESTAMP = re.compile(rb'^(\d\d-\d\d \d\d:\d\d:\d\d\.\d{3})')
+
+# Digests available for the chain-of-custody manifest; SHA-256 is always computed
+HASH_ALGORITHMS = ['md5', 'sha1', 'sha256']
+
+# ``pm list packages`` flags tried in turn (versionCode needs Android 9, -U Android 8)
+PACKAGE_LIST_FLAGS = [['-f', '-U', '-i', '--show-versioncode'], ['-f', '-i']]
+
+# Columns of package_inventory.csv (package_inventory.json has the same keys)
+PACKAGE_FIELDS = ['package', 'path', 'version_code', 'version_name', 'uid', 'installer',
+                  'first_install_time', 'last_update_time', 'target_sdk', 'system']
+
+# Concurrent shell streams and per-service timeout (seconds) of the dumpsys snapshot
+DUMPSYS_STREAMS = 8
+DUMPSYS_TIMEOUT = 20
+
+# Configuration read by the CLI unless --config points elsewhere
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+
+# Extraction steps run when no plan is configured (see pipeline); storage and
+# logcat_live only run when --acquire / --live-capture are given. The shipped
+# config.json adds the slower package_inventory step.
+DEFAULT_PLANS = {
+    'android': ['device_info', 'installed_packages', 'logcat', 'storage', 'logcat_live'],
+    'ios': ['device_info', 'installed_apps', 'syslog']
+}
 
 
 class Platform(Enum):
@@ -19,12 +74,444 @@ class Platform(Enum):
     IOS = "ios"
 
 
+class CommandTracer:
+    """Records a span for every external command the tool runs
+    
+    Each span holds the argv, start offset and duration (seconds), exit
+    code, bytes read from stdout, whether the timeout was hit and any
+    error. ``summary`` aggregates spans per step and ``chrome_trace``
+    exports them in the Chrome trace event format (chrome://tracing,
+    Perfetto), with one lane per device.
+    """
+    
+    def __init__(self):
+        self.spans = []
+        self._origin = time.perf_counter()
+    
+    def start(self, cmd: List[str], name: Optional[str] = None) -> Dict[str, any]:
+        """Open a span for ``cmd``; ``name`` defaults to the command without its device ID"""
+        device = None
+        for flag in ('-s', '-u'):
+            if flag in cmd[:-1]:
+                device = cmd[cmd.index(flag) + 1]
+        span = {
+            'name': name or ' '.join(arg for arg in cmd if arg not in ('-s', '-u', device)),
+            'argv': list(cmd),
+            'device': device,
+            'transport': None,
+            'start': time.perf_counter() - self._origin,
+            'duration': None,
+            'exit_code': None,
+            'bytes_out': 0,
+            'timed_out': False,
+            'error': None
+        }
+        self.spans.append(span)
+        return span
+    
+    def finish(self, span: Dict[str, any], exit_code: Optional[int] = None,
+               bytes_out: int = 0, error: Optional[BaseException] = None) -> None:
+        """Close a span"""
+        span['duration'] = time.perf_counter() - self._origin - span['start']
+        span['exit_code'] = exit_code
+        span['bytes_out'] = bytes_out
+        if error is not None:
+            span['timed_out'] = isinstance(error, subprocess.TimeoutExpired)
+            span['error'] = describe_failure(error)
+    
+    def summary(self) -> List[Dict[str, any]]:
+        """Per-step latency breakdown, slowest total first"""
+        steps = {}
+        for span in self.spans:
+            if span['duration'] is None:
+                continue
+            step = steps.setdefault(span['name'], {
+                'name': span['name'], 'count': 0, 'total_s': 0.0, 'max_s': 0.0,
+                'bytes_out': 0, 'failures': 0, 'timeouts': 0
+            })
+            step['count'] += 1
+            step['total_s'] += span['duration']
+            step['max_s'] = max(step['max_s'], span['duration'])
+            step['bytes_out'] += span['bytes_out']
+            step['failures'] += span['error'] is not None or span['exit_code'] not in (0, None)
+            step['timeouts'] += span['timed_out']
+        for step in steps.values():
+            step['mean_s'] = step['total_s'] / step['count']
+        return sorted(steps.values(), key=lambda step: step['total_s'], reverse=True)
+    
+    def format_summary(self) -> str:
+        """Render ``summary`` as a text table"""
+        lines = [f"{'step':<40} {'count':>5} {'total s':>9} {'mean s':>8} {'max s':>8} "
+                 f"{'MB out':>8} {'fail':>4} {'t/o':>4}"]
+        for step in self.summary():
+            lines.append(f"{step['name'][:40]:<40} {step['count']:>5} {step['total_s']:>9.3f} "
+                         f"{step['mean_s']:>8.3f} {step['max_s']:>8.3f} "
+                         f"{step['bytes_out'] / 1e6:>8.2f} {step['failures']:>4} "
+                         f"{step['timeouts']:>4}")
+        return '\n'.join(lines)
+    
+    def chrome_trace(self) -> Dict[str, any]:
+        """Spans as a Chrome trace event document"""
+        pid = os.getpid()
+        lanes = {}
+        events = []
+        for span in self.spans:
+            if span['duration'] is None:
+                continue
+            lane = span['device'] or 'host'
+            if lane not in lanes:
+                lanes[lane] = len(lanes) + 1
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid,
+                               'tid': lanes[lane], 'args': {'name': lane}})
+            events.append({
+                'name': span['name'],
+                'cat': 'command',
+                'ph': 'X',
+                'ts': round(span['start'] * 1e6),
+                'dur': round(span['duration'] * 1e6),
+                'pid': pid,
+                'tid': lanes[lane],
+                'args': {key: span[key] for key in
+                         ('argv', 'transport', 'exit_code', 'bytes_out', 'timed_out', 'error')}
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+    
+    def export(self, path: str) -> None:
+        """Write ``chrome_trace`` to ``path``"""
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def describe_failure(error: BaseException) -> str:
+    """Short human-readable reason for a failed command"""
+    if isinstance(error, subprocess.TimeoutExpired):
+        return f'timed out after {error.timeout}s'
+    if isinstance(error, subprocess.CalledProcessError):
+        return f'exit code {error.returncode}'
+    if isinstance(error, FileNotFoundError):
+        return f'{error.filename or "command"} not found'
+    return str(error) or type(error).__name__
+
+
+class ArtifactWriter:
+    """Write one artifact, hashing it in the same pass
+    
+    Data goes to ``<path>.part`` and ``commit`` renames it into place. With
+    ``append``, data is added to the existing file instead (the digests are
+    seeded from what is already on disk) and ``discard`` truncates it back.
+    With ``compress``, the artifact is stored as ``<path>.gz`` in
+    independently decodable gzip blocks with a sidecar index; ``size`` and
+    ``digests`` then describe the compressed file and the SHA-256 of the
+    content as produced by the device is recorded alongside. Appending to
+    an artifact shared through an ``ArtifactStore`` first gives it a
+    private copy.
+    """
+    
+    def __init__(self, path: str, hash_algorithms: List[str],
+                 compress: bool = False, append: bool = False):
+        self.path = path + '.gz' if compress else path
+        self.append = append
+        self.hashers = {name: hashlib.new(name) for name in hash_algorithms}
+        self.size = 0
+        self.content_hasher = hashlib.sha256() if compress else None
+        self.content_size = 0
+        self._compressor = None
+        blocks = []
+        if append:
+            ArtifactStore.unshare(self.path)
+            with open(self.path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    self._hash(chunk)
+            if compress:
+                blocks = read_index(self.path)
+                with BlockGzipReader(self.path) as reader:
+                    for data in reader.iter_blocks():
+                        self.content_hasher.update(data)
+                        self.content_size += len(data)
+            self._target = self.path
+        else:
+            self._target = self.path + '.part'
+        self._original_size = self.size
+        self._file = open(self._target, 'ab' if append else 'wb')
+        if compress:
+            self._compressor = BlockGzipWriter(self._write_disk, blocks=blocks)
+    
+    def write(self, data: bytes) -> None:
+        """Add device output to the artifact"""
+        if self._compressor is None:
+            self._write_disk(data)
+            return
+        self.content_hasher.update(data)
+        self.content_size += len(data)
+        self._compressor.write(data)
+    
+    def _write_disk(self, data: bytes) -> None:
+        self._file.write(data)
+        self._hash(data)
+    
+    def _hash(self, data: bytes) -> None:
+        self.size += len(data)
+        for hasher in self.hashers.values():
+            hasher.update(data)
+    
+    def commit(self) -> None:
+        """Finish the artifact and move it into place"""
+        if self._compressor is not None:
+            self._compressor.close()
+        self._file.close()
+        if not self.append:
+            os.replace(self._target, self.path)
+        if self._compressor is not None:
+            write_index(self.path, self._compressor.blocks, self._compressor.block_size)
+    
+    def discard(self) -> None:
+        """Drop everything written since the writer was opened"""
+        self._file.close()
+        if self.append:
+            with open(self.path, 'r+b') as f:
+                f.truncate(self._original_size)
+        elif os.path.exists(self._target):
+            os.remove(self._target)
+    
+    def manifest_fields(self) -> Dict[str, any]:
+        """Name, size and digests for the artifact's manifest entry"""
+        fields = {
+            'name': os.path.basename(self.path),
+            'size': self.size,
+            'digests': {name: h.hexdigest() for name, h in sorted(self.hashers.items())}
+        }
+        if self._compressor is not None:
+            fields['compression'] = {
+                'format': 'gzip-blocks',
+                'index': os.path.basename(index_path(self.path)),
+                'block_size': self._compressor.block_size,
+                'uncompressed_size': self.content_size,
+                'uncompressed_sha256': self.content_hasher.hexdigest()
+            }
+        return fields
+
+
+class ExtractionState:
+    """Per-output-directory record of completed artifacts
+    
+    Saved as ``.extraction_state.json`` after every finished step, so an
+    interrupted or repeated extraction into the same directory can skip
+    artifacts that are still intact on disk and resume logcat where the
+    previous capture stopped. Failed steps are collected in ``errors``
+    for the extraction result.
+    
+    An artifact counts as intact when its size and modification time match
+    the record; its recorded digests are carried over unchecked. With
+    ``verify``, reused artifacts are re-hashed as well and recaptured when
+    a digest differs.
+    """
+    
+    FILENAME = '.extraction_state.json'
+    
+    def __init__(self, output_dir: str, device_id: str, incremental: bool = False,
+                 verify: bool = False):
+        self.path = os.path.join(output_dir, self.FILENAME)
+        self.device_id = device_id
+        self.incremental = incremental
+        self.verify = verify
+        self._verified = set()
+        self.items = {}
+        self.skipped = []
+        self.errors = []
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            if state.get('device_id') == device_id:
+                self.items = state.get('items', {})
+        except (OSError, ValueError):
+            pass
+    
+    def reusable(self, name: str) -> Optional[Dict[str, any]]:
+        """Return the recorded manifest entry for ``name`` if the file is unchanged"""
+        record = self.items.get(name)
+        if not self.incremental or record is None:
+            return None
+        try:
+            stat = os.stat(os.path.join(os.path.dirname(self.path), name))
+        except OSError:
+            return None
+        if stat.st_size != record['entry']['size'] or stat.st_mtime_ns != record['mtime_ns']:
+            return None
+        if self.verify and name not in self._verified:
+            if not self._digests_match(name, record['entry'].get('digests', {})):
+                return None
+            self._verified.add(name)
+        return record['entry']
+    
+    def _digests_match(self, name: str, digests: Dict[str, str]) -> bool:
+        """Re-hash the stored file and compare it with its recorded digests"""
+        try:
+            hashers = {algorithm: hashlib.new(algorithm) for algorithm in digests}
+            with open(os.path.join(os.path.dirname(self.path), name), 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    for hasher in hashers.values():
+                        hasher.update(chunk)
+        except (OSError, ValueError):
+            return False
+        return bool(hashers) and all(
+            hasher.hexdigest() == digests[algorithm] for algorithm, hasher in hashers.items())
+    
+    def skip(self, name: str) -> Optional[Dict[str, any]]:
+        """Like ``reusable``, but also count the artifact as skipped"""
+        entry = self.reusable(name)
+        if entry is not None:
+            self.skipped.append(name)
+        return entry
+    
+    def fail(self, name: str, reason: any) -> None:
+        """Note that the step producing ``name`` failed"""
+        if isinstance(reason, BaseException):
+            reason = describe_failure(reason)
+        self.errors.append(f'{name}: {reason}')
+    
+    def extra(self, name: str) -> Dict[str, any]:
+        """Step-specific data saved with an artifact (e.g. the logcat resume point)"""
+        return self.items.get(name, {}).get('extra', {})
+    
+    def record(self, entry: Dict[str, any], **extra) -> None:
+        """Remember a finished artifact and save the state file"""
+        path = os.path.join(os.path.dirname(self.path), entry['name'])
+        self.items[entry['name']] = {
+            'entry': entry,
+            'mtime_ns': os.stat(path).st_mtime_ns,
+            'extra': extra
+        }
+        partial = self.path + '.part'
+        with open(partial, 'w') as f:
+            json.dump({'device_id': self.device_id, 'items': self.items}, f, indent=2)
+        os.replace(partial, self.path)
+
+
+class LogcatResumeFilter:
+    """Drop the entries a ``logcat -T <timestamp>`` stream repeats
+    
+    ``-T`` includes entries at exactly the resume timestamp, so the first
+    ``seen`` timestamped lines at that time (already captured last run) and
+    any buffer separator lines before them are dropped. Everything after
+    that point passes through unchanged.
+    """
+    
+    def __init__(self, timestamp: str, seen: int):
+        self.timestamp = timestamp.encode()
+        self.remaining = seen
+        self._pending = b''
+    
+    def feed(self, chunk: bytes) -> bytes:
+        """Filter the next chunk of output"""
+        if self.remaining <= 0 and not self._pending:
+            return chunk
+        data = self._pending + chunk
+        cut = data.rfind(b'\n') + 1
+        self._pending = data[cut:]
+        return self._filter(data[:cut])
+    
+    def flush(self) -> bytes:
+        """Filter whatever is left at the end of the stream"""
+        data, self._pending = self._pending, b''
+        return self._filter(data)
+    
+    def _filter(self, data: bytes) -> bytes:
+        if self.remaining <= 0:
+            return data
+        lines = data.splitlines(keepends=True)
+        for i, line in enumerate(lines):
+            match = LOGCAT_TIMESTAMP.match(line)
+            if match is None:
+                continue
+            if match.group(1) != self.timestamp:
+                self.remaining = 0
+                return b''.join(lines[i:])
+            self.remaining -= 1
+            if self.remaining == 0:
+                return b''.join(lines[i + 1:])
+        return b''
+
+
+class LiveCapture:
+    """Limits for streaming a live log (logcat, idevicesyslog)
+    
+    The stream is read for ``duration`` seconds or until ``max_bytes`` have
+    arrived, whichever comes first. With ``segment_bytes`` the output is
+    split into numbered segments, rotated at line boundaries; with
+    ``ring_bytes`` only the newest segments totalling about that size are
+    kept (segments default to a quarter of the ring). Data is written as
+    it arrives, so memory use does not depend on how much the device logs.
+    """
+    
+    def __init__(self, duration: float = 5.0, max_bytes: Optional[int] = None,
+                 segment_bytes: Optional[int] = None, ring_bytes: Optional[int] = None):
+        self.duration = duration
+        self.max_bytes = max_bytes
+        self.ring_bytes = ring_bytes
+        if ring_bytes and not segment_bytes:
+            segment_bytes = max(ring_bytes // 4, CHUNK_SIZE)
+        self.segment_bytes = segment_bytes
+    
+    def segment_name(self, base: str, number: int) -> str:
+        """File name of segment ``number`` of the ``base`` stream"""
+        if not self.segment_bytes:
+            return f'{base}.txt'
+        return f'{base}.{number:03d}.txt'
+
+
 class MobileForensicTool:
     """Main class for mobile forensic operations"""
     
-    def __init__(self, platform: Platform):
+    def __init__(self, platform: Platform,
+                 hash_algorithms: Optional[List[str]] = None,
+                 adb_server: Optional[str] = None,
+                 compress: bool = False,
+                 tracer: Optional[CommandTracer] = None,
+                 cache: Optional[MetadataCache] = None,
+                 parse_logs: bool = False,
+                 parse_workers: Optional[int] = None,
+                 live_capture: Optional[LiveCapture] = None,
+                 acquire_paths: Optional[List[str]] = None,
+                 acquire_streams: int = 4,
+                 extraction_config: Optional[Dict[str, any]] = None,
+                 on_event: Optional[Callable[[Dict[str, any]], None]] = None,
+                 store: Optional[ArtifactStore] = None,
+                 verify: bool = False):
         self.platform = platform
         self.device_id = None
+        self.hash_algorithms = sorted(set(hash_algorithms or []) | {'sha256'})
+        # Store artifacts block-compressed (see ArtifactWriter)
+        self.compress = compress
+        # Records a span per external command when set (see CommandTracer)
+        self.tracer = tracer
+        # Build columnar record stores for logcat/syslog after extraction,
+        # large captures in this many processes (None: one per CPU)
+        self.parse_logs = parse_logs
+        self.parse_workers = parse_workers
+        # Live log streaming; Android adds a live logcat only when this is set
+        self.live_capture = live_capture
+        # Android storage paths to acquire as tar streams, and how many streams at once
+        self.acquire_paths = acquire_paths or []
+        self.acquire_streams = max(1, acquire_streams)
+        # Optional host:port of an adb server to talk to directly
+        self.adb_client = AdbClient.from_address(adb_server) if adb_server else None
+        # Tool discovery and static device metadata (see MetadataCache)
+        self.cache = cache if cache is not None else MetadataCache()
+        self._dump_fetches = {}
+        # Device dumps this instance fetched itself (see _device_dump)
+        self._own_dumps = {}
+        # Extraction plan: ``data_extraction`` steps and ``max_parallel_steps``
+        # from the platform's config section (raises PlanError when invalid)
+        extraction_config = extraction_config or {}
+        self.plan = parse_plan(platform.value, extraction_config.get(
+            'data_extraction', DEFAULT_PLANS[platform.value]))
+        self.max_parallel_steps = extraction_config.get('max_parallel_steps')
+        # Receives ``artifact``, ``step`` and ``extraction`` events while extracting
+        self.on_event = on_event
+        # Content-addressed store that identical artifacts are hardlinked from
+        self.store = store
+        # Re-hash artifacts an incremental run reuses instead of trusting size and mtime
+        self.verify = verify
         
     def check_dependencies(self) -> bool:
         """Check if required tools are available"""
@@ -36,45 +523,80 @@ class MobileForensicTool:
     
     def _check_adb(self) -> bool:
         """Check if ADB is available"""
-        try:
-            result = subprocess.run(['adb', 'version'], 
-                                  capture_output=True, 
-                                  text=True, 
-                                  timeout=5)
-            return result.returncode == 0
-        except (subprocess.SubprocessError, FileNotFoundError):
-            return False
+        return self.discover_tool('adb', ['version'])['available']
     
     def _check_ios_tools(self) -> bool:
         """Check if iOS tools are available"""
+        # Check for ideviceinfo (part of libimobiledevice)
+        return self.discover_tool('ideviceinfo', ['--version'])['available']
+    
+    def discover_tool(self, name: str, version_args: List[str]) -> Dict[str, any]:
+        """Resolve ``name`` on PATH and read its version
+        
+        Returns ``path``, ``version`` (first line of the version output)
+        and ``available``. The result is cached and reused while the
+        resolved executable keeps the same path and mtime, so a tool that
+        is replaced or moved is probed again.
+        """
+        path = shutil.which(name)
+        if path is None:
+            return {'path': None, 'version': None, 'available': False}
+        mtime_ns = os.stat(path).st_mtime_ns
+        key = f'tool:{name}'
+        cached = self.cache.get(key)
+        if cached and cached['path'] == path and cached['mtime_ns'] == mtime_ns:
+            return cached
+        tool = {'path': path, 'mtime_ns': mtime_ns, 'version': None, 'available': False}
         try:
-            # Check for ideviceinfo (part of libimobiledevice)
-            result = subprocess.run(['ideviceinfo', '--version'], 
-                                  capture_output=True, 
-                                  text=True, 
-                                  timeout=5)
-            return result.returncode == 0
+            result = self._run_traced([path] + version_args, 
+                                      capture_output=True, 
+                                      text=True, 
+                                      timeout=5)
+            if result.returncode == 0:
+                tool['available'] = True
+                tool['version'] = (result.stdout.strip().splitlines() or [None])[0]
         except (subprocess.SubprocessError, FileNotFoundError):
-            return False
+            pass
+        self.cache.set(key, tool)
+        return tool
+    
+    def invalidate_device(self, device_id: str) -> None:
+        """Forget the cached metadata of ``device_id`` (e.g. after it reconnects)"""
+        self.cache.invalidate(f'device:{device_id}:')
+    
+    def _note_connected(self, devices: List[Dict[str, str]]) -> None:
+        """Invalidate cached metadata of devices that appeared or vanished since the last listing"""
+        key = f'devices:{self.platform.value}'
+        current = sorted(device['id'] for device in devices)
+        previous = self.cache.get(key)
+        if previous is not None:
+            for device_id in set(previous) ^ set(current):
+                self.invalidate_device(device_id)
+        self.cache.set(key, current)
     
     def list_devices(self) -> List[Dict[str, str]]:
         """List connected devices"""
+        return self._run_sync(self.list_devices_async())
+    
+    async def list_devices_async(self) -> List[Dict[str, str]]:
+        """List connected devices (asyncio counterpart of ``list_devices``)"""
         if self.platform == Platform.ANDROID:
-            return self._list_android_devices()
+            devices = await self._list_android_devices()
         elif self.platform == Platform.IOS:
-            return self._list_ios_devices()
-        return []
+            devices = await self._list_ios_devices()
+        else:
+            return []
+        self._note_connected(devices)
+        return devices
     
-    def _list_android_devices(self) -> List[Dict[str, str]]:
+    async def _list_android_devices(self) -> List[Dict[str, str]]:
         """List connected Android devices"""
         devices = []
         try:
-            result = subprocess.run(['adb', 'devices', '-l'], 
-                                  capture_output=True, 
-                                  text=True, 
-                                  timeout=10)
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')[1:]  # Skip header
+            returncode, stdout = await self._run_command(['adb', 'devices', '-l'],
+                                                         timeout=10)
+            if returncode == 0:
+                lines = stdout.strip().split('\n')[1:]  # Skip header
                 for line in lines:
                     if line.strip() and 'device' in line:
                         parts = line.split()
@@ -88,16 +610,14 @@ class MobileForensicTool:
             pass
         return devices
     
-    def _list_ios_devices(self) -> List[Dict[str, str]]:
+    async def _list_ios_devices(self) -> List[Dict[str, str]]:
         """List connected iOS devices"""
         devices = []
         try:
-            result = subprocess.run(['idevice_id', '-l'], 
-                                  capture_output=True, 
-                                  text=True, 
-                                  timeout=10)
-            if result.returncode == 0:
-                for device_id in result.stdout.strip().split('\n'):
+            returncode, stdout = await self._run_command(['idevice_id', '-l'],
+                                                         timeout=10)
+            if returncode == 0:
+                for device_id in stdout.strip().split('\n'):
                     if device_id.strip():
                         devices.append({
                             'id': device_id.strip(),
@@ -108,60 +628,218 @@ class MobileForensicTool:
             pass
         return devices
     
+    def watch(self, callback: Callable[[Dict[str, any]], None],
+              output_dir: Optional[str] = None, max_workers: int = 4,
+              poll_interval: float = 2.0, incremental: bool = False) -> None:
+        """Report device connect/disconnect events until interrupted
+        
+        See ``watch_async``.
+        """
+        self._run_sync(self.watch_async(callback, output_dir, max_workers,
+                                        poll_interval, incremental))
+    
+    async def watch_async(self, callback: Callable[[Dict[str, any]], None],
+                          output_dir: Optional[str] = None, max_workers: int = 4,
+                          poll_interval: float = 2.0, incremental: bool = False) -> None:
+        """Pass each device event to ``callback`` as it happens
+        
+        With ``output_dir`` set, every device that becomes ready is extracted
+        into its own subdirectory as soon as it appears (at most
+        ``max_workers`` at a time) and an ``extraction_finished`` event
+        carries the result. ``incremental`` is passed on to ``extract_data``,
+        so a reconnecting device only fetches what is new.
+        """
+        workers = asyncio.Semaphore(max(1, max_workers))
+        extractions = set()
+        ready = 'device' if self.platform == Platform.ANDROID else 'connected'
+        
+        async def extract(device: Dict[str, str]) -> None:
+            device_dir = os.path.join(output_dir, self._device_dir_name(device['id']))
+            async with workers:
+                try:
+                    result = await self.extract_data_async(device['id'], device_dir,
+                                                           incremental)
+                except Exception as e:
+                    result = {'device_id': device['id'], 'output_dir': device_dir,
+                              'extracted_items': [], 'errors': [f'Extraction failed: {str(e)}']}
+            callback({'event': 'extraction_finished', 'device': device,
+                      'timestamp': self._timestamp(), 'result': result})
+        
+        try:
+            async for event in self.watch_devices_async(poll_interval):
+                callback(event)
+                device = event['device']
+                if (output_dir and event['event'] in ('connected', 'changed')
+                        and device['status'] == ready):
+                    task = asyncio.ensure_future(extract(device))
+                    extractions.add(task)
+                    task.add_done_callback(extractions.discard)
+        finally:
+            for task in list(extractions):
+                task.cancel()
+            if extractions:
+                await asyncio.gather(*extractions, return_exceptions=True)
+    
+    async def watch_devices_async(self, poll_interval: float = 2.0) -> AsyncIterator[Dict[str, any]]:
+        """Yield ``connected``, ``disconnected`` and ``changed`` device events
+        
+        Android devices are tracked with ``host:track-devices`` (through the
+        adb server or ``adb track-devices``), so events arrive as soon as the
+        server sees them. iOS, and Android when tracking is unavailable,
+        falls back to polling ``list_devices`` every ``poll_interval`` seconds.
+        """
+        known = {}
+        snapshots = self._device_snapshots(poll_interval)
+        try:
+            async for snapshot in snapshots:
+                current = {device['id']: device for device in snapshot}
+                for device_id, device in current.items():
+                    if device_id not in known:
+                        self.invalidate_device(device_id)
+                        yield self._device_event('connected', device)
+                    elif known[device_id]['status'] != device['status']:
+                        self.invalidate_device(device_id)
+                        yield self._device_event('changed', device)
+                for device_id, device in known.items():
+                    if device_id not in current:
+                        self.invalidate_device(device_id)
+                        yield self._device_event('disconnected', device)
+                known = current
+        finally:
+            # Close the tracking stream (and its adb child) with the iterator
+            await snapshots.aclose()
+    
+    def _emit(self, event: str, **fields) -> None:
+        """Pass a progress event to ``on_event``, if set"""
+        if self.on_event is not None:
+            self.on_event({'event': event, **fields, 'timestamp': self._timestamp()})
+    
+    def _device_event(self, event: str, device: Dict[str, str]) -> Dict[str, any]:
+        """Build a device tracking event"""
+        return {'event': event, 'device': device, 'timestamp': self._timestamp()}
+    
+    async def _device_snapshots(self, poll_interval: float) -> AsyncIterator[List[Dict[str, str]]]:
+        """Yield the full device list whenever it may have changed"""
+        if self.platform == Platform.ANDROID:
+            try:
+                proc = await self._spawn(['adb', 'track-devices'])
+            except (OSError, subprocess.SubprocessError):
+                proc = None
+            if proc is not None:
+                try:
+                    async for devices in read_device_updates(proc.stdout):
+                        yield [dict(device, platform='Android') for device in devices]
+                finally:
+                    await self._reap(proc)
+        # Polling fallback (iOS, or the tracking stream is unavailable or ended)
+        while True:
+            yield await self.list_devices_async()
+            await asyncio.sleep(poll_interval)
+    
     def get_device_info(self, device_id: str) -> Optional[Dict[str, str]]:
         """Get device information"""
+        return self._run_sync(self.get_device_info_async(device_id))
+    
+    async def get_device_info_async(self, device_id: str) -> Optional[Dict[str, str]]:
+        """Get device information (asyncio counterpart of ``get_device_info``)"""
         self.device_id = device_id
         if self.platform == Platform.ANDROID:
-            return self._get_android_info(device_id)
+            return await self._get_android_info(device_id)
         elif self.platform == Platform.IOS:
-            return self._get_ios_info(device_id)
+            return await self._get_ios_info(device_id)
         return None
     
-    def _get_android_info(self, device_id: str) -> Optional[Dict[str, str]]:
+    async def _get_android_info(self, device_id: str) -> Optional[Dict[str, str]]:
         """Get Android device information"""
         info = {'device_id': device_id, 'platform': 'Android'}
+        # Device properties, taken from a single getprop dump
+        properties = {
+            'model': 'ro.product.model',
+            'manufacturer': 'ro.product.manufacturer',
+            'android_version': 'ro.build.version.release',
+            'sdk_version': 'ro.build.version.sdk',
+            'serial': 'ro.serialno'
+        }
+        
         try:
-            # Get device properties
-            properties = {
-                'model': 'ro.product.model',
-                'manufacturer': 'ro.product.manufacturer',
-                'android_version': 'ro.build.version.release',
-                'sdk_version': 'ro.build.version.sdk',
-                'serial': 'ro.serialno'
-            }
-            
-            for key, prop in properties.items():
-                result = subprocess.run(
-                    ['adb', '-s', device_id, 'shell', 'getprop', prop],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    info[key] = result.stdout.strip()
+            props = await self._get_android_properties(device_id)
         except (subprocess.SubprocessError, FileNotFoundError):
-            pass
+            props = {}
+        for key, prop in properties.items():
+            if prop in props:
+                info[key] = props[prop]
         return info
     
-    def _get_ios_info(self, device_id: str) -> Optional[Dict[str, str]]:
+    async def _get_android_properties(self, device_id: str) -> Dict[str, str]:
+        """Fetch all Android system properties in one getprop round-trip"""
+        dump = await self._device_dump(device_id, ['adb', '-s', device_id, 'shell', 'getprop'])
+        return self._parse_getprop(dump['output'].decode('utf-8', errors='replace'))
+    
+    async def _device_dump(self, device_id: str, cmd: List[str],
+                           own: bool = False) -> Dict[str, any]:
+        """Run a static device metadata command (getprop, ideviceinfo), cached
+        
+        The raw output is cached under the device with its command and
+        capture times, so ``get_device_info`` and a later extraction share
+        one round-trip; the extraction writes it to ``device_info.txt``.
+        With ``own``, a cached dump is used only if this tool fetched it:
+        one loaded from a shared ``--cache`` file may predate the extraction
+        by up to the TTL, and a full dump includes volatile properties.
+        Concurrent callers wait for the same in-flight command. Raises
+        ``CalledProcessError`` on a non-zero exit.
+        """
+        key = f'device:{device_id}:{cmd[0]}'
+        dump = self.cache.get(key)
+        if dump is not None and (not own or dump is self._own_dumps.get(key)):
+            return dump
+        fetch = self._dump_fetches.get(key)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self._fetch_dump(key, cmd))
+            self._dump_fetches[key] = fetch
+            fetch.add_done_callback(lambda _: self._dump_fetches.pop(key, None))
+        return await asyncio.shield(fetch)
+    
+    async def _fetch_dump(self, key: str, cmd: List[str]) -> Dict[str, any]:
+        started_at = self._timestamp()
+        returncode, stdout = await self._run_command(cmd, timeout=10, text=False)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+        dump = {
+            'output': stdout,
+            'command': cmd,
+            'started_at': started_at,
+            'finished_at': self._timestamp()
+        }
+        self.cache.set(key, dump)
+        self._own_dumps[key] = dump
+        return dump
+    
+    @staticmethod
+    def _parse_getprop(output: str) -> Dict[str, str]:
+        """Parse ``getprop`` output (``[key]: [value]`` lines) into a dict"""
+        props = {}
+        for line in output.splitlines():
+            line = line.strip()
+            if not line.startswith('[') or ']: [' not in line or not line.endswith(']'):
+                continue
+            key, value = line[1:-1].split(']: [', 1)
+            props[key] = value
+        return props
+    
+    async def _get_ios_info(self, device_id: str) -> Optional[Dict[str, str]]:
         """Get iOS device information"""
         info = {'device_id': device_id, 'platform': 'iOS'}
         try:
-            result = subprocess.run(
-                ['ideviceinfo', '-u', device_id],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                for line in result.stdout.split('\n'):
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        if key in ['DeviceName', 'ProductType', 'ProductVersion', 
-                                  'BuildVersion', 'UniqueDeviceID']:
-                            info[key.lower()] = value
+            dump = await self._device_dump(device_id, ['ideviceinfo', '-u', device_id])
+            stdout = dump['output'].decode('utf-8', errors='replace')
+            for line in stdout.split('\n'):
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    key = key.strip()
+                    value = value.strip()
+                    if key in ['DeviceName', 'ProductType', 'ProductVersion', 
+                              'BuildVersion', 'UniqueDeviceID']:
+                        info[key.lower()] = value
         except (subprocess.SubprocessError, FileNotFoundError):
             pass
         return info
@@ -193,7 +871,7 @@ class MobileForensicTool:
         # Method 1: Check if device is already unlocked
         method1 = {'name': 'Check Unlock Status', 'success': False}
         try:
-            result = subprocess.run(
+            result = self._run_traced(
                 ['adb', '-s', device_id, 'shell', 'dumpsys', 'window'],
                 capture_output=True,
                 text=True,
@@ -225,13 +903,13 @@ class MobileForensicTool:
         method3 = {'name': 'ADB Input Commands', 'success': False}
         try:
             # Wake device
-            subprocess.run(
+            self._run_traced(
                 ['adb', '-s', device_id, 'shell', 'input', 'keyevent', 'KEYCODE_WAKEUP'],
                 capture_output=True,
                 timeout=5
             )
             # Swipe up
-            subprocess.run(
+            self._run_traced(
                 ['adb', '-s', device_id, 'shell', 'input', 'swipe', '300', '1000', '300', '300'],
                 capture_output=True,
                 timeout=5
@@ -250,7 +928,7 @@ class MobileForensicTool:
         # Method 1: Check device pair status
         method1 = {'name': 'Check Pair Status', 'success': False}
         try:
-            result = subprocess.run(
+            result = self._run_traced(
                 ['idevicepair', '-u', device_id, 'validate'],
                 capture_output=True,
                 text=True,
@@ -270,6 +948,7 @@ class MobileForensicTool:
         try:
             method2['note'] = 'Backup extraction may be possible if device is paired'
             method2['command'] = 'idevicebackup2 backup --udid <device_id> <backup_dir>'
+            method2['browse'] = 'python ios_backup.py <backup_dir>/<device_id> ls'
         except Exception as e:
             method2['note'] = f'Error: {str(e)}'
         methods.append(method2)
@@ -281,133 +960,1072 @@ class MobileForensicTool:
         
         return methods
     
-    def extract_data(self, device_id: str, output_dir: str) -> Dict[str, any]:
-        """Extract data from device"""
+    def extract_data(self, device_id: str, output_dir: str,
+                     incremental: bool = False) -> Dict[str, any]:
+        """Extract data from device
+        
+        Every artifact is hashed while it is written; ``extracted_items``
+        holds one manifest entry per artifact and the same entries are
+        saved to ``manifest.json`` in ``output_dir``. With ``incremental``,
+        artifacts left intact by an earlier run into the same directory are
+        reused (listed in ``skipped_items``) and logcat only fetches entries
+        newer than the previous capture. Reuse is judged by size and
+        modification time unless the tool was created with ``verify``,
+        which re-hashes each reused artifact. With ``parse_logs`` set on the
+        tool, ``log_records`` lists the record stores built for the logs.
+        """
+        return self._run_sync(self.extract_data_async(device_id, output_dir, incremental))
+    
+    async def extract_data_async(self, device_id: str, output_dir: str,
+                                 incremental: bool = False) -> Dict[str, any]:
+        """Extract data from device (asyncio counterpart of ``extract_data``)"""
         self.device_id = device_id
         result = {
             'device_id': device_id,
             'platform': self.platform.value,
             'output_dir': output_dir,
+            'manifest': os.path.join(output_dir, 'manifest.json'),
             'extracted_items': [],
+            'skipped_items': [],
             'errors': []
         }
         
         os.makedirs(output_dir, exist_ok=True)
+        state = ExtractionState(output_dir, device_id, incremental, self.verify)
         
-        if self.platform == Platform.ANDROID:
-            result['extracted_items'] = self._android_data_extraction(device_id, output_dir)
-        elif self.platform == Platform.IOS:
-            result['extracted_items'] = self._ios_data_extraction(device_id, output_dir)
+        result['extracted_items'] = await self._run_extraction_plan(device_id, output_dir, state)
+        if self.parse_logs:
+            result['log_records'] = await self._build_log_records(
+                output_dir, result['extracted_items'], state)
+        result['skipped_items'] = state.skipped
+        result['errors'] = state.errors
+        
+        self._write_manifest(device_id, output_dir, result['extracted_items'])
+        self._emit('extraction', device_id=device_id, output_dir=output_dir,
+                   manifest=result['manifest'], item_count=len(result['extracted_items']),
+                   skipped_items=result['skipped_items'], errors=result['errors'])
+        return result
+    
+    async def _build_log_records(self, output_dir: str, items: List[Dict[str, any]],
+                                 state: ExtractionState) -> List[Dict[str, any]]:
+        """Parse the logcat/syslog captures into ``<name>.records`` (see log_records)
+        
+        Parsing runs in a worker thread so other devices keep extracting;
+        large captures are split across ``parse_workers`` processes.
+        """
+        loop = asyncio.get_event_loop()
+        stores = []
+        for item in items:
+            if not item['name'].startswith(('logcat', 'syslog')):
+                continue
+            # Log lines carry no year; take it from the capture time
+            year = int(item['started_at'][:4])
+            try:
+                records = await loop.run_in_executor(
+                    None, build_records, os.path.join(output_dir, item['name']), None, year,
+                    self.parse_workers)
+            except (OSError, ValueError, RuntimeError) as e:
+                state.fail(records_path(item['name']), e)
+                continue
+            stores.append({'source': item['name'], 'file': records_path(item['name']),
+                           'count': len(records)})
+        return stores
+    
+    def _write_manifest(self, device_id: str, output_dir: str,
+                        items: List[Dict[str, any]]) -> None:
+        """Write the chain-of-custody manifest for an extraction"""
+        manifest = {
+            'device_id': device_id,
+            'platform': self.platform.value,
+            'generated_at': self._timestamp(),
+            'hash_algorithms': self.hash_algorithms,
+            'items': items
+        }
+        with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+    
+    @staticmethod
+    def _timestamp() -> str:
+        """Current UTC time as an ISO 8601 string"""
+        return datetime.now(timezone.utc).isoformat()
+    
+    def extract_all_devices(self, output_dir: str, max_workers: int = 4,
+                            incremental: bool = False) -> Dict[str, any]:
+        """Extract data from every connected device concurrently
+        
+        Each device is written to its own subdirectory of ``output_dir`` and
+        a combined ``extraction_summary.json`` is written alongside them.
+        At most ``max_workers`` devices are extracted at the same time.
+        """
+        return self._run_sync(self.extract_all_devices_async(output_dir, max_workers,
+                                                             incremental))
+    
+    async def extract_all_devices_async(self, output_dir: str, max_workers: int = 4,
+                                        incremental: bool = False) -> Dict[str, any]:
+        """Extract data from every connected device (asyncio counterpart)"""
+        devices = await self.list_devices_async()
+        summary = {
+            'platform': self.platform.value,
+            'output_dir': output_dir,
+            'device_count': len(devices),
+            'devices': []
+        }
+        
+        os.makedirs(output_dir, exist_ok=True)
+        workers = asyncio.Semaphore(max(1, max_workers))
+        
+        async def extract_one(device: Dict[str, str]) -> Dict[str, any]:
+            device_dir = os.path.join(output_dir, self._device_dir_name(device['id']))
+            async with workers:
+                try:
+                    return await self.extract_data_async(device['id'], device_dir,
+                                                         incremental)
+                except Exception as e:
+                    self._emit('extraction', device_id=device['id'], output_dir=device_dir,
+                               item_count=0, errors=[f'Extraction failed: {str(e)}'])
+                    return {
+                        'device_id': device['id'],
+                        'platform': self.platform.value,
+                        'output_dir': device_dir,
+                        'extracted_items': [],
+                        'errors': [f'Extraction failed: {str(e)}']
+                    }
+        
+        # gather() keeps the summary in list_devices() order
+        summary['devices'] = list(await asyncio.gather(
+            *(extract_one(device) for device in devices)))
         
+        summary_file = os.path.join(output_dir, 'extraction_summary.json')
+        with open(summary_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+    
+    @staticmethod
+    def _device_dir_name(device_id: str) -> str:
+        """Map a device ID to a safe directory name (e.g. ``host:port`` serials)"""
+        return re.sub(r'[^A-Za-z0-9._-]', '_', device_id) or 'device'
+    
+    def _run_sync(self, coro):
+        """Run an async API call to completion for the sync wrappers"""
+        async def runner():
+            try:
+                return await coro
+            finally:
+                if self.adb_client is not None:
+                    await self.adb_client.close()
+        return asyncio.run(runner())
+    
+    def _run_traced(self, cmd: List[str], **kwargs) -> subprocess.CompletedProcess:
+        """``subprocess.run`` for the synchronous code paths, recorded by the tracer"""
+        span = self.tracer.start(cmd) if self.tracer else None
+        try:
+            result = subprocess.run(cmd, **kwargs)
+        except BaseException as e:
+            if span is not None:
+                self.tracer.finish(span, error=e)
+            raise
+        if span is not None:
+            span['transport'] = 'exec'
+            self.tracer.finish(span, result.returncode, len(result.stdout or ''))
         return result
     
-    def _android_data_extraction(self, device_id: str, output_dir: str) -> List[str]:
-        """Extract data from Android device"""
-        extracted = []
+    async def _spawn(self, cmd: List[str]):
+        """Start ``cmd`` and return a process-like object with a ``stdout`` stream
         
-        # Extract system information
+        When an adb server is configured, adb commands are served over the
+        host protocol instead of forking the adb binary. If the server cannot
+        be reached, or the device cannot report exit statuses over it, the
+        binary is used as before.
+        """
+        if self.adb_client is not None:
+            request = self._adb_service(cmd)
+            if request is not None:
+                try:
+                    proc = await self._open_adb_service(*request)
+                    if proc is not None:
+                        return proc
+                except (OSError, asyncio.TimeoutError):
+                    pass
+        return await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+    
+    @staticmethod
+    def _adb_service(cmd: List[str]) -> Optional[Tuple[Optional[str], str]]:
+        """Map an adb command line to ``(serial, service)`` for the host protocol
+        
+        Returns None for commands that have no direct service equivalent.
+        Device commands use ``shell,v2``, which carries the exit status.
+        Arguments after ``shell``/``exec-out`` are shell text and are joined
+        as ``adb shell`` joins them (callers quote paths themselves);
+        ``logcat`` arguments are quoted one by one, as ``adb logcat`` does.
+        """
+        if not cmd or cmd[0] != 'adb':
+            return None
+        args = cmd[1:]
+        serial = None
+        if args[:1] == ['-s'] and len(args) >= 2:
+            serial, args = args[1], args[2:]
+        if args == ['devices', '-l']:
+            return None, 'host:devices-l'
+        if args == ['track-devices']:
+            return None, 'host:track-devices'
+        if args[:1] in (['shell'], ['exec-out']) and len(args) > 1:
+            return serial, SHELL_SERVICE + ' '.join(args[1:])
+        if args[:1] == ['logcat']:
+            # e.g. a ``-T`` resume time contains a space
+            return serial, SHELL_SERVICE + ' '.join(shlex.quote(arg) for arg in args)
+        return None
+    
+    async def _open_adb_service(self, serial: Optional[str],
+                                service: str) -> Optional[AdbServiceProcess]:
+        """Open a host-protocol service, shaped like the adb binary's output
+        
+        Returns None for a shell command on a device without ``shell_v2``.
+        """
         try:
-            info_file = os.path.join(output_dir, 'device_info.txt')
-            result = subprocess.run(
-                ['adb', '-s', device_id, 'shell', 'getprop'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                with open(info_file, 'w') as f:
-                    f.write(result.stdout)
-                extracted.append('device_info.txt')
-        except Exception:
-            pass
+            if service.startswith(SHELL_SERVICE):
+                return await self.adb_client.open_shell(serial, service[len(SHELL_SERVICE):])
+            if service == 'host:devices-l':
+                data = await self.adb_client.query(service)
+                return AdbServiceProcess.from_bytes(b'List of devices attached\n' + data)
+            if service == 'host:track-devices':
+                return await self.adb_client.open_host_service(service)
+            return await self.adb_client.open_service(serial, service)
+        except AdbError:
+            # The adb binary exits non-zero for refused requests (no device, ...)
+            return AdbServiceProcess.from_bytes(b'', returncode=1)
+    
+    async def _run_command(self, cmd: List[str], timeout: float,
+                           text: bool = True) -> Tuple[int, any]:
+        """Run a command and return ``(returncode, stdout)``
         
-        # List installed packages
+        This is the asyncio counterpart of ``subprocess.run(capture_output=True)``:
+        it raises ``FileNotFoundError`` for a missing binary and
+        ``subprocess.TimeoutExpired`` when ``timeout`` is hit. The child is
+        killed on timeout or when the calling task is cancelled.
+        """
+        span = self.tracer.start(cmd) if self.tracer else None
         try:
-            packages_file = os.path.join(output_dir, 'installed_packages.txt')
-            result = subprocess.run(
-                ['adb', '-s', device_id, 'shell', 'pm', 'list', 'packages'],
-                capture_output=True,
-                text=True,
-                timeout=15
-            )
-            if result.returncode == 0:
-                with open(packages_file, 'w') as f:
-                    f.write(result.stdout)
-                extracted.append('installed_packages.txt')
-        except Exception:
-            pass
+            proc = await self._spawn(cmd)
+            self._note_transport(span, proc)
+            try:
+                stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+            except asyncio.TimeoutError:
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            finally:
+                await self._reap(proc)
+        except BaseException as e:
+            if span is not None:
+                self.tracer.finish(span, error=e)
+            raise
+        if span is not None:
+            self.tracer.finish(span, proc.returncode, len(stdout))
+        if text:
+            stdout = stdout.decode('utf-8', errors='replace')
+        return proc.returncode, stdout
+    
+    @staticmethod
+    def _note_transport(span: Optional[Dict[str, any]], proc) -> None:
+        """Record whether a command ran as a child process or over the adb server"""
+        if span is not None:
+            span['transport'] = 'adb-server' if isinstance(proc, AdbServiceProcess) else 'exec'
+    
+    @staticmethod
+    async def _reap(proc) -> None:
+        """Kill a child process that is still running and wait for it"""
+        if proc.returncode is None and proc.stdout.at_eof():
+            # Output is closed, so the child is normally exiting already.
+            # Signalling it now could reap it behind asyncio's back.
+            try:
+                await asyncio.wait_for(proc.wait(), 1)
+            except asyncio.TimeoutError:
+                pass
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+    
+    async def _capture_to_file(self, cmd: List[str], path: str, timeout: Optional[float],
+                               append: bool = False,
+                               transform: Optional[any] = None,
+                               keep_partial: bool = False,
+                               compress: Optional[bool] = None) -> Dict[str, any]:
+        """Stream a command's stdout into ``path`` and return its manifest entry
         
-        # Get logcat snapshot
+        Output is copied in ``CHUNK_SIZE`` binary chunks, so memory use stays
+        flat and the bytes on disk are exactly what the device produced. The
+        configured digests are updated in the same pass (see
+        ``ArtifactWriter``, which also handles ``append`` and compression).
+        Nothing is left behind unless the command exits with code zero, or
+        with ``keep_partial`` produced any output at all. Raises
+        ``subprocess.TimeoutExpired`` like ``subprocess.run`` when the
+        command outlives ``timeout`` (None waits indefinitely).
+        ``transform`` (``feed``/``flush``, e.g. ``LogcatResumeFilter`` or
+        ``TarInventory``) sees the stream first and may drop data from it.
+        ``compress`` overrides the tool's setting for this artifact.
+        """
+        compress = self.compress if compress is None else compress
+        writer = ArtifactWriter(path, self.hash_algorithms, compress, append)
+        started_at = self._timestamp()
+        span = self.tracer.start(cmd, os.path.basename(path)) if self.tracer else None
+        bytes_out = 0
         try:
-            logcat_file = os.path.join(output_dir, 'logcat.txt')
-            result = subprocess.run(
-                ['adb', '-s', device_id, 'logcat', '-d'],
-                capture_output=True,
-                text=True,
-                timeout=15
-            )
-            if result.returncode == 0:
-                with open(logcat_file, 'w') as f:
-                    f.write(result.stdout)
-                extracted.append('logcat.txt')
-        except Exception:
-            pass
+            proc = await self._spawn(cmd)
+        except BaseException as e:
+            writer.discard()
+            if span is not None:
+                self.tracer.finish(span, error=e)
+            raise
+        self._note_transport(span, proc)
+        
+        async def pump() -> int:
+            nonlocal bytes_out
+            while True:
+                chunk = await proc.stdout.read(CHUNK_SIZE)
+                bytes_out += len(chunk)
+                data = chunk
+                if transform is not None:
+                    data = transform.feed(chunk) if chunk else transform.flush()
+                if data:
+                    writer.write(data)
+                if not chunk:
+                    break
+            return await proc.wait()
         
-        return extracted
+        try:
+            try:
+                returncode = await asyncio.wait_for(pump(), timeout)
+            except asyncio.TimeoutError:
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            finally:
+                await self._reap(proc)
+        except BaseException as e:
+            writer.discard()
+            if span is not None:
+                self.tracer.finish(span, bytes_out=bytes_out, error=e)
+            raise
+        if span is not None:
+            self.tracer.finish(span, returncode, bytes_out)
+        
+        committed = returncode == 0 or (keep_partial and bytes_out)
+        if committed:
+            writer.commit()
+        else:
+            writer.discard()
+        entry = self._manifest_entry(writer, cmd, started_at, self._timestamp(), returncode)
+        if committed:
+            self._share_artifact(writer, entry)
+        return entry
     
-    def _ios_data_extraction(self, device_id: str, output_dir: str) -> List[str]:
-        """Extract data from iOS device"""
-        extracted = []
+    def _stored_name(self, name: str, compress: Optional[bool] = None) -> str:
+        """File name an artifact is stored under (``.gz`` when compressing)"""
+        compress = self.compress if compress is None else compress
+        return name + '.gz' if compress else name
+    
+    async def _capture_step(self, cmd: List[str], path: str, timeout: float,
+                            state: ExtractionState,
+                            compress: Optional[bool] = None,
+                            fallbacks: Sequence[List[str]] = ()) -> Optional[Dict[str, any]]:
+        """Run one extraction step, returning its manifest entry on success
         
-        # Extract device information
+        When ``cmd`` exits non-zero, each of the ``fallbacks`` commands is
+        tried in turn; only the last attempt's failure is reported.
+        """
+        name = self._stored_name(os.path.basename(path), compress)
+        reused = state.skip(name)
+        if reused is not None:
+            return reused
         try:
-            info_file = os.path.join(output_dir, 'device_info.txt')
-            result = subprocess.run(
-                ['ideviceinfo', '-u', device_id],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                with open(info_file, 'w') as f:
-                    f.write(result.stdout)
-                extracted.append('device_info.txt')
-        except Exception:
-            pass
+            for attempt in [cmd] + list(fallbacks):
+                item = await self._capture_to_file(attempt, path, timeout, compress=compress)
+                if item['exit_code'] == 0:
+                    state.record(item)
+                    return item
+            state.fail(name, f"exit code {item['exit_code']}")
+        except Exception as e:
+            state.fail(name, e)
+        return None
+    
+    async def _logcat_step(self, device_id: str, output_dir: str, state: ExtractionState,
+                           timeout: float = 15) -> Optional[Dict[str, any]]:
+        """Capture logcat, appending only new entries to an intact earlier capture
         
-        # List installed apps
+        The entry's command and times describe this run, while its size and
+        digests cover the whole file. After an append, ``captures`` lists
+        every capture that wrote to the file: its command, times and the
+        byte range (``offset``, ``bytes``) it added to the stored file.
+        """
+        logcat_file = os.path.join(output_dir, 'logcat.txt')
+        cmd = ['adb', '-s', device_id, 'logcat', '-d']
+        stored_name = self._stored_name('logcat.txt')
+        extra = state.extra(stored_name)
+        resume = extra.get('resume')
+        previous = state.reusable(stored_name)
+        append = previous is not None and resume is not None
+        transform = None
+        if append:
+            cmd += ['-T', resume['timestamp']]
+            transform = LogcatResumeFilter(resume['timestamp'], resume['seen'])
         try:
-            apps_file = os.path.join(output_dir, 'installed_apps.txt')
-            result = subprocess.run(
-                ['ideviceinstaller', '-u', device_id, '-l'],
-                capture_output=True,
-                text=True,
-                timeout=15
-            )
-            if result.returncode == 0:
-                with open(apps_file, 'w') as f:
-                    f.write(result.stdout)
-                extracted.append('installed_apps.txt')
-        except Exception:
-            pass
+            item = await self._capture_to_file(cmd, logcat_file, timeout=timeout,
+                                               append=append, transform=transform)
+            if item['exit_code'] == 0:
+                if append:
+                    item['captures'] = self._logcat_captures(previous, item)
+                stored_file = os.path.join(output_dir, stored_name)
+                state.record(item, resume=self._logcat_resume_point(stored_file) or resume)
+                return item
+            state.fail(stored_name, f"exit code {item['exit_code']}")
+        except Exception as e:
+            state.fail(stored_name, e)
+        stored_file = os.path.join(output_dir, stored_name)
+        if append and os.path.exists(stored_file) \
+                and os.path.getsize(stored_file) == previous['size']:
+            # The failed append was truncated away; the earlier capture still stands
+            state.record(previous, **extra)
+            return previous
+        return None
+    
+    @staticmethod
+    def _logcat_captures(previous: Dict[str, any], item: Dict[str, any]) -> List[Dict[str, any]]:
+        """Capture history of an appended logcat: the earlier captures, then this one"""
+        def capture(entry, offset):
+            return {'command': entry['command'], 'started_at': entry['started_at'],
+                    'finished_at': entry['finished_at'], 'offset': offset,
+                    'bytes': entry['size'] - offset}
+        history = previous.get('captures') or [capture(previous, 0)]
+        return history + [capture(item, previous['size'])]
+    
+    async def _package_inventory_step(self, device_id: str, output_dir: str,
+                                      state: ExtractionState,
+                                      timeout: float = 60) -> List[Dict[str, any]]:
+        """Inventory every installed package with two bulk shell calls
+        
+        ``pm list packages`` with paths, UIDs, installers and version codes
+        (``package_list.txt``) and one ``dumpsys package packages`` dump
+        (``dumpsys_package.txt``) are captured concurrently, then merged
+        per package into ``package_inventory.json`` and ``.csv``.
+        """
+        # Older pm builds reject the newer options; fall back to fewer of them
+        pm_cmds = [['adb', '-s', device_id, 'shell', 'pm', 'list', 'packages'] + flags
+                   for flags in PACKAGE_LIST_FLAGS]
+        dumpsys_cmd = ['adb', '-s', device_id, 'shell', 'dumpsys', 'package', 'packages']
+        items = await asyncio.gather(
+            self._capture_step(pm_cmds[0], os.path.join(output_dir, 'package_list.txt'),
+                               timeout, state, fallbacks=pm_cmds[1:]),
+            self._capture_step(dumpsys_cmd, os.path.join(output_dir, 'dumpsys_package.txt'),
+                               timeout, state))
+        if items[0] is None and items[1] is None:
+            return []
+        started_at = self._timestamp()
+        outputs = []
+        for item in items:
+            text = ''
+            if item is not None:
+                text = b''.join(data for _, data in read_chunks(
+                    os.path.join(output_dir, item['name']))).decode('utf-8', 'replace')
+            outputs.append(text)
+        packages = self._parse_package_list(outputs[0])
+        for name, details in self._parse_dumpsys_packages(outputs[1]).items():
+            entry = packages.setdefault(name, {'package': name})
+            for key, value in details.items():
+                if entry.get(key) in (None, 'null'):
+                    entry[key] = value
+        inventory = [dict({field: None for field in PACKAGE_FIELDS}, **packages[name])
+                     for name in sorted(packages)]
+        table = io.StringIO()
+        writer = csv.DictWriter(table, PACKAGE_FIELDS, extrasaction='ignore', lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(inventory)
+        cmd = next(item['command'] for item in items if item is not None)
+        finished_at = self._timestamp()
+        results = [item for item in items if item is not None]
+        for name, data in [('package_inventory.json', json.dumps(inventory, indent=1)),
+                           ('package_inventory.csv', table.getvalue())]:
+            results.append(self._write_artifact(os.path.join(output_dir, name),
+                                                data.encode('utf-8'), cmd, started_at, finished_at))
+        return results
+    
+    @staticmethod
+    def _parse_package_list(output: str) -> Dict[str, Dict[str, any]]:
+        """Parse ``pm list packages -f -U -i --show-versioncode`` output by package name
+        
+        Lines look like ``package:<apk>=<name> versionCode:<n> installer=<pkg> uid:<n>``;
+        missing options simply leave their fields out.
+        """
+        packages = {}
+        for line in output.splitlines():
+            fields = line.strip().split()
+            if not fields or not fields[0].startswith('package:'):
+                continue
+            path, _, name = fields[0][len('package:'):].rpartition('=')
+            entry = {'package': name}
+            if path:
+                entry['path'] = path
+            for field in fields[1:]:
+                match = re.match(r'^(\w+)[:=](.*)$', field)
+                if match is None:
+                    continue
+                key, value = match.groups()
+                if key == 'versionCode':
+                    entry['version_code'] = int(value) if value.isdigit() else value
+                elif key == 'uid':
+                    entry['uid'] = int(value) if value.isdigit() else value
+                elif key == 'installer':
+                    entry['installer'] = None if value == 'null' else value
+            packages[name] = entry
+        return packages
+    
+    @staticmethod
+    def _parse_dumpsys_packages(output: str) -> Dict[str, Dict[str, any]]:
+        """Parse the ``Package [name]`` blocks of ``dumpsys package packages``"""
+        keys = {
+            'codePath': 'path', 'versionCode': 'version_code', 'versionName': 'version_name',
+            'userId': 'uid', 'installerPackageName': 'installer', 'targetSdk': 'target_sdk',
+            'firstInstallTime': 'first_install_time', 'lastUpdateTime': 'last_update_time'
+        }
+        packages = {}
+        entry = None
+        for line in output.splitlines():
+            header = re.match(r'^\s*Package \[([^\]]+)\]', line)
+            if header is not None:
+                entry = packages.setdefault(header.group(1), {})
+                continue
+            if entry is None:
+                continue
+            if not line.startswith('    '):
+                # Left the package block (e.g. the next dumpsys section)
+                entry = None
+                continue
+            stripped = line.strip()
+            if stripped.startswith('pkgFlags=['):
+                entry['system'] = ' SYSTEM ' in stripped + ' '
+                continue
+            # ``key=value`` pairs; times contain a space, the rest do not
+            for key, value in re.findall(r'(\w+)=(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d|\S*)', stripped):
+                field = keys.get(key)
+                if field is None or field in entry:
+                    continue
+                if field in ('version_code', 'uid', 'target_sdk') and value.isdigit():
+                    value = int(value)
+                entry[field] = None if value == 'null' else value
+        return packages
+    
+    async def _dumpsys_step(self, device_id: str, output_dir: str, state: ExtractionState,
+                            max_streams: int = DUMPSYS_STREAMS,
+                            timeout: float = DUMPSYS_TIMEOUT,
+                            exclude: Sequence[str] = (),
+                            compress: bool = True) -> List[Dict[str, any]]:
+        """Snapshot every system service's ``dumpsys`` output
+        
+        The services listed by ``dumpsys -l`` (kept as ``dumpsys_services.txt``)
+        are dumped over at most ``max_streams`` concurrent shell streams, each
+        to its own artifact ``dumpsys-<service>.txt``, block-compressed
+        unless ``compress`` is false. ``timeout`` applies to each service, so
+        a hung service fails on its own while the others complete and the
+        snapshot takes about as long as its slowest service. The listing's
+        manifest entry gets a ``snapshot`` field counting the services dumped
+        and failed; the entry recorded in the extraction state stays as
+        captured, since an incremental run may reuse it.
+        """
+        listing = await self._capture_step(
+            ['adb', '-s', device_id, 'shell', 'dumpsys', '-l'],
+            os.path.join(output_dir, 'dumpsys_services.txt'), timeout, state)
+        if listing is None:
+            return []
+        text = b''.join(data for _, data in read_chunks(
+            os.path.join(output_dir, listing['name']))).decode('utf-8', 'replace')
+        services = self._parse_dumpsys_services(text)
+        services = [service for service in services if service not in exclude]
+        streams = asyncio.Semaphore(max(1, max_streams))
         
-        # Get syslog
+        async def dump(service: str) -> Optional[Dict[str, any]]:
+            # Service names may contain '/', ':' or '@' (HAL instances)
+            name = 'dumpsys-' + re.sub(r'[^\w.-]', '_', service) + '.txt'
+            async with streams:
+                return await self._capture_step(
+                    ['adb', '-s', device_id, 'shell', 'dumpsys', shlex.quote(service)],
+                    os.path.join(output_dir, name), timeout, state, compress)
+        
+        started = time.perf_counter()
+        items = await asyncio.gather(*[dump(service) for service in services])
+        captured = [item for item in items if item is not None]
+        listing = dict(listing, snapshot={
+            'services': len(services),
+            'captured': len(captured),
+            'failed': [service for service, item in zip(services, items) if item is None],
+            'seconds': round(time.perf_counter() - started, 3)
+        })
+        return [listing] + captured
+    
+    @staticmethod
+    def _parse_dumpsys_services(output: str) -> List[str]:
+        """Service names from ``dumpsys -l`` (indented under ``Currently running services:``)"""
+        return [line.strip() for line in output.splitlines()
+                if line[:1].isspace() and line.strip()]
+    
+    async def _acquisition_step(self, device_id: str, output_dir: str,
+                                state: ExtractionState) -> List[Dict[str, any]]:
+        """Acquire ``acquire_paths`` from the device as concurrent tar streams
+        
+        Each stream is stored as ``storage_NN.tar`` with a per-file
+        inventory (path, type, size, mode, mtime, SHA-256) in
+        ``storage_NN.files.ndjson`` (one JSON object per line), built while
+        the archive streams in.
+        Every tar entry's ``acquisition`` field reports its throughput and
+        the aggregate rate of all streams in MiB/s.
+        """
         try:
-            syslog_file = os.path.join(output_dir, 'syslog.txt')
-            result = subprocess.run(
-                ['idevicesyslog', '-u', device_id],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                with open(syslog_file, 'w') as f:
-                    f.write(result.stdout)
-                extracted.append('syslog.txt')
-        except Exception:
-            pass
+            groups = await self._plan_tar_streams(device_id)
+        except Exception as e:
+            state.fail('storage', e)
+            return []
+        started = time.perf_counter()
+        results = await asyncio.gather(*[
+            self._tar_stream(device_id, output_dir, number, entries, state)
+            for number, entries in enumerate(groups)
+        ])
+        elapsed = time.perf_counter() - started
+        items = self._collect(results)
+        total = sum(item['acquisition']['bytes'] for item in items if 'acquisition' in item)
+        for item in items:
+            if 'acquisition' in item:
+                item['acquisition']['aggregate_mib_per_s'] = round(
+                    total / (1024 * 1024) / elapsed, 2) if elapsed else None
+        return items
+    
+    async def _plan_tar_streams(self, device_id: str) -> List[List[str]]:
+        """Split ``acquire_paths`` into at most ``acquire_streams`` balanced groups
+        
+        The direct children of every path are sized with one ``du`` call per
+        path and dealt largest first to the least loaded stream. A path
+        whose children cannot be listed is acquired whole.
+        """
+        units = []
+        for path in self.acquire_paths:
+            root = posixpath.normpath(path)
+            # The trailing slash follows a symlinked root such as /sdcard
+            cmd = ['adb', '-s', device_id, 'exec-out', 'du', '-a', '-k', '-d', '1',
+                   shlex.quote(root + '/'), '2>/dev/null']
+            # du exits non-zero on unreadable entries but still sizes the rest
+            _, stdout = await self._run_command(cmd, timeout=120)
+            children = []
+            for line in stdout.splitlines():
+                size, _, child = line.partition('\t')
+                child = posixpath.normpath(child)
+                if size.isdigit() and posixpath.dirname(child) == root and child != root:
+                    children.append((int(size), child))
+            units.extend(children or [(0, root)])
+        streams = [(0, number, []) for number in range(min(self.acquire_streams, len(units)))]
+        for size, child in sorted(units, reverse=True):
+            load, number, entries = heapq.heappop(streams)
+            entries.append(child)
+            heapq.heappush(streams, (load + size, number, entries))
+        return [sorted(entries) for _, _, entries in sorted(streams, key=lambda stream: stream[1])]
+    
+    async def _tar_stream(self, device_id: str, output_dir: str, number: int,
+                          entries: List[str], state: ExtractionState) -> List[Dict[str, any]]:
+        """Stream one tar of ``entries`` into ``storage_NN.tar`` and inventory it"""
+        name = f'storage_{number:02d}'
+        stored_name = self._stored_name(f'{name}.tar')
+        cmd = ['adb', '-s', device_id, 'exec-out', 'tar', '-cf', '-'] + \
+            [shlex.quote(entry) for entry in entries] + ['2>/dev/null']
+        inventory = TarInventory()
+        started = time.perf_counter()
+        try:
+            # Unreadable files make tar exit non-zero; the rest of the archive is still evidence
+            item = await self._capture_to_file(cmd, os.path.join(output_dir, f'{name}.tar'),
+                                               timeout=None, transform=inventory,
+                                               keep_partial=True)
+        except Exception as e:
+            state.fail(stored_name, e)
+            return []
+        elapsed = time.perf_counter() - started
+        if item['exit_code'] != 0:
+            if not inventory.bytes_seen:
+                state.fail(stored_name, f"exit code {item['exit_code']}")
+                return []
+            state.fail(stored_name, f"exit code {item['exit_code']} (partial archive kept)")
+        mib = inventory.bytes_seen / (1024 * 1024)
+        item['acquisition'] = {
+            'paths': entries,
+            'files': sum(member['type'] == 'file' for member in inventory.members),
+            'bytes': inventory.bytes_seen,
+            'complete': inventory.complete,
+            'seconds': round(elapsed, 3),
+            'mib_per_s': round(mib / elapsed, 2) if elapsed else None
+        }
+        listing = self._write_artifact(
+            os.path.join(output_dir, f'{name}.files.ndjson'),
+            ''.join(json.dumps(member) + '\n' for member in inventory.members).encode('utf-8'),
+            cmd, item['started_at'], item['finished_at'])
+        return [item, listing]
+    
+    async def _live_capture_step(self, cmd: List[str], output_dir: str, base: str,
+                                 policy: LiveCapture,
+                                 state: ExtractionState) -> List[Dict[str, any]]:
+        """Stream a live log into one artifact per segment"""
+        try:
+            items = await self._stream_segments(cmd, output_dir, base, policy)
+            if items:
+                return items
+            state.fail(self._stored_name(policy.segment_name(base, 0)), 'no output')
+        except Exception as e:
+            state.fail(self._stored_name(policy.segment_name(base, 0)), e)
+        return []
+    
+    async def _stream_segments(self, cmd: List[str], output_dir: str, base: str,
+                               policy: LiveCapture) -> List[Dict[str, any]]:
+        """Read ``cmd`` within ``policy``'s limits, writing rotated segments
+        
+        Reaching the duration or byte budget is the normal end of a live
+        capture, not a failure. Each kept segment gets a manifest entry
+        whose ``capture`` field says why the stream stopped and how many
+        older segments the ring buffer dropped. A stream that exits with
+        an error before producing output raises ``CalledProcessError``.
+        """
+        loop = asyncio.get_event_loop()
+        span = self.tracer.start(cmd, base) if self.tracer else None
+        try:
+            proc = await self._spawn(cmd)
+        except BaseException as e:
+            if span is not None:
+                self.tracer.finish(span, error=e)
+            raise
+        self._note_transport(span, proc)
+        deadline = loop.time() + policy.duration
+        kept = deque()
+        dropped = {'segments': 0, 'bytes': 0}
+        segment = {}
+        total = 0
+        stop = 'eof'
+        
+        def open_segment(number: int) -> None:
+            path = os.path.join(output_dir, policy.segment_name(base, number))
+            segment.update(writer=ArtifactWriter(path, self.hash_algorithms, self.compress),
+                           number=number, size=0, started_at=self._timestamp())
+        
+        def close_segment() -> None:
+            writer = segment['writer']
+            writer.commit()
+            kept.append((dict(segment, finished_at=self._timestamp()), writer))
+            if policy.ring_bytes:
+                # Keep the newest segments within the ring (always at least one)
+                while len(kept) > 1 and sum(s['size'] for s, _ in kept) > policy.ring_bytes:
+                    old, old_writer = kept.popleft()
+                    os.remove(old_writer.path)
+                    if self.compress:
+                        os.remove(index_path(old_writer.path))
+                    dropped['segments'] += 1
+                    dropped['bytes'] += old['size']
+        
+        def write(data: bytes) -> None:
+            limit = policy.segment_bytes
+            while limit and segment['size'] + len(data) > limit:
+                space = limit - segment['size']
+                cut = data.rfind(b'\n', 0, space) + 1
+                if not cut and segment['size'] == 0:
+                    # A single line longer than a segment
+                    cut = space
+                segment['writer'].write(data[:cut])
+                segment['size'] += cut
+                data = data[cut:]
+                close_segment()
+                open_segment(segment['number'] + 1)
+            segment['writer'].write(data)
+            segment['size'] += len(data)
+        
+        open_segment(0)
+        try:
+            while True:
+                if policy.max_bytes is not None and total >= policy.max_bytes:
+                    stop = 'byte_budget'
+                    break
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    stop = 'duration'
+                    break
+                try:
+                    chunk = await asyncio.wait_for(proc.stdout.read(CHUNK_SIZE), remaining)
+                except asyncio.TimeoutError:
+                    stop = 'duration'
+                    break
+                if not chunk:
+                    break
+                if policy.max_bytes is not None:
+                    chunk = chunk[:policy.max_bytes - total]
+                total += len(chunk)
+                write(chunk)
+        except BaseException as e:
+            segment['writer'].discard()
+            await self._reap(proc)
+            if span is not None:
+                self.tracer.finish(span, bytes_out=total, error=e)
+            raise
+        await self._reap(proc)
+        exit_code = proc.returncode if stop == 'eof' else None
+        if span is not None:
+            self.tracer.finish(span, exit_code, total)
+        if stop == 'eof' and exit_code != 0 and total == 0:
+            segment['writer'].discard()
+            raise subprocess.CalledProcessError(exit_code, cmd)
+        close_segment()
+        capture = {'stopped_by': stop, 'duration_limit_s': policy.duration,
+                   'byte_budget': policy.max_bytes, 'total_bytes': total,
+                   'dropped_segments': dropped['segments'], 'dropped_bytes': dropped['bytes']}
+        items = []
+        for info, writer in kept:
+            item = self._manifest_entry(writer, cmd, info['started_at'], info['finished_at'],
+                                        exit_code)
+            item['capture'] = dict(capture, segment=info['number'])
+            items.append(item)
+        return items
+    
+    @staticmethod
+    def _logcat_resume_point(path: str) -> Optional[Dict[str, any]]:
+        """Find the last logcat timestamp in ``path`` and how many lines carry it
+        
+        Only the tail of the file is read (through the block index for a
+        compressed artifact).
+        """
+        if path.endswith('.gz'):
+            with BlockGzipReader(path) as reader:
+                tail = reader.read(max(0, len(reader) - CHUNK_SIZE), CHUNK_SIZE)
+        else:
+            with open(path, 'rb') as f:
+                f.seek(max(0, os.path.getsize(path) - CHUNK_SIZE))
+                tail = f.read()
+        timestamp, seen = None, 0
+        for line in reversed(tail.splitlines()):
+            match = LOGCAT_TIMESTAMP.match(line)
+            if match is None:
+                continue
+            if timestamp is None:
+                timestamp = match.group(1)
+            elif match.group(1) != timestamp:
+                break
+            seen += 1
+        if timestamp is None:
+            return None
+        return {'timestamp': timestamp.decode(), 'seen': seen}
+    
+    def _write_artifact(self, path: str, data: bytes, cmd: List[str],
+                        started_at: str, finished_at: str) -> Dict[str, any]:
+        """Write already-captured command output and return its manifest entry"""
+        writer = ArtifactWriter(path, self.hash_algorithms, self.compress)
+        try:
+            writer.write(data)
+        except BaseException:
+            writer.discard()
+            raise
+        writer.commit()
+        entry = self._manifest_entry(writer, cmd, started_at, finished_at, 0)
+        self._share_artifact(writer, entry)
+        return entry
+    
+    def _share_artifact(self, writer: ArtifactWriter, entry: Dict[str, any]) -> None:
+        """Deduplicate a committed artifact through ``store``, noting it in ``entry``"""
+        if self.store is None:
+            return
+        digest = entry['digests']['sha256']
+        sidecars = [index_path('')] if 'compression' in entry else []
+        deduplicated = self.store.adopt(writer.path, digest, sidecars)
+        if deduplicated is not None:
+            entry['store'] = {'sha256': digest, 'deduplicated': deduplicated}
+    
+    @staticmethod
+    def _manifest_entry(writer: ArtifactWriter, cmd: List[str], started_at: str,
+                        finished_at: str, exit_code: int) -> Dict[str, any]:
+        """Build the chain-of-custody record for one artifact"""
+        entry = writer.manifest_fields()
+        entry.update({
+            'command': cmd,
+            'started_at': started_at,
+            'finished_at': finished_at,
+            'exit_code': exit_code
+        })
+        return entry
+    
+    async def _run_extraction_plan(self, device_id: str, output_dir: str,
+                                   state: ExtractionState) -> List[Dict[str, any]]:
+        """Run the configured extraction steps (see pipeline)
+        
+        Steps without dependencies between them run concurrently, up to
+        ``max_parallel_steps`` at a time; the returned items keep plan order.
+        Each finished step emits its ``artifact`` events, then a ``step`` event.
+        """
+        async def report(step, coroutine):
+            started = time.perf_counter()
+            result = await coroutine
+            items = self._collect([result])
+            for item in items:
+                self._emit('artifact', device_id=device_id, artifact=item)
+            self._emit('step', device_id=device_id, step=step.name,
+                       status='ok' if produced(result) else 'failed', item_count=len(items),
+                       duration=round(time.perf_counter() - started, 6))
+            return result
+        
+        def start(step):
+            if step.command is not None:
+                coroutine = self._command_step(step, device_id, output_dir, state)
+            else:
+                builder = STEPS[(self.platform.value, step.name)]
+                coroutine = builder(self, device_id, output_dir, state, step.options)
+            if coroutine is None or self.on_event is None:
+                return coroutine
+            return report(step, coroutine)
+        
+        def skip(step, dependency):
+            state.fail(step.name, f'skipped, {dependency} failed')
+            self._emit('step', device_id=device_id, step=step.name, status='skipped',
+                       item_count=0, duration=0)
         
-        return extracted
+        def timed_out(step):
+            state.fail(step.name, f'timed out after {step.timeout}s')
+            self._emit('step', device_id=device_id, step=step.name, status='timeout',
+                       item_count=0, duration=step.timeout)
+        
+        return self._collect(await run_plan(self.plan, start, self.max_parallel_steps, skip,
+                                            timed_out))
+    
+    def _command_step(self, step, device_id: str, output_dir: str,
+                      state: ExtractionState) -> Awaitable[Optional[Dict[str, any]]]:
+        """Capture the output of a command-defined plan step"""
+        cmd = [part.replace('{device}', device_id) for part in step.command]
+        output = step.options.get('output', f'{step.name}.txt')
+        return self._capture_step(cmd, os.path.join(output_dir, output),
+                                  timeout=step.options.get('timeout', 60), state=state)
+    
+    @staticmethod
+    def _collect(results: List[any]) -> List[Dict[str, any]]:
+        """Flatten step results (an item, a list of items or None) in step order"""
+        items = []
+        for result in results:
+            if isinstance(result, list):
+                items.extend(result)
+            elif result is not None:
+                items.append(result)
+        return items
+    
+    async def _device_info_step(self, cmd: List[str], device_id: str, output_dir: str,
+                                state: ExtractionState) -> Optional[Dict[str, any]]:
+        """Write the device metadata dump to ``device_info.txt``
+        
+        The dump is reused only if this tool fetched it (e.g. for
+        ``get_device_info``), never from a cache file another run saved.
+        """
+        name = self._stored_name('device_info.txt')
+        reused = state.skip(name)
+        if reused is not None:
+            return reused
+        try:
+            dump = await self._device_dump(device_id, cmd, own=True)
+            item = self._write_artifact(
+                os.path.join(output_dir, 'device_info.txt'),
+                dump['output'],
+                dump['command'],
+                dump['started_at'],
+                dump['finished_at']
+            )
+            state.record(item)
+            return item
+        except Exception as e:
+            state.fail(name, e)
+        return None
+
+
+# Built-in extraction steps; config.json plans refer to them by name
+
+@register_step('android', 'device_info', options=[])
+def _android_device_info(tool, device_id, output_dir, state, options):
+    # Reuses a getprop dump from get_device_info
+    return tool._device_info_step(['adb', '-s', device_id, 'shell', 'getprop'],
+                                  device_id, output_dir, state)
+
+
+@register_step('android', 'installed_packages', options=['timeout'])
+def _android_installed_packages(tool, device_id, output_dir, state, options):
+    return tool._capture_step(['adb', '-s', device_id, 'shell', 'pm', 'list', 'packages'],
+                              os.path.join(output_dir, 'installed_packages.txt'),
+                              timeout=options.get('timeout', 15), state=state)
+
+
+@register_step('android', 'package_inventory', options=['timeout'])
+def _android_package_inventory(tool, device_id, output_dir, state, options):
+    return tool._package_inventory_step(device_id, output_dir, state,
+                                        timeout=options.get('timeout', 60))
+
+
+@register_step('android', 'dumpsys', options=['timeout', 'max_streams', 'exclude', 'compress'])
+def _android_dumpsys(tool, device_id, output_dir, state, options):
+    return tool._dumpsys_step(device_id, output_dir, state,
+                              max_streams=options.get('max_streams', DUMPSYS_STREAMS),
+                              timeout=options.get('timeout', DUMPSYS_TIMEOUT),
+                              exclude=options.get('exclude', []),
+                              compress=options.get('compress', True))
+
+
+@register_step('android', 'logcat', options=['timeout'])
+def _android_logcat(tool, device_id, output_dir, state, options):
+    # Only new entries when resuming
+    return tool._logcat_step(device_id, output_dir, state, timeout=options.get('timeout', 15))
+
+
+@register_step('android', 'storage', options=[])
+def _android_storage(tool, device_id, output_dir, state, options):
+    if not tool.acquire_paths:
+        return None
+    return tool._acquisition_step(device_id, output_dir, state)
+
+
+@register_step('android', 'logcat_live', options=[])
+def _android_logcat_live(tool, device_id, output_dir, state, options):
+    # Follows logcat from its newest entry on
+    if tool.live_capture is None:
+        return None
+    return tool._live_capture_step(['adb', '-s', device_id, 'logcat', '-T', '1'],
+                                   output_dir, 'logcat_live', tool.live_capture, state)
+
+
+@register_step('ios', 'device_info', options=[])
+def _ios_device_info(tool, device_id, output_dir, state, options):
+    # Reuses an ideviceinfo dump from get_device_info
+    return tool._device_info_step(['ideviceinfo', '-u', device_id],
+                                  device_id, output_dir, state)
+
+
+@register_step('ios', 'installed_apps', options=['timeout'])
+def _ios_installed_apps(tool, device_id, output_dir, state, options):
+    return tool._capture_step(['ideviceinstaller', '-u', device_id, '-l'],
+                              os.path.join(output_dir, 'installed_apps.txt'),
+                              timeout=options.get('timeout', 15), state=state)
+
+
+@register_step('ios', 'syslog', options=[])
+def _ios_syslog(tool, device_id, output_dir, state, options):
+    # syslog never ends on its own, so it is always a bounded live capture
+    return tool._live_capture_step(['idevicesyslog', '-u', device_id], output_dir, 'syslog',
+                                   tool.live_capture or LiveCapture(), state)
+
+
+def load_config(path: Optional[str]) -> Dict[str, any]:
+    """Read the tool configuration and import its step ``plugins``
+    
+    A missing default config is not an error; an explicitly given one must exist.
+    """
+    if path is None:
+        if not os.path.exists(DEFAULT_CONFIG):
+            return {}
+        path = DEFAULT_CONFIG
+    with open(path) as f:
+        config = json.load(f)
+    load_plugins(config.get('plugins', []))
+    return config
 
 
 def main():
@@ -428,6 +2046,18 @@ Examples:
   
   # Extract data
   python mobile_forensic_tool.py --platform android --action extract --device <device_id> --output ./forensic_data
+  
+  # Watch for devices and extract each one as it connects
+  python mobile_forensic_tool.py --platform android --action watch --auto-extract --output ./forensic_data
+  
+  # Extract data from all connected devices, four at a time
+  python mobile_forensic_tool.py --platform android --action extract --all-devices --max-workers 4 --output ./forensic_data
+  
+  # Keep running and answer JSON-RPC requests on a Unix socket
+  python mobile_forensic_tool.py --platform android --action serve --socket /tmp/forensic.sock
+  
+  # Merge the logs and file times of every extraction under ./forensic_data into one timeline
+  python mobile_forensic_tool.py --platform android --action timeline --output ./forensic_data --timeline case.csv
         """
     )
     
@@ -437,7 +2067,7 @@ Examples:
                        help='Target platform')
     
     parser.add_argument('--action', 
-                       choices=['list', 'info', 'bypass', 'extract'],
+                       choices=['list', 'info', 'bypass', 'extract', 'watch', 'serve', 'timeline'],
                        required=False,
                        help='Action to perform')
     
@@ -448,6 +2078,139 @@ Examples:
                        default='./forensic_output',
                        help='Output directory for extracted data')
     
+    parser.add_argument('--adb-server', 
+                       nargs='?',
+                       const='127.0.0.1:5037',
+                       metavar='HOST:PORT',
+                       help='Talk to the adb server directly instead of running the adb binary '
+                            '(default address: 127.0.0.1:5037)')
+    
+    parser.add_argument('--hash', 
+                       nargs='+',
+                       choices=HASH_ALGORITHMS,
+                       default=[],
+                       help='Extra digests for the extraction manifest (SHA-256 is always computed)')
+    
+    parser.add_argument('--compress', 
+                       action='store_true',
+                       help='Store artifacts as block-compressed .gz files with a random-access index')
+    
+    parser.add_argument('--parse-logs', 
+                       action='store_true',
+                       help='Parse logcat/syslog into columnar .records files for fast filtering '
+                            '(see log_records.py)')
+    
+    parser.add_argument('--parse-workers', 
+                       type=int,
+                       metavar='N',
+                       help='Processes that parse large captures for --parse-logs (default: one per CPU)')
+    
+    parser.add_argument('--case-index', 
+                       metavar='DB',
+                       help='Add the extraction to this SQLite case index afterwards '
+                            '(extract only, see case_index.py)')
+    
+    parser.add_argument('--acquire', 
+                       nargs='+',
+                       metavar='DEVICE_PATH',
+                       help='Android storage to copy as tar streams, e.g. /sdcard (extract only)')
+    
+    parser.add_argument('--acquire-streams', 
+                       type=int,
+                       default=4,
+                       help='Concurrent tar streams for --acquire (default: 4)')
+    
+    parser.add_argument('--live-capture', 
+                       type=float,
+                       metavar='SECONDS',
+                       help='Stream live logs for this long: adds a live logcat on Android and '
+                            'sets the iOS syslog duration (default for iOS: 5)')
+    
+    parser.add_argument('--live-max-mb', 
+                       type=float,
+                       help='Stop a live capture after this many MB')
+    
+    parser.add_argument('--segment-mb', 
+                       type=float,
+                       help='Rotate live captures into numbered segments of this many MB')
+    
+    parser.add_argument('--ring-mb', 
+                       type=float,
+                       help='Keep only the newest ~N MB of segments of a live capture')
+    
+    parser.add_argument('--incremental', 
+                       action='store_true',
+                       help='Reuse intact artifacts from an earlier run into the same output '
+                            'directory and only fetch new logcat entries')
+    
+    parser.add_argument('--verify', 
+                       action='store_true',
+                       help='With --incremental, re-hash reused artifacts and recapture any '
+                            'whose digest no longer matches')
+    
+    parser.add_argument('--all-devices', 
+                       action='store_true',
+                       help='Extract from every connected device (extract only)')
+    
+    parser.add_argument('--max-workers', 
+                       type=int,
+                       default=4,
+                       help='Maximum number of devices extracted concurrently (default: 4)')
+    
+    parser.add_argument('--auto-extract', 
+                       action='store_true',
+                       help='Extract each device as soon as it connects (watch only)')
+    
+    parser.add_argument('--poll-interval', 
+                       type=float,
+                       default=2.0,
+                       help='Seconds between device polls when event tracking is unavailable (default: 2)')
+    
+    parser.add_argument('--socket', 
+                       metavar='PATH',
+                       help='Serve JSON-RPC on this Unix socket instead of stdin/stdout (serve only)')
+    
+    parser.add_argument('--profile', 
+                       nargs='?',
+                       const='profile_trace.json',
+                       metavar='FILE',
+                       help='Print a per-step latency breakdown and write a Chrome trace of every '
+                            'command (default file: profile_trace.json)')
+    
+    parser.add_argument('--cache', 
+                       nargs='?',
+                       const=os.path.join('~', '.cache', 'mobile_forensic_tool', 'metadata.json'),
+                       metavar='FILE',
+                       help='Share discovered tools and device metadata between runs through this file '
+                            '(default: ~/.cache/mobile_forensic_tool/metadata.json)')
+    
+    parser.add_argument('--cache-ttl', 
+                       type=float,
+                       default=DEFAULT_TTL,
+                       help=f'Seconds cached tool and device metadata stays valid; 0 disables caching '
+                            f'(default: {DEFAULT_TTL})')
+    
+    parser.add_argument('--timeline', 
+                       metavar='FILE',
+                       help='Timeline file to write, .csv or .ndjson '
+                            '(timeline only; default: <output>/timeline.ndjson)')
+    
+    parser.add_argument('--store', 
+                       metavar='DIR',
+                       help='Content-addressed store to deduplicate artifacts across extractions '
+                            '(same filesystem as --output)')
+    
+    parser.add_argument('--output-format', 
+                       choices=['text', 'ndjson'],
+                       default='text',
+                       help='ndjson prints one compact JSON event per line as results arrive '
+                            '(list, info, extract; default: text)')
+    
+    parser.add_argument('--config', 
+                       metavar='FILE',
+                       help='Configuration with the extraction plan per platform '
+                            '(default: config.json next to this script)')
+    
     parser.add_argument('--check-deps', 
                        action='store_true',
                        help='Check if required dependencies are installed')
@@ -458,9 +2221,51 @@ Examples:
     if not args.check_deps and not args.action:
         parser.error("--action is required unless --check-deps is specified")
     
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError, ImportError) as e:
+        parser.error(f"cannot load config: {e}")
+    
     # Create tool instance
     platform = Platform.ANDROID if args.platform == 'android' else Platform.IOS
-    tool = MobileForensicTool(platform)
+    tracer = CommandTracer() if args.profile else None
+    cache = MetadataCache(ttl=args.cache_ttl,
+                          path=os.path.expanduser(args.cache) if args.cache else None)
+    live_capture = None
+    if args.live_capture is not None or args.live_max_mb or args.segment_mb or args.ring_mb:
+        mb = 1024 * 1024
+        live_capture = LiveCapture(
+            duration=args.live_capture if args.live_capture is not None else 5.0,
+            max_bytes=int(args.live_max_mb * mb) if args.live_max_mb else None,
+            segment_bytes=int(args.segment_mb * mb) if args.segment_mb else None,
+            ring_bytes=int(args.ring_mb * mb) if args.ring_mb else None)
+    try:
+        tool = MobileForensicTool(platform, hash_algorithms=args.hash,
+                                  adb_server=args.adb_server, compress=args.compress,
+                                  tracer=tracer, cache=cache, parse_logs=args.parse_logs,
+                                  parse_workers=args.parse_workers,
+                                  live_capture=live_capture, acquire_paths=args.acquire,
+                                  acquire_streams=args.acquire_streams,
+                                  extraction_config=config.get(platform.value),
+                                  store=ArtifactStore(args.store) if args.store else None,
+                                  verify=args.verify)
+    except PlanError as e:
+        parser.error(f"invalid extraction plan: {e}")
+    
+    try:
+        run_action(args, tool, config)
+    finally:
+        cache.save()
+        if tracer is not None:
+            print("\nProfile:", file=sys.stderr)
+            print(tracer.format_summary(), file=sys.stderr)
+            tracer.export(args.profile)
+            print(f"Trace: {args.profile}", file=sys.stderr)
+
+
+def run_action(args: argparse.Namespace, tool: MobileForensicTool,
+               config: Dict[str, any]) -> None:
+    """Carry out the parsed command line"""
     
     # Check dependencies if requested
     if args.check_deps:
@@ -477,7 +2282,10 @@ Examples:
             sys.exit(1)
     
     # Execute requested action
-    if args.action == 'list':
+    if args.output_format == 'ndjson' and args.action in ('list', 'info', 'extract'):
+        run_ndjson_action(args, tool)
+    
+    elif args.action == 'list':
         print(f"Scanning for {args.platform.upper()} devices...")
         devices = tool.list_devices()
         if devices:
@@ -517,6 +2325,77 @@ Examples:
         print("\nBypass Results:")
         print(json.dumps(result, indent=2))
     
+    elif args.action == 'watch':
+        print(f"Watching for {args.platform.upper()} devices (Ctrl+C to stop)...", file=sys.stderr)
+        
+        def report(event):
+            print(json.dumps(event), flush=True)
+        
+        try:
+            tool.watch(report,
+                       output_dir=args.output if args.auto_extract else None,
+                       max_workers=args.max_workers,
+                       poll_interval=args.poll_interval,
+                       incremental=args.incremental)
+        except KeyboardInterrupt:
+            pass
+    
+    elif args.action == 'serve':
+        # One long-lived tool per platform, sharing the cache and tracer
+        tools = {tool.platform.value: tool}
+        for platform in Platform:
+            if platform.value not in tools:
+                tools[platform.value] = MobileForensicTool(
+                    platform, hash_algorithms=tool.hash_algorithms,
+                    adb_server=args.adb_server, compress=tool.compress,
+                    tracer=tool.tracer, cache=tool.cache, parse_logs=tool.parse_logs,
+                    parse_workers=tool.parse_workers,
+                    live_capture=tool.live_capture, acquire_paths=tool.acquire_paths,
+                    acquire_streams=tool.acquire_streams,
+                    extraction_config=config.get(platform.value), store=tool.store,
+                    verify=tool.verify)
+        server = RpcServer(tools, tool.platform.value, args.output)
+        print(f"Serving JSON-RPC on {args.socket or 'stdin/stdout'} (Ctrl+C to stop)...",
+              file=sys.stderr)
+        
+        async def serve():
+            try:
+                if args.socket:
+                    await server.serve_unix(args.socket)
+                else:
+                    await server.serve_stdio()
+            finally:
+                await server.close()
+        
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            print(f"Error: cannot serve on {args.socket}: {e}", file=sys.stderr)
+            sys.exit(1)
+    
+    elif args.action == 'timeline':
+        output = args.timeline or os.path.join(args.output, 'timeline.ndjson')
+        print(f"Building timeline from {args.output}...", file=sys.stderr)
+        try:
+            stats = build_timeline([args.output], output)
+        except (OSError, ValueError) as e:
+            print(f"Timeline failed: {e}")
+            sys.exit(1)
+        print(f"Wrote {stats['events']} events from {stats['extractions']} extraction(s) "
+              f"to {stats['output']}")
+    
+    elif args.action == 'extract' and args.all_devices:
+        print(f"Extracting data from all {args.platform.upper()} devices...")
+        print(f"Output directory: {args.output}")
+        summary = tool.extract_all_devices(args.output, args.max_workers,
+                                           incremental=args.incremental)
+        print("\nExtraction Summary:")
+        print(json.dumps(summary, indent=2))
+        print(f"\nProcessed {summary['device_count']} device(s) into {args.output}")
+        update_case_index(args)
+    
     elif args.action == 'extract':
         if not args.device:
             print("Error: --device is required for extract action")
@@ -524,11 +2403,78 @@ Examples:
         
         print(f"Extracting data from {args.device}...")
         print(f"Output directory: {args.output}")
-        result = tool.extract_data(args.device, args.output)
+        result = tool.extract_data(args.device, args.output, incremental=args.incremental)
         print("\nExtraction Results:")
         print(json.dumps(result, indent=2))
         if result['extracted_items']:
             print(f"\nExtracted {len(result['extracted_items'])} items to {args.output}")
+            print(f"Manifest: {result['manifest']}")
+        update_case_index(args)
+
+
+def emit_event(event: Dict[str, any]) -> None:
+    """Write one compact NDJSON event to stdout"""
+    print(json.dumps(event, separators=(',', ':')), flush=True)
+
+
+def run_ndjson_action(args: argparse.Namespace, tool: MobileForensicTool) -> None:
+    """Carry out list/info/extract, streaming results as NDJSON events
+    
+    ``list`` emits a ``device`` event per device and ``info`` a single
+    ``info`` event. ``extract`` emits ``artifact`` and ``step`` events as
+    steps finish, an ``extraction`` event per device, and with
+    ``--all-devices`` a closing ``summary`` event.
+    """
+    if args.action in ('info', 'extract') and not args.device and not (
+            args.action == 'extract' and args.all_devices):
+        emit_event({'event': 'error', 'message': f'--device is required for {args.action} action'})
+        sys.exit(1)
+    
+    if args.action == 'list':
+        for device in tool.list_devices():
+            emit_event({'event': 'device', 'device': device, 'timestamp': tool._timestamp()})
+    
+    elif args.action == 'info':
+        emit_event({'event': 'info', 'device_id': args.device,
+                    'info': tool.get_device_info(args.device), 'timestamp': tool._timestamp()})
+    
+    elif args.all_devices:
+        tool.on_event = emit_event
+        summary = tool.extract_all_devices(args.output, args.max_workers,
+                                           incremental=args.incremental)
+        emit_event({'event': 'summary', 'platform': summary['platform'],
+                    'output_dir': summary['output_dir'], 'device_count': summary['device_count'],
+                    'summary_file': os.path.join(args.output, 'extraction_summary.json'),
+                    'timestamp': tool._timestamp()})
+        update_case_index(args, emit_event)
+    
+    else:
+        tool.on_event = emit_event
+        tool.extract_data(args.device, args.output, incremental=args.incremental)
+        update_case_index(args, emit_event)
+
+
+def update_case_index(args: argparse.Namespace,
+                      emit: Optional[Callable[[Dict[str, any]], None]] = None) -> None:
+    """Ingest the output directory into ``--case-index``, if given
+    
+    Reports as text, or as a ``case_index`` event through ``emit``.
+    """
+    if not args.case_index:
+        return
+    try:
+        with CaseIndex(args.case_index) as case_index:
+            stats = case_index.update([args.output])
+        if emit is not None:
+            emit({'event': 'case_index', 'path': args.case_index, **stats})
+            return
+        print(f"Case index {args.case_index}: {stats['indexed']} extraction(s) indexed, "
+              f"{stats['unchanged']} unchanged")
+    except (RuntimeError, OSError, ValueError) as e:
+        if emit is not None:
+            emit({'event': 'case_index', 'path': args.case_index, 'error': str(e)})
+            return
+        print(f"Case index update failed: {e}")
 
 
 if __name__ == '__main__':
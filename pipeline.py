@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Extraction pipeline
+A registry of named artifact steps per platform, and a scheduler that runs
+a configured plan of them as a dependency graph with priorities and a
+concurrency limit
+"""
+
+import asyncio
+import importlib
+from typing import Callable, Dict, List, Optional
+
+
+# (platform, step name) -> builder
+STEPS = {}
+
+# (platform, step name) -> the step-specific plan options its builder reads,
+# or None when it takes any
+STEP_OPTIONS = {}
+
+# Plan entry keys handled by the scheduler for every step
+PLAN_KEYS = {'step', 'name', 'after', 'priority', 'enabled', 'step_timeout'}
+
+# Extra keys of a command-defined step
+COMMAND_KEYS = {'command', 'output', 'timeout'}
+
+
+class PlanError(ValueError):
+    """The configured extraction plan cannot be run"""
+
+
+def register_step(platform: str, name: str,
+                  options: Optional[List[str]] = None) -> Callable:
+    """Decorator registering a step builder under ``name`` for ``platform``
+
+    A builder is called as ``builder(tool, device_id, output_dir, state, options)``
+    and returns the step's coroutine, or None when the step does not apply
+    (e.g. an optional collector whose CLI flag is not set). ``options`` is
+    the step's entry from the plan, so builders can read their own
+    settings such as ``timeout``. Declaring those settings in ``options``
+    makes ``parse_plan`` reject any other key for the step instead of
+    silently ignoring it; None accepts anything. Registering a name again
+    replaces the earlier builder.
+    """
+    def decorator(builder: Callable) -> Callable:
+        STEPS[(platform, name)] = builder
+        STEP_OPTIONS[(platform, name)] = None if options is None else set(options)
+        return builder
+    return decorator
+
+
+def load_plugins(modules: List[str]) -> None:
+    """Import modules that register extra steps"""
+    for module in modules:
+        importlib.import_module(module)
+
+
+class PlanStep:
+    """One entry of an extraction plan"""
+
+    def __init__(self, name: str, options: Dict[str, any]):
+        self.name = name
+        self.options = options
+        self.after = list(options.get('after', []))
+        self.priority = options.get('priority', 0)
+        self.command = options.get('command')
+        # Seconds the whole step may take (None: no limit)
+        self.timeout = options.get('step_timeout')
+
+
+def produced(result: any) -> bool:
+    """Whether a step result holds anything; None and [] mean the step failed"""
+    return result is not None and result != []
+
+
+def parse_plan(platform: str, entries: List[any]) -> List[PlanStep]:
+    """Validate a plan and return its enabled steps in plan order
+
+    Each entry is a registered step name, or an object with ``step`` (or
+    ``name``) and optional ``after``, ``priority``, ``enabled`` and
+    ``step_timeout``, plus the options the step itself declares (e.g.
+    ``timeout``). An object
+    with a ``command`` (a list whose ``{device}`` items are replaced by the
+    device ID) defines a new collector writing to ``output`` (default
+    ``<name>.txt``) with an optional ``timeout``.
+    """
+    steps = []
+    for entry in entries:
+        options = {'step': entry} if isinstance(entry, str) else dict(entry)
+        name = options.get('step') or options.get('name')
+        if not isinstance(name, str):
+            raise PlanError(f'Plan entry without a step name: {entry!r}')
+        if not options.get('enabled', True):
+            continue
+        if 'command' in options:
+            if not isinstance(options['command'], list) or not options['command']:
+                raise PlanError(f'{name}: command must be a non-empty list')
+            accepted = COMMAND_KEYS
+        elif (platform, name) not in STEPS:
+            raise PlanError(f'Unknown {platform} step: {name}')
+        else:
+            accepted = STEP_OPTIONS.get((platform, name))
+        if accepted is not None:
+            unsupported = sorted(set(options) - PLAN_KEYS - accepted)
+            if unsupported:
+                raise PlanError(f'{name}: unsupported option(s) {", ".join(unsupported)}')
+        limit = options.get('step_timeout')
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, (int, float))
+                                  or limit <= 0):
+            raise PlanError(f'{name}: step_timeout must be a positive number of seconds')
+        steps.append(PlanStep(name, options))
+
+    names = [step.name for step in steps]
+    if len(set(names)) != len(names):
+        raise PlanError(f'Duplicate steps in plan: {names}')
+    for step in steps:
+        for dependency in step.after:
+            if dependency not in names:
+                raise PlanError(f'{step.name}: unknown or disabled dependency {dependency}')
+
+    # Reject cycles before anything runs
+    remaining = {step.name: set(step.after) for step in steps}
+    while remaining:
+        ready = [name for name, after in remaining.items() if not after & set(remaining)]
+        if not ready:
+            raise PlanError(f'Dependency cycle among: {sorted(remaining)}')
+        for name in ready:
+            del remaining[name]
+    return steps
+
+
+async def run_plan(steps: List[PlanStep], start: Callable,
+                   max_parallel: Optional[int] = None,
+                   on_skip: Optional[Callable] = None,
+                   on_timeout: Optional[Callable] = None) -> List[any]:
+    """Run ``steps`` and return their results in plan order
+
+    ``start(step)`` returns the step's coroutine, or None when it has
+    nothing to do. A step starts once everything in its ``after`` list has
+    finished; among ready steps the highest ``priority`` goes first, then
+    plan order. At most ``max_parallel`` steps run at once (None: no
+    limit). A step still running after its ``step_timeout`` is cancelled,
+    reported to ``on_timeout(step)`` and counts as failed. A step whose
+    dependency failed (produced None or an empty list) is skipped and
+    reported to ``on_skip(step, dependency)``. An exception raised by a
+    step cancels the others and propagates.
+    """
+    results = {}
+    failed = set()
+    waiting = list(steps)
+    running = {}
+    try:
+        while waiting or running:
+            ready = [step for step in waiting if all(name in results for name in step.after)]
+            ready.sort(key=lambda step: -step.priority)
+            for step in ready:
+                if max_parallel and len(running) >= max_parallel:
+                    break
+                waiting.remove(step)
+                blocked = next((name for name in step.after if name in failed), None)
+                if blocked is not None:
+                    failed.add(step.name)
+                    results[step.name] = None
+                    if on_skip is not None:
+                        on_skip(step, blocked)
+                    continue
+                coroutine = start(step)
+                if coroutine is None:
+                    results[step.name] = None
+                    continue
+                if step.timeout is not None:
+                    coroutine = asyncio.wait_for(coroutine, step.timeout)
+                running[asyncio.ensure_future(coroutine)] = step
+            if not running:
+                continue
+            done, _ = await asyncio.wait(list(running), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step = running.pop(task)
+                try:
+                    results[step.name] = task.result()
+                except asyncio.TimeoutError:
+                    if step.timeout is None:
+                        raise
+                    results[step.name] = None
+                    if on_timeout is not None:
+                        on_timeout(step)
+                if not produced(results[step.name]):
+                    failed.add(step.name)
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+    return [results[step.name] for step in steps]
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+JSON-RPC service mode
+Keeps one tool instance per platform alive and answers newline-delimited
+JSON-RPC 2.0 requests over stdin/stdout or a local Unix socket, so warm
+caches and pooled adb connections carry over between calls
+"""
+
+import asyncio
+import errno
+import inspect
+import json
+import os
+import socket
+import stat
+import sys
+from typing import Dict, Optional
+
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# Longest request line accepted on the Unix socket
+MAX_LINE = 1024 * 1024
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Remove a Unix socket at ``path`` that nothing listens on any more
+
+    Raises ``FileExistsError`` when the path is not a socket or another
+    server still accepts connections on it.
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(errno.EEXIST, 'exists and is not a socket', path)
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise FileExistsError(errno.EEXIST, 'another server is listening on it', path)
+
+
+class RpcError(Exception):
+    """A JSON-RPC error response"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class RpcServer:
+    """Dispatch JSON-RPC requests to long-lived ``MobileForensicTool`` instances
+
+    ``tools`` maps a platform name (``android``, ``ios``) to its tool. Every
+    request runs as its own task, so slow extractions do not hold up other
+    calls; responses are written as requests finish and matched by ``id``.
+    Methods take named (or positional) params:
+
+    - ``list(platform=None)``
+    - ``info(device, platform=None)``
+    - ``extract(device=None, all_devices=False, output=None, incremental=False,
+      max_workers=4, platform=None)``
+    """
+
+    def __init__(self, tools: Dict[str, any], default_platform: str, output_dir: str):
+        self.tools = tools
+        self.default_platform = default_platform
+        self.output_dir = output_dir
+        self.methods = {'list': self._list, 'info': self._info, 'extract': self._extract}
+
+    def _tool(self, platform: Optional[str]):
+        platform = platform or self.default_platform
+        if platform not in self.tools:
+            raise RpcError(INVALID_PARAMS, f'Unknown platform: {platform}')
+        return self.tools[platform]
+
+    async def _list(self, platform: Optional[str] = None):
+        return await self._tool(platform).list_devices_async()
+
+    async def _info(self, device: str, platform: Optional[str] = None):
+        return await self._tool(platform).get_device_info_async(device)
+
+    async def _extract(self, device: Optional[str] = None, all_devices: bool = False,
+                       output: Optional[str] = None, incremental: bool = False,
+                       max_workers: int = 4, platform: Optional[str] = None):
+        tool = self._tool(platform)
+        if all_devices:
+            return await tool.extract_all_devices_async(output or self.output_dir,
+                                                        max_workers, incremental)
+        if not device:
+            raise RpcError(INVALID_PARAMS, 'device is required unless all_devices is set')
+        output = output or os.path.join(self.output_dir, tool._device_dir_name(device))
+        return await tool.extract_data_async(device, output, incremental)
+
+    async def handle(self, line: bytes) -> Optional[Dict[str, any]]:
+        """Answer one request line; None for notifications (requests without an id)"""
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                raise RpcError(PARSE_ERROR, f'Parse error: {e}')
+            if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                raise RpcError(INVALID_REQUEST, 'Invalid request')
+            request_id = request.get('id')
+            method = self.methods.get(request['method'])
+            if method is None:
+                raise RpcError(METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+            params = request.get('params', {})
+            args, kwargs = (params, {}) if isinstance(params, list) else ([], params)
+            if not isinstance(kwargs, dict):
+                raise RpcError(INVALID_PARAMS, 'params must be an object or an array')
+            try:
+                inspect.signature(method).bind(*args, **kwargs)
+            except TypeError as e:
+                raise RpcError(INVALID_PARAMS, f'Invalid params: {e}')
+            result = await method(*args, **kwargs)
+            if 'id' not in request:
+                return None
+            return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except RpcError as e:
+            error = {'code': e.code, 'message': e.message}
+        except Exception as e:
+            error = {'code': INTERNAL_ERROR, 'message': f'{type(e).__name__}: {e}'}
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': error}
+
+    def _dispatch(self, line: bytes, respond, pending: set) -> None:
+        """Handle ``line`` in a new task (tracked in ``pending``) and pass the response to ``respond``"""
+        async def run():
+            response = await self.handle(line)
+            if response is not None:
+                await respond((json.dumps(response) + '\n').encode('utf-8'))
+
+        task = asyncio.ensure_future(run())
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    @staticmethod
+    async def _drain(pending: set) -> None:
+        """Wait for in-flight requests"""
+        while pending:
+            await asyncio.gather(*list(pending), return_exceptions=True)
+
+    async def serve_stdio(self) -> None:
+        """Serve requests from stdin until it is closed"""
+        loop = asyncio.get_event_loop()
+        stdout = sys.stdout.buffer
+        pending = set()
+
+        async def respond(data: bytes) -> None:
+            stdout.write(data)
+            stdout.flush()
+
+        while True:
+            # A thread read keeps this working for pipes, files and terminals alike
+            line = await loop.run_in_executor(None, sys.stdin.buffer.readline)
+            if not line:
+                break
+            if line.strip():
+                self._dispatch(line, respond, pending)
+        await self._drain(pending)
+
+    async def serve_unix(self, path: str) -> None:
+        """Serve requests on a Unix socket at ``path`` until cancelled"""
+        async def connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            lock = asyncio.Lock()
+            pending = set()
+
+            async def respond(data: bytes) -> None:
+                async with lock:
+                    writer.write(data)
+                    await writer.drain()
+
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    if line.strip():
+                        self._dispatch(line, respond, pending)
+            except (ConnectionError, ValueError):
+                pass
+            finally:
+                await self._drain(pending)
+                writer.close()
+
+        _remove_stale_socket(path)
+        server = await asyncio.start_unix_server(connection, path, limit=MAX_LINE)
+        bound = os.lstat(path).st_ino
+        try:
+            await server.serve_forever()
+        finally:
+            server.close()
+            await server.wait_closed()
+            # Only remove our own socket, not whatever may have replaced it
+            try:
+                if os.lstat(path).st_ino == bound:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    async def close(self) -> None:
+        """Release the tools' pooled adb connections"""
+        for tool in self.tools.values():
+            if tool.adb_client is not None:
+                await tool.adb_client.close()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Streaming tar inventory
+Parses a tar archive as it arrives, chunk by chunk, and hashes every
+member's content on the way, so a bulk acquisition can be stored as a
+single archive while still yielding a per-file inventory
+"""
+
+import hashlib
+from typing import Dict
+
+
+BLOCK = 512
+
+TYPES = {
+    b'0': 'file', b'\0': 'file', b'7': 'file',
+    b'1': 'hardlink', b'2': 'symlink', b'3': 'char', b'4': 'block',
+    b'5': 'dir', b'6': 'fifo'
+}
+
+
+def _number(field: bytes) -> int:
+    """Decode a tar numeric field (octal text, or GNU base-256 for large values)"""
+    if field and field[0] & 0x80:
+        return int.from_bytes(bytes([field[0] & 0x7f]) + field[1:], 'big')
+    text = field.split(b'\0', 1)[0].strip()
+    return int(text, 8) if text else 0
+
+
+def _string(field: bytes) -> str:
+    return field.split(b'\0', 1)[0].decode('utf-8', 'surrogateescape')
+
+
+def _pax_records(data: bytes) -> Dict[str, str]:
+    """Parse pax extended header records (``<length> <key>=<value>\\n``)"""
+    records = {}
+    position = 0
+    while position < len(data):
+        space = data.find(b' ', position)
+        if space < 0:
+            break
+        length = int(data[position:space])
+        if length <= 0:
+            break
+        key, _, value = data[space + 1:position + length - 1].partition(b'=')
+        records[key.decode('utf-8', 'replace')] = value.decode('utf-8', 'surrogateescape')
+        position += length
+    return records
+
+
+class TarInventory:
+    """Hash the members of a tar stream as it passes through
+
+    Use it as a stream transform: ``feed`` takes each chunk and returns it
+    unchanged, ``flush`` ends the stream. ``members`` then lists every
+    entry with its path, type, size, mode, mtime, link target and, for
+    regular files, the digest of its content. Only the current member's
+    header is buffered, so memory use does not depend on the archive.
+    Understands ustar, GNU long names and pax extended headers.
+    """
+
+    def __init__(self, algorithm: str = 'sha256'):
+        self.algorithm = algorithm
+        self.members = []
+        self.bytes_seen = 0
+        self.complete = False
+        self._buffer = bytearray()
+        self._remaining = 0      # content bytes left in the current member
+        self._padding = 0        # zero bytes after the content
+        self._member = None
+        self._hasher = None
+        self._extended = None    # collecting a GNU long name or pax header
+        self._overrides = {}
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Consume the next piece of the archive"""
+        self.bytes_seen += len(chunk)
+        data = memoryview(chunk)
+        while data and not self.complete:
+            if self._remaining:
+                take = data[:self._remaining]
+                self._content(take)
+                self._remaining -= len(take)
+                data = data[len(take):]
+                if not self._remaining:
+                    self._finish_member()
+            elif self._padding:
+                skip = min(self._padding, len(data))
+                self._padding -= skip
+                data = data[skip:]
+            else:
+                need = BLOCK - len(self._buffer)
+                self._buffer += data[:need]
+                data = data[need:]
+                if len(self._buffer) == BLOCK:
+                    header = bytes(self._buffer)
+                    self._buffer = bytearray()
+                    self._header(header)
+        return chunk
+
+    def flush(self) -> bytes:
+        """End of stream"""
+        return b''
+
+    def _header(self, header: bytes) -> None:
+        if header == b'\0' * BLOCK:
+            # End-of-archive marker
+            self.complete = True
+            return
+        size = _number(header[124:136])
+        typeflag = header[156:157]
+        if typeflag not in (b'L', b'K', b'x', b'g') and 'size' in self._overrides:
+            # pax carries sizes the 12-byte field cannot hold (8 GiB and up)
+            size = int(self._overrides['size'])
+        self._padding = -size % BLOCK
+        self._remaining = size
+        if typeflag in (b'L', b'K', b'x', b'g'):
+            self._extended = (typeflag, bytearray())
+        else:
+            name = _string(header[0:100])
+            if header[257:262] == b'ustar' and header[345]:
+                name = _string(header[345:500]) + '/' + name
+            path = self._overrides.get('path', name)
+            kind = TYPES.get(typeflag, 'other')
+            if kind == 'dir':
+                # Directories are stored as ``name/``; report them like tarfile does
+                path = path.rstrip('/') or path
+            self._member = {
+                'path': path,
+                'type': kind,
+                'size': size if kind == 'file' else 0,
+                'mode': oct(_number(header[100:108]) & 0o7777),
+                'mtime': int(float(self._overrides.get('mtime', _number(header[136:148])))),
+            }
+            link = self._overrides.get('linkpath', _string(header[157:257]))
+            if link:
+                self._member['link'] = link
+            self._overrides = {}
+            self._hasher = hashlib.new(self.algorithm) if self._member['type'] == 'file' else None
+        if not size:
+            self._finish_member()
+
+    def _content(self, data: memoryview) -> None:
+        if self._extended is not None:
+            self._extended[1].extend(data)
+        elif self._hasher is not None:
+            self._hasher.update(data)
+
+    def _finish_member(self) -> None:
+        if self._extended is not None:
+            typeflag, data = self._extended
+            self._extended = None
+            if typeflag == b'L':
+                self._overrides['path'] = _string(bytes(data))
+            elif typeflag == b'K':
+                self._overrides['linkpath'] = _string(bytes(data))
+            elif typeflag == b'x':
+                self._overrides.update(_pax_records(bytes(data)))
+            return
+        if self._member is not None:
+            if self._hasher is not None:
+                self._member[self.algorithm] = self._hasher.hexdigest()
+            self.members.append(self._member)
+            self._member = None
+            self._hasher = None
@@ -5,7 +5,10 @@ Tests basic functionality without requiring actual devices
 """
 
 import json
+import os
 import sys
+import tempfile
+from contextlib import ExitStack, contextmanager
 from mobile_forensic_tool import MobileForensicTool, Platform
 
 
@@ -109,6 +112,1666 @@ def test_json_serialization():
     print("✓ JSON serialization tests passed")
 
 
+def test_getprop_parsing():
+    """Test batched getprop dump parsing"""
+    print("\nTesting getprop parsing...")
+    dump = (
+        "[ro.product.model]: [Pixel 7]\n"
+        "[ro.product.manufacturer]: [Google]\n"
+        "[ro.build.version.sdk]: [34]\n"
+        "[persist.sys.empty]: []\n"
+        "garbage line\n"
+    )
+    props = MobileForensicTool._parse_getprop(dump)
+    assert props['ro.product.model'] == 'Pixel 7'
+    assert props['ro.product.manufacturer'] == 'Google'
+    assert props['ro.build.version.sdk'] == '34'
+    assert props['persist.sys.empty'] == ''
+    assert len(props) == 4
+    print("✓ getprop parsing tests passed")
+
+
+def test_extract_all_devices():
+    """Test multi-device extraction: summary, worker limit and failure isolation"""
+    print("\nTesting multi-device extraction...")
+    android_tool = MobileForensicTool(Platform.ANDROID)
+    with tempfile.TemporaryDirectory() as output_dir:
+        summary = android_tool.extract_all_devices(output_dir, max_workers=2)
+        assert summary['platform'] == 'android'
+        assert summary['device_count'] == len(summary['devices'])
+        assert os.path.exists(os.path.join(output_dir, 'extraction_summary.json'))
+    assert MobileForensicTool._device_dir_name('192.168.1.5:5555') == '192.168.1.5_5555'
+    
+    # Four devices with different delays, two workers; SERIAL3 fails every command
+    with fake_tools(adb=FAKE_MULTI_ADB) as tmp:
+        log = os.path.join(tmp, 'calls.log')
+        os.environ['FAKE_ADB_LOG'] = log
+        try:
+            output_dir = os.path.join(tmp, 'out')
+            summary = android_tool.extract_all_devices(output_dir, max_workers=2)
+        finally:
+            del os.environ['FAKE_ADB_LOG']
+        with open(log) as f:
+            calls = [line.split() for line in f]
+        assert summary['device_count'] == 4
+        results = {device['device_id']: device for device in summary['devices']}
+        assert list(results) == ['SERIAL1', 'SERIAL2', 'SERIAL3', 'SERIAL4']
+        assert results['SERIAL3']['errors']
+        assert not results['SERIAL3']['extracted_items']
+        for serial in ('SERIAL1', 'SERIAL2', 'SERIAL4'):
+            assert results[serial]['errors'] == [], results[serial]['errors']
+            assert len(results[serial]['extracted_items']) == 3
+            with open(os.path.join(output_dir, serial, 'logcat.txt')) as f:
+                assert f.read().endswith('I Tag: %s\n' % serial)
+    
+    # A device is busy from its first command starting to its last one ending
+    spans = {}
+    for serial, start, end in calls:
+        first, last = spans.get(serial, (float(start), float(end)))
+        spans[serial] = (min(first, float(start)), max(last, float(end)))
+    assert sorted(spans) == ['SERIAL1', 'SERIAL2', 'SERIAL3', 'SERIAL4']
+    edges = sorted([(start, 1) for start, _ in spans.values()]
+                   + [(end, -1) for _, end in spans.values()])
+    running = peak = 0
+    for _, change in edges:
+        running += change
+        peak = max(peak, running)
+    assert peak == 2, spans
+    print("✓ Multi-device extraction tests passed")
+
+
+def test_streaming_capture():
+    """Test streaming command output to disk byte-for-byte with inline digests"""
+    print("\nTesting streaming capture...")
+    import asyncio
+    import hashlib
+    import subprocess
+    tool = MobileForensicTool(Platform.ANDROID, hash_algorithms=['md5'])
+    assert tool.hash_algorithms == ['md5', 'sha256']
+    chunk = b'line one\r\nline two\n\xff\x00binary'
+    payload = chunk * 20000
+    script = "import sys; sys.stdout.buffer.write(%r * 20000)" % chunk
+    with tempfile.TemporaryDirectory() as output_dir:
+        path = os.path.join(output_dir, 'out.txt')
+        cmd = [sys.executable, '-c', script]
+        item = asyncio.run(tool._capture_to_file(cmd, path, timeout=30))
+        assert item['exit_code'] == 0
+        with open(path, 'rb') as f:
+            assert f.read() == payload
+        assert item['name'] == 'out.txt'
+        assert item['size'] == len(payload)
+        assert item['command'] == cmd
+        assert item['digests']['sha256'] == hashlib.sha256(payload).hexdigest()
+        assert item['digests']['md5'] == hashlib.md5(payload).hexdigest()
+        assert item['started_at'] <= item['finished_at']
+        
+        # Failed commands leave no artifact behind
+        failed = os.path.join(output_dir, 'failed.txt')
+        item = asyncio.run(tool._capture_to_file(
+            [sys.executable, '-c', 'import sys; sys.exit(3)'], failed, timeout=30))
+        assert item['exit_code'] == 3
+        assert not os.path.exists(failed)
+        
+        # Timeouts raise like subprocess.run and clean up the partial file
+        slow = os.path.join(output_dir, 'slow.txt')
+        try:
+            asyncio.run(tool._capture_to_file(
+                [sys.executable, '-c', 'import time; time.sleep(30)'], slow, timeout=0.5))
+            assert False, 'expected TimeoutExpired'
+        except subprocess.TimeoutExpired:
+            pass
+        assert os.listdir(output_dir) == ['out.txt']
+    print("✓ Streaming capture tests passed")
+
+
+def test_extraction_manifest():
+    """Test that extraction writes a manifest.json"""
+    print("\nTesting extraction manifest...")
+    android_tool = MobileForensicTool(Platform.ANDROID)
+    with tempfile.TemporaryDirectory() as output_dir:
+        result = android_tool.extract_data('TEST_DEVICE', output_dir)
+        assert result['manifest'] == os.path.join(output_dir, 'manifest.json')
+        with open(result['manifest']) as f:
+            manifest = json.load(f)
+        assert manifest['device_id'] == 'TEST_DEVICE'
+        assert manifest['hash_algorithms'] == ['sha256']
+        assert manifest['items'] == result['extracted_items']
+    print("✓ Extraction manifest tests passed")
+
+
+def _install_fake_tool(bin_dir, name, source):
+    """Write a Python stand-in for an external tool into bin_dir"""
+    path = os.path.join(bin_dir, name)
+    with open(path, 'w') as f:
+        f.write('#!%s\n%s' % (sys.executable, source))
+    os.chmod(path, 0o755)
+    return path
+
+
+@contextmanager
+def fake_tools(tmp=None, **tools):
+    """Put Python stand-ins for external tools first on PATH for a block
+    
+    Each keyword names a tool and gives its source; the tools are written
+    to ``<tmp>/bin``. Without ``tmp`` a temporary directory is created for
+    the block and yielded. PATH is restored however the block exits.
+    """
+    with ExitStack() as stack:
+        if tmp is None:
+            tmp = stack.enter_context(tempfile.TemporaryDirectory())
+        bin_dir = os.path.join(tmp, 'bin')
+        os.makedirs(bin_dir, exist_ok=True)
+        for name, source in tools.items():
+            _install_fake_tool(bin_dir, name, source)
+        old_path = os.environ['PATH']
+        os.environ['PATH'] = bin_dir + os.pathsep + old_path
+        try:
+            yield tmp
+        finally:
+            os.environ['PATH'] = old_path
+
+
+# adb for several devices: each -s serial answers after its own delay,
+# SERIAL3 fails everything, and each call's span goes to FAKE_ADB_LOG
+FAKE_MULTI_ADB = r"""
+import os, sys, time
+started = time.time()
+args = sys.argv[1:]
+serial = None
+if args[:1] == ['-s']:
+    serial, args = args[1], args[2:]
+if args == ['devices', '-l']:
+    print('List of devices attached')
+    for i in range(1, 5):
+        print('SERIAL%d device usb:1-%d model:Model_SERIAL%d' % (i, i, i))
+    sys.exit(0)
+time.sleep({'SERIAL1': 0.2, 'SERIAL2': 0.5, 'SERIAL3': 0.1, 'SERIAL4': 0.3}[serial])
+if args == ['shell', 'getprop']:
+    print('[ro.product.model]: [Model_%s]' % serial)
+elif args[:3] == ['shell', 'pm', 'list']:
+    print('package:com.example.app')
+elif args[:2] == ['logcat', '-d']:
+    print('10-17 10:00:00.000  100  101 I Tag: %s' % serial)
+with open(os.environ['FAKE_ADB_LOG'], 'a') as f:
+    f.write('%s %f %f\n' % (serial, started, time.time()))
+if serial == 'SERIAL3':
+    sys.stderr.write('error: device offline\n')
+    sys.exit(1)
+"""
+
+
+FAKE_ADB = r"""
+import sys, time
+args = sys.argv[1:]
+if args[:1] == ['-s']:
+    args = args[2:]
+if args == ['version']:
+    print('Android Debug Bridge version 1.0.41')
+elif args == ['devices', '-l']:
+    print('List of devices attached')
+    print('SERIAL1 device usb:1-1 model:Pixel_7')
+elif args == ['shell', 'getprop']:
+    time.sleep(0.4)
+    print('[ro.product.model]: [Pixel 7]')
+    print('[ro.build.version.sdk]: [34]')
+elif args[:3] == ['shell', 'pm', 'list']:
+    time.sleep(0.4)
+    if '-f' in args:
+        print('package:/data/app/~~x1/com.example.app-y1/base.apk=com.example.app '
+              'versionCode:42 installer=com.android.vending uid:10123')
+    else:
+        print('package:com.example.app')
+elif args[:3] == ['shell', 'dumpsys', 'package']:
+    time.sleep(0.4)
+    print('Packages:')
+    print('  Package [com.example.app] (5d3c1a2):')
+    print('    userId=10123')
+    print('    versionCode=42 minSdk=24 targetSdk=34')
+    print('    versionName=4.2.0')
+    print('    pkgFlags=[ HAS_CODE ALLOW_CLEAR_USER_DATA ]')
+    print('    firstInstallTime=2026-01-02 03:04:05')
+    print('    lastUpdateTime=2026-10-01 12:00:00')
+    print('    installerPackageName=com.android.vending')
+    print('  Package [com.android.settings] (77aa):')
+    print('    userId=1000')
+    print('    codePath=/system/priv-app/Settings')
+    print('    versionCode=34 minSdk=34 targetSdk=34')
+    print('    pkgFlags=[ SYSTEM HAS_CODE ]')
+    print('    installerPackageName=null')
+    print('')
+    print('Shared users:')
+elif args == ['shell', 'dumpsys', '-l']:
+    print('Currently running services:')
+    for service in ['activity', 'battery', 'hung', 'meminfo', 'android.hardware.power.IPower/default']:
+        print('  ' + service)
+elif args[:2] == ['shell', 'dumpsys']:
+    time.sleep(30 if args[2] == 'hung' else 0.4)
+    print('DUMP OF SERVICE %s:' % args[2])
+    print('  state=%s\n' % args[2] * 50, end='')
+elif args == ['logcat', '-T', '1']:
+    for i in range(200):
+        print('10-17 10:00:%02d.000  100  101 I Live: streamed line %d' % (i % 60, i))
+    sys.stdout.flush()
+    time.sleep(30)
+elif args[:2] == ['logcat', '-d']:
+    time.sleep(0.4)
+    print('10-17 10:00:00.000  100  101 I Tag: hello')
+elif args[:1] == ['exec-out']:
+    # Device shell: du sizes children, tar archives FAKE_DEVICE_ROOT-relative paths
+    import os, shlex, tarfile
+    root = os.environ['FAKE_DEVICE_ROOT']
+    argv = [arg for arg in shlex.split(' '.join(args[1:])) if arg != '2>/dev/null']
+    if argv[0] == 'du':
+        base = argv[-1].rstrip('/')
+        for name in sorted(os.listdir(root + base)):
+            path = root + base + '/' + name
+            size = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(path) for f in fs)
+            print('%d\t%s/%s' % (size // 1024 + 1, argv[-1], name))
+        print('100\t%s' % argv[-1])
+    elif argv[0] == 'tar':
+        missing = False
+        with tarfile.open(fileobj=sys.stdout.buffer, mode='w|') as archive:
+            for path in argv[3:]:
+                if os.path.exists(root + path):
+                    archive.add(root + path, arcname=path.lstrip('/'))
+                else:
+                    missing = True
+        sys.exit(1 if missing else 0)
+elif args == ['track-devices']:
+    for update in ['SERIAL1\tdevice\n', 'SERIAL1\tdevice\nSERIAL2\tunauthorized\n',
+                   'SERIAL2\tdevice\n']:
+        sys.stdout.write('%04x%s' % (len(update), update))
+        sys.stdout.flush()
+        time.sleep(0.1)
+    time.sleep(30)
+else:
+    sys.exit(1)
+"""
+
+
+def test_async_extraction():
+    """Test that independent extraction steps run concurrently"""
+    print("\nTesting asyncio extraction...")
+    import asyncio
+    import time
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        tool = MobileForensicTool(Platform.ANDROID)
+        assert [d['id'] for d in tool.list_devices()] == ['SERIAL1']
+        
+        start = time.monotonic()
+        result = tool.extract_data('SERIAL1', os.path.join(tmp, 'out'))
+        elapsed = time.monotonic() - start
+        names = [item['name'] for item in result['extracted_items']]
+        assert names == ['device_info.txt', 'installed_packages.txt', 'logcat.txt']
+        # Three 0.4s steps overlap instead of taking 1.2s back to back
+        assert elapsed < 1.1, elapsed
+        print(f"  Extracted {len(names)} items in {elapsed:.2f}s")
+        
+        # Cancelling an extraction kills its children and drops partial files
+        async def cancel_capture():
+            task = asyncio.ensure_future(tool._capture_to_file(
+                [sys.executable, '-c', 'import time; time.sleep(30)'],
+                os.path.join(tmp, 'cancelled.txt'), timeout=30))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            try:
+                await task
+                assert False, 'expected CancelledError'
+            except asyncio.CancelledError:
+                pass
+        asyncio.run(cancel_capture())
+        assert not os.path.exists(os.path.join(tmp, 'cancelled.txt.part'))
+    print("✓ Asyncio extraction tests passed")
+
+
+class _FakeAdbServer:
+    """Stand-in adb server speaking the host protocol on a local port
+    
+    ``devices`` maps a serial to its shell commands and their output, or
+    ``(output, exit status)``; unknown commands exit 127. Serials in
+    ``legacy`` have no ``shell_v2`` feature.
+    """
+    
+    def __init__(self, devices, legacy=()):
+        import socket
+        import socketserver
+        import struct
+        import threading
+        self.devices = devices
+        self.legacy = set(legacy)
+        self.requests = []
+        server = self
+        
+        class Handler(socketserver.BaseRequestHandler):
+            def read_request(self):
+                header = self.request.recv(4, socket.MSG_WAITALL)
+                if len(header) < 4:
+                    return None
+                length = int(header, 16)
+                return self.request.recv(length, socket.MSG_WAITALL).decode()
+            
+            def reply(self, status, data=None):
+                payload = status
+                if data is not None:
+                    payload += b'%04x' % len(data) + data
+                self.request.sendall(payload)
+            
+            def handle(self):
+                service = self.read_request()
+                if service is None:
+                    return
+                server.requests.append(service)
+                if service == 'host:version':
+                    self.reply(b'OKAY', b'0029')
+                elif service == 'host:devices-l':
+                    lines = ''.join('%s device usb:1-1 model:Fake\n' % serial
+                                    for serial in server.devices)
+                    self.reply(b'OKAY', lines.encode())
+                elif service.startswith('host-serial:') and service.endswith(':features'):
+                    serial = service[len('host-serial:'):-len(':features')]
+                    if serial not in server.devices:
+                        self.reply(b'FAIL', b"device '%s' not found" % serial.encode())
+                    elif serial in server.legacy:
+                        self.reply(b'OKAY', b'cmd')
+                    else:
+                        self.reply(b'OKAY', b'shell_v2,cmd,stat_v2')
+                elif service.startswith('host:transport:'):
+                    serial = service.split(':', 2)[2]
+                    if serial not in server.devices:
+                        self.reply(b'FAIL', b"device '%s' not found" % serial.encode())
+                        return
+                    self.reply(b'OKAY')
+                    service = self.read_request()
+                    server.requests.append(service)
+                    self.reply(b'OKAY')
+                    command = service[len('shell,v2,raw:'):]
+                    output = server.devices[serial].get(command, (b'', 127))
+                    output, status = output if isinstance(output, tuple) else (output, 0)
+                    for start in range(0, len(output), 4096):
+                        data = output[start:start + 4096]
+                        self.request.sendall(struct.pack('<BI', 1, len(data)) + data)
+                    self.request.sendall(struct.pack('<BIB', 3, 1, status))
+        
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_adb_server_transport():
+    """Test the native adb host protocol transport against a stand-in server"""
+    print("\nTesting adb server transport...")
+    import asyncio
+    from adb_client import AdbClient
+    logcat = b'10-17 10:00:00.000  100  101 I Tag: hello\r\n\xff'
+    fake = _FakeAdbServer({
+        'SERIAL1': {
+            'getprop': b'[ro.product.model]: [Pixel 7]\n[ro.serialno]: [SERIAL1]\n',
+            'pm list packages': b'package:com.example.app\n',
+            'logcat -d': logcat,
+        }
+    })
+    # The adb binary fails: everything must go through the server
+    with fake_tools(adb="import sys\nsys.exit('adb binary used')") as tmp:
+        try:
+            async def probe_version():
+                client = AdbClient(port=fake.port)
+                try:
+                    return await client.version()
+                finally:
+                    await client.close()
+            assert asyncio.run(probe_version()) == 0x29
+            
+            tool = MobileForensicTool(Platform.ANDROID, adb_server='127.0.0.1:%d' % fake.port)
+            devices = tool.list_devices()
+            assert [d['id'] for d in devices] == ['SERIAL1']
+            
+            info = tool.get_device_info('SERIAL1')
+            assert info['model'] == 'Pixel 7'
+            assert info['serial'] == 'SERIAL1'
+            assert tool.get_device_info('MISSING') == {'device_id': 'MISSING', 'platform': 'Android'}
+            
+            result = tool.extract_data('SERIAL1', os.path.join(tmp, 'out'))
+            names = [item['name'] for item in result['extracted_items']]
+            assert names == ['device_info.txt', 'installed_packages.txt', 'logcat.txt']
+            with open(os.path.join(tmp, 'out', 'logcat.txt'), 'rb') as f:
+                assert f.read() == logcat
+            assert 'host:transport:SERIAL1' in fake.requests
+            
+            # Incremental logcat resumes over the server with the time as one argument
+            device = fake.devices['SERIAL1']
+            device['logcat -d'] = (b'10-17 10:00:00.000  100  101 I Tag: one\n'
+                                   b'10-17 10:00:01.000  100  101 I Tag: two\n')
+            resumed = os.path.join(tmp, 'resumed')
+            tool.extract_data('SERIAL1', resumed, incremental=True)
+            resume = "logcat -d -T '10-17 10:00:01.000'"
+            device[resume] = (b'--------- beginning of main\n'
+                              b'10-17 10:00:01.000  100  101 I Tag: two\n'
+                              b'10-17 10:00:02.000  100  101 I Tag: three\n')
+            result = tool.extract_data('SERIAL1', resumed, incremental=True)
+            assert 'shell,v2,raw:' + resume in fake.requests and result['errors'] == []
+            with open(os.path.join(resumed, 'logcat.txt'), 'rb') as f:
+                assert f.read() == (b'10-17 10:00:00.000  100  101 I Tag: one\n'
+                                    b'10-17 10:00:01.000  100  101 I Tag: two\n'
+                                    b'10-17 10:00:02.000  100  101 I Tag: three\n')
+            
+            # Exit statuses come through: a failing command is a failure, and
+            # pm falls back to the flags an older device accepts
+            device['pm list packages'] = (b'', 1)
+            device['pm list packages -f -U -i --show-versioncode'] = (b'Unknown option\n', 255)
+            device['pm list packages -f -i'] = \
+                b'package:/data/app/base.apk=com.example.app installer=com.android.vending\n'
+            device['dumpsys package packages'] = \
+                b'Packages:\n  Package [com.example.app] (1):\n    userId=10123\n'
+            tool = MobileForensicTool(
+                Platform.ANDROID, adb_server='127.0.0.1:%d' % fake.port,
+                extraction_config={'data_extraction': ['installed_packages', 'package_inventory']})
+            result = tool.extract_data('SERIAL1', os.path.join(tmp, 'failing'))
+            assert result['errors'] == ['installed_packages.txt: exit code 1']
+            items = {item['name']: item for item in result['extracted_items']}
+            assert 'installed_packages.txt' not in items
+            assert items['package_list.txt']['command'][-2:] == ['-f', '-i']
+            assert items['package_list.txt']['exit_code'] == 0
+            with open(os.path.join(tmp, 'failing', 'package_inventory.json')) as f:
+                assert json.load(f)[0]['installer'] == 'com.android.vending'
+        finally:
+            fake.close()
+    
+    # An unreachable server falls back to the adb binary
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        tool = MobileForensicTool(Platform.ANDROID, adb_server='127.0.0.1:%d' % fake.port)
+        assert [d['id'] for d in tool.list_devices()] == ['SERIAL1']
+        
+        # So do commands for a device without shell_v2, which cannot report exit statuses
+        legacy = _FakeAdbServer({'SERIAL1': {}}, legacy=['SERIAL1'])
+        try:
+            tool = MobileForensicTool(Platform.ANDROID, adb_server='127.0.0.1:%d' % legacy.port)
+            assert tool.get_device_info('SERIAL1')['model'] == 'Pixel 7'
+            assert not any(request.startswith('shell') for request in legacy.requests)
+        finally:
+            legacy.close()
+    print("✓ adb server transport tests passed")
+
+
+def test_watch_devices():
+    """Test event-driven device tracking"""
+    print("\nTesting device tracking...")
+    import asyncio
+    with fake_tools(adb=FAKE_ADB):
+        tool = MobileForensicTool(Platform.ANDROID)
+        
+        async def collect(count):
+            events = []
+            watcher = tool.watch_devices_async(poll_interval=0.1)
+            try:
+                async for event in watcher:
+                    events.append((event['event'], event['device']['id'],
+                                   event['device']['status']))
+                    if len(events) == count:
+                        break
+            finally:
+                await watcher.aclose()
+            return events
+        
+        events = asyncio.run(asyncio.wait_for(collect(4), 10))
+        assert events == [
+            ('connected', 'SERIAL1', 'device'),
+            ('connected', 'SERIAL2', 'unauthorized'),
+            ('changed', 'SERIAL2', 'device'),
+            ('disconnected', 'SERIAL1', 'device'),
+        ], events
+    print("✓ Device tracking tests passed")
+
+
+def test_incremental_extraction():
+    """Test resumable extraction and logcat append"""
+    print("\nTesting incremental extraction...")
+    import hashlib
+    with fake_tools() as tmp:
+        log_source = os.path.join(tmp, 'device_log.txt')
+        calls = os.path.join(tmp, 'calls.txt')
+        _install_fake_tool(os.path.join(tmp, 'bin'), 'adb', r"""
+import os, sys
+args = sys.argv[3:]
+with open(%r, 'a') as f:
+    f.write(' '.join(args) + '\n')
+if '-T' in args and os.environ.get('FAKE_LOGCAT_FAIL'):
+    sys.stdout.write('10-17 10:00:09.000  100  101 I Tag: partial\n')
+    sys.exit(1)
+if args == ['shell', 'getprop']:
+    print('[ro.product.model]: [Pixel 7]')
+elif args[:3] == ['shell', 'pm', 'list']:
+    print('package:com.example.app')
+elif args[:2] == ['logcat', '-d']:
+    lines = open(%r).read().splitlines(True)
+    if '-T' in args:
+        since = args[args.index('-T') + 1]
+        sys.stdout.write('--------- beginning of main\n')
+        lines = [line for line in lines if line[:18] >= since]
+    sys.stdout.write(''.join(lines))
+else:
+    sys.exit(1)
+""" % (calls, log_source))
+        with open(log_source, 'w') as f:
+            f.write('10-17 10:00:00.000  100  101 I Tag: one\n'
+                    '10-17 10:00:01.000  100  101 I Tag: two\n'
+                    '10-17 10:00:01.000  100  101 I Tag: three\n')
+        output_dir = os.path.join(tmp, 'out')
+        tool = MobileForensicTool(Platform.ANDROID)
+        first = tool.extract_data('SERIAL1', output_dir, incremental=True)
+        assert len(first['extracted_items']) == 3
+        assert first['skipped_items'] == []
+        
+        # New entries arrive, including one at the last captured timestamp
+        with open(log_source, 'a') as f:
+            f.write('10-17 10:00:01.000  100  101 I Tag: four\n'
+                    '10-17 10:00:02.000  100  101 I Tag: five\n')
+        os.remove(calls)
+        tool = MobileForensicTool(Platform.ANDROID)
+        second = tool.extract_data('SERIAL1', output_dir, incremental=True)
+        assert second['skipped_items'] == ['device_info.txt', 'installed_packages.txt']
+        with open(calls) as f:
+            assert f.read() == 'logcat -d -T 10-17 10:00:01.000\n'
+        
+        with open(log_source, 'rb') as f:
+            expected = f.read()
+        with open(os.path.join(output_dir, 'logcat.txt'), 'rb') as f:
+            assert f.read() == expected
+        logcat_item = second['extracted_items'][2]
+        assert logcat_item['size'] == len(expected)
+        assert logcat_item['digests']['sha256'] == hashlib.sha256(expected).hexdigest()
+        # Each capture that wrote to the file is kept, with the bytes it added
+        first_logcat = first['extracted_items'][2]
+        assert [(c['command'][-2:], c['offset'], c['bytes']) for c in logcat_item['captures']] == [
+            (['logcat', '-d'], 0, first_logcat['size']),
+            (['-T', '10-17 10:00:01.000'], first_logcat['size'],
+             len(expected) - first_logcat['size'])]
+        assert logcat_item['captures'][0]['started_at'] == first_logcat['started_at']
+        assert logcat_item['captures'][1]['started_at'] == logcat_item['started_at']
+        
+        # A tampered artifact is captured again
+        with open(os.path.join(output_dir, 'installed_packages.txt'), 'a') as f:
+            f.write('package:com.injected\n')
+        third = MobileForensicTool(Platform.ANDROID).extract_data(
+            'SERIAL1', output_dir, incremental=True)
+        assert third['skipped_items'] == ['device_info.txt']
+        
+        # Same size and mtime pass as intact unless reused artifacts are re-hashed
+        device_info = os.path.join(output_dir, 'device_info.txt')
+        stat = os.stat(device_info)
+        with open(device_info, 'r+b') as f:
+            f.write(b'X')
+        os.utime(device_info, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        fourth = MobileForensicTool(Platform.ANDROID).extract_data(
+            'SERIAL1', output_dir, incremental=True)
+        assert fourth['skipped_items'] == ['device_info.txt', 'installed_packages.txt']
+        fifth = MobileForensicTool(Platform.ANDROID, verify=True).extract_data(
+            'SERIAL1', output_dir, incremental=True)
+        assert fifth['skipped_items'] == ['installed_packages.txt']
+        # Later appends extend the history (here with empty captures)
+        assert len(fifth['extracted_items'][2]['captures']) == 5
+        assert fifth['extracted_items'][2]['captures'][-1]['offset'] == len(expected)
+        with open(device_info, 'rb') as f:
+            assert f.read(1) == b'['
+        
+        # A failed append is rolled back and the earlier capture stays in the manifest
+        os.environ['FAKE_LOGCAT_FAIL'] = '1'
+        try:
+            failed = MobileForensicTool(Platform.ANDROID).extract_data(
+                'SERIAL1', output_dir, incremental=True)
+        finally:
+            del os.environ['FAKE_LOGCAT_FAIL']
+        assert failed['errors'] == ['logcat.txt: exit code 1']
+        assert failed['extracted_items'][2] == fifth['extracted_items'][2]
+        with open(os.path.join(output_dir, 'manifest.json')) as f:
+            assert 'logcat.txt' in [item['name'] for item in json.load(f)['items']]
+        with open(os.path.join(output_dir, 'logcat.txt'), 'rb') as f:
+            assert f.read() == expected
+        os.remove(calls)
+        resumed = MobileForensicTool(Platform.ANDROID).extract_data(
+            'SERIAL1', output_dir, incremental=True)
+        assert resumed['errors'] == []
+        with open(calls) as f:
+            assert f.read() == 'logcat -d -T 10-17 10:00:02.000\n'
+    print("✓ Incremental extraction tests passed")
+
+
+def test_block_compression():
+    """Test block-compressed artifacts and random access through the index"""
+    print("\nTesting block compression...")
+    import gzip
+    import hashlib
+    from block_gzip import BlockGzipReader, BlockGzipWriter, read_index, write_index
+    data = b''.join(b'%06d I Tag: line %d\n' % (i, i * 7) for i in range(2000))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'log.txt.gz')
+        with open(path, 'wb') as f:
+            writer = BlockGzipWriter(f.write, block_size=4096)
+            for start in range(0, len(data), 1000):
+                writer.write(data[start:start + 1000])
+            writer.close()
+        write_index(path, writer.blocks, writer.block_size)
+        
+        # Still a plain gzip file for standard tools
+        with open(path, 'rb') as f:
+            assert gzip.decompress(f.read()) == data
+        assert len(read_index(path)) == (len(data) + 4095) // 4096
+        with BlockGzipReader(path) as reader:
+            assert len(reader) == len(data)
+            assert reader.read(0, 10) == data[:10]
+            assert reader.read(4090, 20) == data[4090:4110]
+            assert reader.read(len(data) - 5, 100) == data[-5:]
+            assert reader.read(len(data), 10) == b''
+        
+        # Compressed extraction records the digest of the uncompressed content
+        with fake_tools(tmp, adb=FAKE_ADB):
+            tool = MobileForensicTool(Platform.ANDROID, compress=True)
+            output_dir = os.path.join(tmp, 'out')
+            result = tool.extract_data('SERIAL1', output_dir)
+            names = [item['name'] for item in result['extracted_items']]
+            assert names == ['device_info.txt.gz', 'installed_packages.txt.gz', 'logcat.txt.gz']
+            logcat = result['extracted_items'][2]
+            with BlockGzipReader(os.path.join(output_dir, 'logcat.txt.gz')) as reader:
+                content = reader.read(0, len(reader))
+            assert content.startswith(b'10-17 10:00:00.000')
+            assert logcat['compression']['index'] == 'logcat.txt.gz.idx'
+            assert logcat['compression']['uncompressed_size'] == len(content)
+            assert logcat['compression']['uncompressed_sha256'] == hashlib.sha256(content).hexdigest()
+            with open(os.path.join(output_dir, 'logcat.txt.gz'), 'rb') as f:
+                assert logcat['digests']['sha256'] == hashlib.sha256(f.read()).hexdigest()
+    print("✓ Block compression tests passed")
+
+
+def test_benchmark_harness():
+    """Test the hermetic benchmark report"""
+    print("\nTesting benchmark harness...")
+    import benchmark
+    report = benchmark.benchmark(['android'], ['list', 'extract_all'], devices=3,
+                                 latency=0, log_bytes=64 * 1024, packages=10,
+                                 max_workers=2)
+    assert report['config']['devices'] == 3
+    results = {entry['action']: entry for entry in report['results']}
+    assert results['list']['devices'] == 3
+    assert results['list']['subprocesses'] == {'adb': 1}
+    assert results['extract_all']['devices'] == 3
+    # One listing plus getprop, pm and logcat per device
+    assert results['extract_all']['subprocess_count'] == 1 + 3 * 3
+    assert results['extract_all']['wall_time_s'] > 0
+    json.dumps(report)
+    print("✓ Benchmark harness tests passed")
+
+
+def test_command_tracing():
+    """Test per-command spans, the latency summary and the Chrome trace export"""
+    print("\nTesting command tracing...")
+    from mobile_forensic_tool import CommandTracer
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        bin_dir = os.path.join(tmp, 'bin')
+        tracer = CommandTracer()
+        tool = MobileForensicTool(Platform.ANDROID, tracer=tracer)
+        result = tool.extract_data('SERIAL1', os.path.join(tmp, 'out'))
+        assert result['errors'] == []
+        
+        logcat = [span for span in tracer.spans if span['name'] == 'logcat.txt'][0]
+        assert logcat['device'] == 'SERIAL1'
+        assert logcat['transport'] == 'exec'
+        assert logcat['exit_code'] == 0
+        assert logcat['bytes_out'] == result['extracted_items'][2]['size']
+        assert logcat['duration'] >= 0
+        steps = {step['name']: step for step in tracer.summary()}
+        assert steps['adb shell getprop']['count'] == 1
+        assert 'installed_packages.txt' in tracer.format_summary()
+        
+        # Missing binaries are reported instead of silently dropped
+        os.environ['PATH'] = bin_dir
+        ios_tool = MobileForensicTool(Platform.IOS, tracer=tracer)
+        result = ios_tool.extract_data('UDID1', os.path.join(tmp, 'ios'))
+        assert result['extracted_items'] == []
+        assert len(result['errors']) == 3
+        assert 'device_info.txt: ideviceinfo not found' in result['errors']
+        assert {step['name']: step for step in tracer.summary()}['installed_apps.txt']['failures'] == 1
+        
+        trace_file = os.path.join(tmp, 'trace.json')
+        tracer.export(trace_file)
+        with open(trace_file) as f:
+            events = json.load(f)['traceEvents']
+        lanes = {event['args']['name'] for event in events if event['ph'] == 'M'}
+        assert lanes == {'SERIAL1', 'UDID1'}
+        assert all(event['dur'] >= 0 for event in events if event['ph'] == 'X')
+    print("✓ Command tracing tests passed")
+
+
+def test_metadata_cache():
+    """Test TTL/LRU eviction, persistence and cached tool and device metadata"""
+    print("\nTesting metadata cache...")
+    import time
+    from mobile_forensic_tool import CommandTracer
+    from metadata_cache import MetadataCache
+    cache = MetadataCache(ttl=60, max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1 and len(cache) == 2
+    cache.set('short', 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('short') is None
+    
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        bin_dir = os.path.join(tmp, 'bin')
+        cache_file = os.path.join(tmp, 'cache', 'metadata.json')
+        tracer = CommandTracer()
+        tool = MobileForensicTool(Platform.ANDROID, tracer=tracer,
+                                  cache=MetadataCache(path=cache_file))
+        assert tool.check_dependencies() and tool.check_dependencies()
+        assert tool.discover_tool('adb', ['version'])['path'] == os.path.join(bin_dir, 'adb')
+        first = tool.get_device_info('SERIAL1')
+        assert tool.get_device_info('SERIAL1') == first
+        result = tool.extract_data('SERIAL1', os.path.join(tmp, 'out'))
+        assert result['extracted_items'][0]['name'] == 'device_info.txt'
+        calls = [span['name'] for span in tracer.spans]
+        assert calls.count('adb shell getprop') == 1
+        assert len([name for name in calls if name.endswith('version')]) == 1
+        
+        # A reconnect drops the device's cached metadata
+        tool.invalidate_device('SERIAL1')
+        tool.get_device_info('SERIAL1')
+        assert [span['name'] for span in tracer.spans].count('adb shell getprop') == 2
+        
+        # A second run shares the persisted cache, bytes included
+        tool.cache.save()
+        tracer = CommandTracer()
+        tool = MobileForensicTool(Platform.ANDROID, tracer=tracer,
+                                  cache=MetadataCache(path=cache_file))
+        assert tool.check_dependencies()
+        assert tool.get_device_info('SERIAL1') == first
+        assert tracer.spans == []
+        # ...but an extraction captures its own dump instead of another run's
+        tool.extract_data('SERIAL1', os.path.join(tmp, 'out2'))
+        assert [span['name'] for span in tracer.spans].count('adb shell getprop') == 1
+        tracer.spans.clear()
+        
+        # Replacing the tool binary invalidates its discovery entry
+        _install_fake_tool(bin_dir, 'adb', FAKE_ADB + '\n')
+        os.utime(os.path.join(bin_dir, 'adb'), ns=(0, 0))
+        assert tool.check_dependencies()
+        assert len(tracer.spans) == 1
+    print("✓ Metadata cache tests passed")
+
+
+def test_rpc_server():
+    """Test the JSON-RPC service mode in-process and over stdin/stdout"""
+    print("\nTesting JSON-RPC service mode...")
+    import asyncio
+    import subprocess
+    import time
+    from mobile_forensic_tool import CommandTracer
+    from rpc_server import RpcServer
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        tracer = CommandTracer()
+        tool = MobileForensicTool(Platform.ANDROID, tracer=tracer)
+        server = RpcServer({'android': tool}, 'android', os.path.join(tmp, 'out'))
+        
+        async def session():
+            lines = [
+                {'jsonrpc': '2.0', 'id': 1, 'method': 'info', 'params': {'device': 'SERIAL1'}},
+                {'jsonrpc': '2.0', 'id': 2, 'method': 'extract', 'params': {'device': 'SERIAL1'}},
+                {'jsonrpc': '2.0', 'id': 3, 'method': 'list', 'params': []},
+                {'jsonrpc': '2.0', 'id': 4, 'method': 'bypass'},
+                {'jsonrpc': '2.0', 'id': 5, 'method': 'info', 'params': {'serial': 'x'}},
+                {'jsonrpc': '2.0', 'id': 6, 'method': 'list', 'params': {'platform': 'ios'}}
+            ]
+            return await asyncio.gather(*[server.handle(json.dumps(line)) for line in lines],
+                                        server.handle(b'{not json'))
+        
+        start = time.perf_counter()
+        responses = asyncio.run(session())
+        elapsed = time.perf_counter() - start
+        assert responses[0]['result']['model'] == 'Pixel 7'
+        extract = responses[1]['result']
+        assert [item['name'] for item in extract['extracted_items']] == \
+            ['device_info.txt', 'installed_packages.txt', 'logcat.txt']
+        assert extract['output_dir'] == os.path.join(tmp, 'out', 'SERIAL1')
+        assert responses[2]['result'][0]['id'] == 'SERIAL1'
+        assert [response['error']['code'] for response in responses[3:]] == \
+            [-32601, -32602, -32602, -32700]
+        # Requests run concurrently and share one getprop round-trip
+        assert elapsed < 1.5, f"requests ran one after another ({elapsed:.2f}s)"
+        assert [span['name'] for span in tracer.spans].count('adb shell getprop') == 1
+        
+        # Over stdin/stdout, with one response line per request
+        requests = ''.join(json.dumps(request) + '\n' for request in [
+            {'jsonrpc': '2.0', 'id': 'a', 'method': 'list'},
+            {'jsonrpc': '2.0', 'method': 'list'},
+            {'jsonrpc': '2.0', 'id': 'b', 'method': 'info', 'params': ['SERIAL1']}
+        ])
+        child = subprocess.run(
+            [sys.executable, 'mobile_forensic_tool.py', '--platform', 'android',
+             '--action', 'serve', '--output', os.path.join(tmp, 'served')],
+            input=requests, capture_output=True, text=True, timeout=30,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        assert child.returncode == 0, child.stderr
+        responses = {response['id']: response for response in
+                     map(json.loads, child.stdout.splitlines())}
+        assert set(responses) == {'a', 'b'}
+        assert responses['a']['result'][0]['id'] == 'SERIAL1'
+        assert responses['b']['result']['sdk_version'] == '34'
+        
+        # On a Unix socket: a stale socket is replaced, anything else is left alone
+        import socket
+        path = os.path.join(tmp, 'rpc.sock')
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(path)
+        stale.close()
+        
+        async def over_socket():
+            serving = asyncio.ensure_future(server.serve_unix(path))
+            for _ in range(100):
+                if os.path.exists(path) and not serving.done():
+                    try:
+                        reader, writer = await asyncio.open_unix_connection(path)
+                        break
+                    except ConnectionRefusedError:
+                        pass
+                await asyncio.sleep(0.02)
+            writer.write(b'{"jsonrpc": "2.0", "id": 7, "method": "list"}\n')
+            response = json.loads(await reader.readline())
+            writer.close()
+            serving.cancel()
+            try:
+                await serving
+            except asyncio.CancelledError:
+                pass
+            return response
+        
+        assert asyncio.run(over_socket())['result'][0]['id'] == 'SERIAL1'
+        assert not os.path.exists(path)
+        
+        # A socket another server still listens on is not taken over
+        live = socket.socket(socket.AF_UNIX)
+        live.bind(path)
+        live.listen(1)
+        try:
+            asyncio.run(asyncio.wait_for(server.serve_unix(path), 5))
+            assert False, "serve_unix took over a live socket"
+        except FileExistsError:
+            pass
+        finally:
+            live.close()
+        os.unlink(path)
+        for make in (lambda: open(path, 'w').close(),
+                     lambda: os.symlink(os.path.join(tmp, 'out'), path)):
+            make()
+            try:
+                asyncio.run(asyncio.wait_for(server.serve_unix(path), 5))
+                assert False, "serve_unix replaced a file that is not a socket"
+            except FileExistsError:
+                pass
+            assert os.path.lexists(path)
+            os.unlink(path)
+    print("✓ JSON-RPC service mode tests passed")
+
+
+def test_log_records():
+    """Test parsing logcat/syslog into columnar record stores and filtering them"""
+    print("\nTesting log record store...")
+    from block_gzip import BlockGzipWriter, write_index
+    from log_records import LogRecords, build_records, parse_time, records_path
+    logcat = b''.join([
+        b'--------- beginning of main\n',
+        b'10-17 10:00:00.000   100   101 I ActivityManager: Start proc\n',
+        b'10-17 10:00:01.500   200   201 E AndroidRuntime: FATAL EXCEPTION: main\n',
+        b'10-17 10:05:00.000   100   102 W ActivityManager: Slow operation\n',
+        b'10-17 10:09:00.000   300   301 D My Tag: tag with a space\n'
+    ] * 500)
+    syslog = (b'Oct 17 10:00:00 iPhone kernel[0] <Notice>: hello\n'
+              b'Oct  7 10:00:00.123456 iPhone SpringBoard(FrontBoard)[55] <Error>: bad\n'
+              b'  continuation line\n')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'logcat.txt')
+        with open(path, 'wb') as f:
+            f.write(logcat)
+        records = build_records(path, year=2026)
+        assert len(records) == 2000
+        loaded = LogRecords.load(records_path(path))
+        assert loaded.columns == records.columns and loaded.tags == records.tags
+        
+        rows = loaded.select(tags=['ActivityManager'], levels=['W'])
+        assert len(rows) == 500
+        assert next(loaded.lines(path, rows)) == \
+            b'10-17 10:05:00.000   100   102 W ActivityManager: Slow operation'
+        assert len(loaded.select(pids=[200, 300])) == 1000
+        assert loaded.record(loaded.select(tags=['My Tag'])[0])['tid'] == 301
+        window = loaded.select(start=parse_time('10-17 10:00:01', 2026),
+                               end=parse_time('10-17 10:09', 2026))
+        assert len(window) == 1000
+        assert len(loaded.select(start=parse_time('2026-10-17T10:09:00', 2026))) == 500
+        
+        # Block-compressed captures are parsed and read back through the index
+        compressed = os.path.join(tmp, 'logcat.txt.gz')
+        with open(compressed, 'wb') as f:
+            writer = BlockGzipWriter(f.write, block_size=1000)
+            writer.write(logcat)
+            writer.close()
+        write_index(compressed, writer.blocks, writer.block_size)
+        packed = build_records(compressed, year=2026)
+        assert packed.columns == records.columns
+        assert list(packed.lines(compressed, rows[:1])) == list(loaded.lines(path, rows[:1]))
+        
+        path = os.path.join(tmp, 'syslog.txt')
+        with open(path, 'wb') as f:
+            f.write(syslog)
+        records = build_records(path, year=2026)
+        assert [records.record(row)['tag'] for row in range(len(records))] == \
+            ['kernel', 'SpringBoard']
+        assert records.record(1)['timestamp'] == '2026-10-07 10:00:00.123'
+        assert records.select(levels=['Error'], pids=[55]) == [1]
+        
+        # Extraction builds the store on request
+        with fake_tools(tmp, adb=FAKE_ADB):
+            tool = MobileForensicTool(Platform.ANDROID, parse_logs=True)
+            result = tool.extract_data('SERIAL1', os.path.join(tmp, 'out'))
+            assert result['log_records'] == [
+                {'source': 'logcat.txt', 'file': 'logcat.txt.records', 'count': 1}]
+            assert os.path.exists(os.path.join(tmp, 'out', 'logcat.txt.records'))
+    print("✓ Log record store tests passed")
+
+
+def test_case_index():
+    """Test the SQLite case index: ingestion, incremental updates and queries"""
+    print("\nTesting case index...")
+    from case_index import CaseIndex
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        cases = os.path.join(tmp, 'cases')
+        MobileForensicTool(Platform.ANDROID).extract_data('SERIAL1', os.path.join(cases, 'a'))
+        MobileForensicTool(Platform.ANDROID, compress=True).extract_data(
+            'SERIAL1', os.path.join(cases, 'b'))
+        ios_dir = os.path.join(cases, 'ios')
+        os.makedirs(ios_dir)
+        artifacts = {
+            'device_info.txt': 'DeviceName: Test iPhone\nProductVersion: 17.0\n',
+            'installed_apps.txt': 'CFBundleIdentifier, CFBundleVersion, CFBundleDisplayName\n'
+                                  'com.example.app, "1.0", "Example"\nnet.whatsapp.WhatsApp, "2", "W"\n',
+            'syslog.txt': 'Oct 17 10:00:00 iPhone kernel[0] <Notice>: token deadbeef seen\n'
+        }
+        items = []
+        for name, content in artifacts.items():
+            with open(os.path.join(ios_dir, name), 'w') as f:
+                f.write(content)
+            items.append({'name': name, 'digests': {'sha256': str(len(content))}})
+        with open(os.path.join(ios_dir, 'manifest.json'), 'w') as f:
+            json.dump({'device_id': 'UDID1', 'platform': 'ios', 'items': items}, f)
+        
+        db = os.path.join(tmp, 'cases.db')
+        with CaseIndex(db) as index:
+            assert index.update([cases]) == {'indexed': 3, 'unchanged': 0, 'removed': 0}
+            found = index.find_package('com.example.app')
+            assert [(row['device_id'], os.path.basename(row['path'])) for row in found] == \
+                [('SERIAL1', 'a'), ('SERIAL1', 'b'), ('UDID1', 'ios')]
+            assert [row['device_id'] for row in index.find_package('%whatsapp%')] == ['UDID1']
+            assert len(index.find_property('ro.product.model', 'Pixel 7')) == 2
+            assert index.find_property('ProductVersion')[0]['value'] == '17.0'
+            hits = index.search_logs('hello')
+            assert [hit['artifact'] for hit in hits] == ['logcat.txt', 'logcat.txt.gz']
+            assert hits[0]['line_no'] == 1 and hits[0]['line'].endswith('I Tag: hello')
+            assert index.search_logs('deadbeef')[0]['device_id'] == 'UDID1'
+        
+        # Only changed extractions are re-read; removed ones are dropped
+        with open(os.path.join(ios_dir, 'syslog.txt'), 'w') as f:
+            f.write('Oct 17 11:00:00 iPhone kernel[0] <Notice>: token cafebabe\n')
+        items[2]['digests']['sha256'] = 'changed'
+        with open(os.path.join(ios_dir, 'manifest.json'), 'w') as f:
+            json.dump({'device_id': 'UDID1', 'platform': 'ios', 'items': items}, f)
+        os.remove(os.path.join(cases, 'a', 'manifest.json'))
+        with CaseIndex(db) as index:
+            assert index.update([cases]) == {'indexed': 1, 'unchanged': 1, 'removed': 1}
+            assert index.search_logs('deadbeef') == []
+            assert index.search_logs('cafebabe')[0]['line_no'] == 1
+            assert len(index.search_logs('hello')) == 1
+            assert len(index.find_package('com.example.app')) == 2
+    print("✓ Case index tests passed")
+
+
+def test_live_capture():
+    """Test bounded live log streaming with rotation and the ring buffer"""
+    print("\nTesting live capture...")
+    import time
+    from block_gzip import BlockGzipReader
+    from mobile_forensic_tool import LiveCapture
+    syslog = r"""
+import sys, time
+line = b'Oct 17 10:00:00 iPhone kernel[0] <Notice>: ' + b'x' * 56 + b'\n'
+for _ in range(1000):
+    sys.stdout.buffer.write(line)
+sys.stdout.flush()
+time.sleep(30)
+"""
+    with fake_tools(idevicesyslog=syslog, adb=FAKE_ADB) as tmp:
+        # The default syslog capture now keeps what arrived within 5 s
+        tool = MobileForensicTool(Platform.IOS, live_capture=LiveCapture(duration=1))
+        start = time.perf_counter()
+        result = tool.extract_data('UDID1', os.path.join(tmp, 'plain'))
+        assert time.perf_counter() - start < 5
+        syslog_item = [item for item in result['extracted_items']
+                       if item['name'] == 'syslog.txt'][0]
+        assert syslog_item['size'] == 100 * 1000
+        assert syslog_item['capture']['stopped_by'] == 'duration'
+        assert syslog_item['exit_code'] is None
+        
+        # Byte budget, rotation at line boundaries and a ring of the newest segments
+        policy = LiveCapture(duration=5, max_bytes=50000, segment_bytes=8000, ring_bytes=20000)
+        tool = MobileForensicTool(Platform.IOS, live_capture=policy, compress=True)
+        result = tool.extract_data('UDID1', os.path.join(tmp, 'ring'))
+        segments = [item for item in result['extracted_items']
+                    if item['name'].startswith('syslog.')]
+        assert [item['name'] for item in segments] == \
+            ['syslog.004.txt.gz', 'syslog.005.txt.gz', 'syslog.006.txt.gz']
+        assert segments[0]['capture']['stopped_by'] == 'byte_budget'
+        assert segments[0]['capture']['dropped_segments'] == 4
+        assert segments[0]['capture']['total_bytes'] == 50000
+        with BlockGzipReader(os.path.join(tmp, 'ring', 'syslog.004.txt.gz')) as reader:
+            data = reader.read(0, len(reader))
+        assert len(data) == 8000 and data.endswith(b'\n')
+        assert not os.path.exists(os.path.join(tmp, 'ring', 'syslog.000.txt.gz'))
+        
+        # Android adds a live logcat next to the snapshot
+        tool = MobileForensicTool(Platform.ANDROID, live_capture=LiveCapture(duration=1))
+        result = tool.extract_data('SERIAL1', os.path.join(tmp, 'android'))
+        names = [item['name'] for item in result['extracted_items']]
+        assert names[-2:] == ['logcat.txt', 'logcat_live.txt']
+        assert result['extracted_items'][-1]['capture']['total_bytes'] > 0
+    print("✓ Live capture tests passed")
+
+
+def test_bulk_acquisition():
+    """Test parallel tar acquisition with a streamed per-file inventory"""
+    print("\nTesting bulk acquisition...")
+    import hashlib
+    import tarfile
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        sdcard = os.path.join(tmp, 'device', 'sdcard')
+        for directory, count, size in [('DCIM', 3, 300000), ('Download', 4, 20000),
+                                       ('Music', 2, 150000), ('My Notes', 1, 5)]:
+            os.makedirs(os.path.join(sdcard, directory))
+            for i in range(count):
+                with open(os.path.join(sdcard, directory, f'file {i}.bin'), 'wb') as f:
+                    f.write(os.urandom(size))
+        os.environ['FAKE_DEVICE_ROOT'] = os.path.join(tmp, 'device')
+        try:
+            tool = MobileForensicTool(Platform.ANDROID, acquire_paths=['/sdcard/'],
+                                      acquire_streams=2)
+            output_dir = os.path.join(tmp, 'out')
+            result = tool.extract_data('SERIAL1', output_dir)
+            archives = [item for item in result['extracted_items'] if item['name'].endswith('.tar')]
+            assert [item['name'] for item in archives] == ['storage_00.tar', 'storage_01.tar']
+            # Largest directories go to different streams
+            assert {tuple(item['acquisition']['paths']) for item in archives} == \
+                {('/sdcard/DCIM',), ('/sdcard/Download', '/sdcard/Music', '/sdcard/My Notes')}
+            assert sum(item['acquisition']['files'] for item in archives) == 10
+            assert all(item['acquisition']['complete'] for item in archives)
+            assert archives[0]['acquisition']['aggregate_mib_per_s'] > 0
+            
+            # The inventory matches the stored archive and the source files
+            for item in archives:
+                with open(os.path.join(output_dir, item['name'][:-4] + '.files.ndjson')) as f:
+                    members = {member['path']: member for member in map(json.loads, f)}
+                with tarfile.open(os.path.join(output_dir, item['name'])) as archive:
+                    assert sorted(members) == sorted(archive.getnames())
+                for path, member in members.items():
+                    if member['type'] == 'file':
+                        with open(os.path.join(tmp, 'device', path), 'rb') as f:
+                            assert member['sha256'] == hashlib.sha256(f.read()).hexdigest()
+            
+            # A failing tar keeps its partial archive and reports the error
+            tool = MobileForensicTool(Platform.ANDROID, acquire_paths=['/sdcard/Music', '/missing'],
+                                      acquire_streams=1)
+            result = tool.extract_data('SERIAL1', os.path.join(tmp, 'partial'))
+            archive = [item for item in result['extracted_items'] if item['name'] == 'storage_00.tar'][0]
+            assert archive['exit_code'] == 1
+            assert archive['acquisition']['files'] == 2
+            assert any('partial archive kept' in error for error in result['errors'])
+        finally:
+            del os.environ['FAKE_DEVICE_ROOT']
+    
+    # A pax size record overrides the header's size field (members of 8 GiB and up)
+    import io
+    from tar_stream import TarInventory
+    contents = {'big.bin': os.urandom(1500), 'after.txt': b'next member\n'}
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w', format=tarfile.PAX_FORMAT) as archive:
+        for name, data in contents.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            if name == 'big.bin':
+                info.pax_headers = {'size': str(len(data))}
+            archive.addfile(info, io.BytesIO(data))
+    data = bytearray(buffer.getvalue())
+    # Blank the ustar size of big.bin, as writers do for sizes it cannot hold
+    header = data.index(b'big.bin\0', 512) // 512 * 512
+    data[header + 124:header + 136] = b'0' * 11 + b'\0'
+    data[header + 148:header + 156] = b' ' * 8
+    data[header + 148:header + 156] = b'%06o\0 ' % sum(data[header:header + 512])
+    with tarfile.open(fileobj=io.BytesIO(bytes(data))) as archive:
+        assert archive.getmember('big.bin').size == 1500
+    inventory = TarInventory()
+    for start in range(0, len(data), 700):
+        inventory.feed(bytes(data[start:start + 700]))
+    assert inventory.complete
+    assert [(member['path'], member['size'], member['sha256']) for member in inventory.members] == \
+        [(name, len(data), hashlib.sha256(data).hexdigest()) for name, data in contents.items()]
+    print("✓ Bulk acquisition tests passed")
+
+
+def test_extraction_plan():
+    """Test configured extraction plans: registry, dependencies, priorities and limits"""
+    print("\nTesting extraction plan...")
+    import asyncio
+    import time
+    from pipeline import STEPS, PlanError, register_step
+    order = []
+    
+    def probe(name):
+        async def run():
+            order.append(name + ' start')
+            await asyncio.sleep(0.05)
+            order.append(name + ' end')
+            if name == 'hung':
+                await asyncio.sleep(30)
+            return {'broken': None, 'empty': []}.get(name, {'name': name})
+        return lambda tool, device_id, output_dir, state, options: run()
+    
+    for name in ['slow', 'urgent', 'broken', 'empty', 'hung']:
+        register_step('android', name)(probe(name))
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        try:
+            config = {'max_parallel_steps': 1, 'data_extraction': [
+                'slow',
+                {'step': 'urgent', 'priority': 5},
+                {'step': 'logcat', 'enabled': False},
+                {'name': 'props', 'command': ['adb', '-s', '{device}', 'shell', 'getprop'],
+                 'after': ['slow'], 'output': 'props.txt'},
+                {'step': 'broken', 'priority': 9},
+                {'name': 'after_broken', 'command': ['adb', 'shell', 'getprop'], 'after': ['broken']}
+            ]}
+            tool = MobileForensicTool(Platform.ANDROID, extraction_config=config)
+            output_dir = os.path.join(tmp, 'out')
+            result = tool.extract_data('SERIAL1', output_dir)
+            # One step at a time, highest priority first
+            assert order == ['broken start', 'broken end', 'urgent start', 'urgent end',
+                             'slow start', 'slow end']
+            # Results keep plan order; disabled and skipped steps leave nothing behind
+            assert [item['name'] for item in result['extracted_items']] == ['slow', 'urgent', 'props.txt']
+            with open(os.path.join(output_dir, 'props.txt')) as f:
+                assert '[ro.product.model]: [Pixel 7]' in f.read()
+            assert not os.path.exists(os.path.join(output_dir, 'logcat.txt'))
+            assert 'after_broken: skipped, broken failed' in result['errors']
+            
+            # A step that captures nothing (an empty list) failed too, as does one
+            # cut off by its step_timeout; their dependents are skipped
+            events = []
+            tool = MobileForensicTool(Platform.ANDROID, on_event=events.append, extraction_config={
+                'data_extraction': [
+                    'empty', {'step': 'hung', 'step_timeout': 0.2},
+                    {'name': 'after_empty', 'command': ['adb', 'shell', 'getprop'], 'after': ['empty']},
+                    {'name': 'after_hung', 'command': ['adb', 'shell', 'getprop'], 'after': ['hung']},
+                    {'step': 'slow', 'step_timeout': 5}
+                ]})
+            start = time.perf_counter()
+            result = tool.extract_data('SERIAL1', os.path.join(tmp, 'failing'))
+            assert time.perf_counter() - start < 5
+            assert [item['name'] for item in result['extracted_items']] == ['slow']
+            assert sorted(result['errors']) == ['after_empty: skipped, empty failed',
+                                                'after_hung: skipped, hung failed',
+                                                'hung: timed out after 0.2s']
+            steps = {event['step']: event['status'] for event in events if event['event'] == 'step'}
+            assert steps == {'empty': 'failed', 'hung': 'timeout', 'after_empty': 'skipped',
+                             'after_hung': 'skipped', 'slow': 'ok'}
+            
+            # Invalid plans are rejected up front
+            for plan in [['nonexistent'], [{'step': 'slow', 'after': ['urgent']},
+                                           {'step': 'urgent', 'after': ['slow']}],
+                         ['slow', 'slow'], [{'name': 'bad', 'command': 'adb'}],
+                         # Options a step does not read are errors, not silently dropped
+                         [{'step': 'device_info', 'timeout': 0.5}], [{'step': 'logcat', 'timout': 5}],
+                         [{'name': 'cmd', 'command': ['adb'], 'retries': 2}],
+                         [{'step': 'slow', 'step_timeout': 0}], [{'step': 'slow', 'step_timeout': '5'}]]:
+                try:
+                    MobileForensicTool(Platform.ANDROID, extraction_config={'data_extraction': plan})
+                    assert False, plan
+                except PlanError:
+                    pass
+        finally:
+            for name in ['slow', 'urgent', 'broken', 'empty', 'hung']:
+                del STEPS[('android', name)]
+    print("✓ Extraction plan tests passed")
+
+
+def test_ndjson_output():
+    """Test streaming NDJSON events from the command line"""
+    print("\nTesting NDJSON output...")
+    import subprocess
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mobile_forensic_tool.py')
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        def run(*args):
+            proc = subprocess.run([sys.executable, script, '--platform', 'android',
+                                   '--output-format', 'ndjson'] + list(args),
+                                  stdout=subprocess.PIPE, timeout=60, check=True)
+            lines = proc.stdout.decode().splitlines()
+            # Compact, one object per line
+            assert all(': ' not in line for line in lines)
+            return [json.loads(line) for line in lines]
+        
+        events = run('--action', 'list')
+        assert [(e['event'], e['device']['id']) for e in events] == [('device', 'SERIAL1')]
+        events = run('--action', 'info', '--device', 'SERIAL1')
+        assert events[0]['event'] == 'info' and events[0]['info']['model'] == 'Pixel 7'
+        
+        events = run('--action', 'extract', '--all-devices', '--output', os.path.join(tmp, 'out'))
+        kinds = [event['event'] for event in events]
+        assert kinds[-2:] == ['extraction', 'summary']
+        # The shipped config.json adds the package inventory (four artifacts)
+        assert kinds.count('step') == 4 and kinds.count('artifact') == 7
+        # Each step reports after its artifacts, as it finishes
+        for index, event in enumerate(events):
+            if event['event'] == 'artifact':
+                assert any(later['event'] == 'step' for later in events[index + 1:])
+        steps = {event['step']: event['status'] for event in events if event['event'] == 'step'}
+        assert steps == {'device_info': 'ok', 'installed_packages': 'ok',
+                         'package_inventory': 'ok', 'logcat': 'ok'}
+        assert events[-2]['item_count'] == 7 and events[-1]['device_count'] == 1
+    print("✓ NDJSON output tests passed")
+
+
+def test_artifact_store():
+    """Test deduplicating artifacts across extractions through the content-addressed store"""
+    print("\nTesting artifact store...")
+    import shutil
+    from artifact_store import ArtifactStore
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        store = ArtifactStore(os.path.join(tmp, 'store'))
+        for compress in (False, True):
+            first, second = (os.path.join(tmp, f'case{n}_{compress}') for n in (1, 2))
+            tool = MobileForensicTool(Platform.ANDROID, store=store, compress=compress)
+            result = tool.extract_data('SERIAL1', first)
+            assert all(item['store']['deduplicated'] is False
+                       for item in result['extracted_items'])
+            result = tool.extract_data('SERIAL1', second)
+            assert all(item['store']['deduplicated'] for item in result['extracted_items'])
+            for item in result['extracted_items']:
+                a, b = (os.stat(os.path.join(case, item['name'])) for case in (first, second))
+                assert a.st_ino == b.st_ino and a.st_nlink == 3
+                assert oct(a.st_mode & 0o222) == '0o0'
+                if compress:
+                    index = item['compression']['index']
+                    assert os.path.samefile(os.path.join(first, index), os.path.join(second, index))
+        
+        # Appending to a shared artifact gives it a private copy first
+        logcat = os.path.join(tmp, 'case1_False', 'logcat.txt')
+        other = os.path.join(tmp, 'case2_False', 'logcat.txt')
+        with open(other, 'rb') as f:
+            original = f.read()
+        MobileForensicTool(Platform.ANDROID).extract_data(
+            'SERIAL1', os.path.join(tmp, 'case1_False'), incremental=True)
+        assert not os.path.samefile(logcat, other)
+        with open(other, 'rb') as f:
+            assert f.read() == original
+        
+        stats = store.stats()
+        # Three artifacts plain and compressed; the unshared logcat has one case left
+        assert stats['objects'] == 6 and stats['references'] == 11
+        assert store.gc() == {'objects': 6, 'removed': 0, 'bytes_freed': 0}
+        for name in os.listdir(tmp):
+            if name.startswith('case'):
+                shutil.rmtree(os.path.join(tmp, name))
+        result = store.gc()
+        assert result['objects'] == 0 and result['removed'] == 9
+        assert store.stats()['objects'] == 0
+    print("✓ Artifact store tests passed")
+
+
+def test_timeline():
+    """Test merging extractions into one chronological timeline with spilled runs"""
+    print("\nTesting timeline...")
+    import csv
+    from timeline import ZoneInfo, TimelineSorter, build_timeline
+    
+    def extraction(directory, device_id, started_at, artifacts):
+        os.makedirs(directory)
+        items = []
+        for name, text in artifacts.items():
+            with open(os.path.join(directory, name), 'w') as f:
+                f.write(text)
+            items.append({'name': name, 'size': len(text), 'digests': {},
+                          'started_at': started_at, 'finished_at': started_at})
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump({'device_id': device_id, 'items': items}, f)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # Logcat is in order; syslog lines arrive shuffled
+        logcat = ''.join('10-17 10:%02d:00.000  100  101 I Tag: line %d\n' % (i, i)
+                         for i in range(0, 60, 2))
+        syslog = ''.join('Oct 17 08:%02d:30 iPhone kernel[0] <Notice>: entry %d\n' % (i, i)
+                         for i in [7, 3, 9, 1, 5] * 2)
+        extraction(os.path.join(tmp, 'cases', 'pixel'), 'SERIAL1', '2026-10-17T12:00:00+00:00',
+                   {'device_info.txt': '[persist.sys.timezone]: [Europe/Berlin]\n'
+                                       '[ro.product.model]: [Pixel 7]\n',
+                    'logcat.txt': logcat,
+                    'storage_00.files.ndjson': ''.join(json.dumps(member) + '\n' for member in [
+                        {'path': 'sdcard/DCIM/a.jpg', 'type': 'file', 'size': 3, 'mode': '0o644',
+                         'mtime': 1760680800, 'sha256': 'ab'},
+                        {'path': 'sdcard/DCIM', 'type': 'dir', 'size': 0, 'mode': '0o755',
+                         'mtime': 1760680900}])})
+        extraction(os.path.join(tmp, 'cases', 'iphone'), 'UDID1', '2027-01-01T00:10:00+00:00',
+                   {'device_info.txt': 'TimeZone: UTC\n',
+                    'syslog.txt': syslog + 'Dec 31 23:59:59 iPhone kernel[0] <Notice>: old year\n'})
+        output = os.path.join(tmp, 'timeline.ndjson')
+        stats = build_timeline([os.path.join(tmp, 'cases')], output, max_events=4)
+        assert stats['extractions'] == 2 and stats['events'] == 30 + 11 + 5 + 2
+        assert stats['runs'] > 1
+        with open(output) as f:
+            events = [json.loads(line) for line in f]
+        assert len(events) == stats['events']
+        assert [event['ts'] for event in events] == sorted(event['ts'] for event in events)
+        logs = [event for event in events if event['type'] == 'log']
+        if ZoneInfo is not None:
+            # 10:00 in Berlin (CEST) is 08:00 UTC, so the two devices interleave
+            assert logs[0]['time'] == '2026-10-17T08:00:00.000Z'
+            assert [event['device_id'] for event in logs[:4]] == ['SERIAL1', 'UDID1', 'UDID1', 'SERIAL1']
+        # A December line captured in January belongs to the year before
+        old = [event for event in logs if event['text'].endswith('old year')][0]
+        assert old['time'].startswith('2026-12-31T23:59:59')
+        device = [event for event in events if event['source'] == 'device_info.txt'
+                  and event['device_id'] == 'SERIAL1'][0]
+        assert device['type'] == 'capture' and device['device'] == {'ro.product.model': 'Pixel 7'}
+        files = [event for event in events if event['type'] == 'file']
+        assert [(event['path'], event['time']) for event in files] == \
+            [('sdcard/DCIM/a.jpg', '2025-10-17T06:00:00.000Z'), ('sdcard/DCIM', '2025-10-17T06:01:40.000Z')]
+        assert files[0]['sha256'] == 'ab' and files[1]['file_type'] == 'dir'
+        
+        csv_output = os.path.join(tmp, 'timeline.csv')
+        build_timeline([os.path.join(tmp, 'cases')], csv_output)
+        with open(csv_output, newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert [row['time'] for row in rows] == [event['time'] for event in events]
+        assert not os.path.exists(csv_output + '.part')
+    
+    # In-order input grows a single run however often it spills
+    with TimelineSorter(max_events=10) as sorter:
+        sorter.add({'ts': i} for i in range(100))
+        assert sorter.run_count == 1
+        assert [json.loads(text)['ts'] for text in sorter.merged()] == list(range(100))
+    print("✓ Timeline tests passed")
+
+
+def test_parallel_log_parsing():
+    """Test splitting captures into line-aligned ranges parsed by worker processes"""
+    print("\nTesting parallel log parsing...")
+    import log_records
+    from block_gzip import BlockGzipWriter, write_index
+    from log_records import LogRecords, split_ranges
+    logcat = b''.join(b'10-17 10:%02d:%02d.000  %d  %d %s Tag%d: message %d\n'
+                      % (i // 60 % 60, i % 60, 100 + i % 5, 200, b'VDIWE'[i % 5:i % 5 + 1], i % 7, i)
+                      + (b'--------- beginning of system\n' if i % 100 == 0 else b'')
+                      for i in range(5000))
+    logcat += b'10-17 11:00:00.000  1  2 I Last: no trailing newline'
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = os.path.join(tmp, 'logcat.txt')
+        with open(plain, 'wb') as f:
+            f.write(logcat)
+        compressed = os.path.join(tmp, 'logcat.txt.gz')
+        with open(compressed, 'wb') as f:
+            writer = BlockGzipWriter(f.write, block_size=4096)
+            writer.write(logcat)
+            writer.close()
+        write_index(compressed, writer.blocks, writer.block_size)
+        
+        ranges = split_ranges(plain, len(logcat), 3)
+        assert len(ranges) == 3 and ranges[0][0] == 0 and ranges[-1][1] == len(logcat)
+        assert all(logcat[start - 1:start] == b'\n' for start, _ in ranges[1:])
+        assert split_ranges(plain, len(logcat), 3) == split_ranges(compressed, len(logcat), 3)
+        
+        serial = LogRecords.build(plain, year=2026, workers=1)
+        old_minimum = log_records.PARALLEL_MIN_SIZE
+        log_records.PARALLEL_MIN_SIZE = 0
+        try:
+            for path in (plain, compressed):
+                parallel = LogRecords.build(path, year=2026, workers=3)
+                assert len(parallel) == 5001
+                assert parallel.tags == serial.tags and parallel.levels == serial.levels
+                assert parallel.columns == serial.columns
+                assert list(parallel.lines(path, [5000])) == [b'10-17 11:00:00.000  1  2 I Last: no trailing newline']
+        finally:
+            log_records.PARALLEL_MIN_SIZE = old_minimum
+    print("✓ Parallel log parsing tests passed")
+
+
+def test_package_inventory():
+    """Test the enriched Android package inventory from two bulk shell calls"""
+    print("\nTesting package inventory...")
+    import csv
+    from mobile_forensic_tool import CommandTracer
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        tool = MobileForensicTool(Platform.ANDROID, tracer=CommandTracer(), extraction_config={
+            'data_extraction': ['package_inventory']})
+        output_dir = os.path.join(tmp, 'out')
+        result = tool.extract_data('SERIAL1', output_dir)
+        assert result['errors'] == []
+        assert [item['name'] for item in result['extracted_items']] == [
+            'package_list.txt', 'dumpsys_package.txt',
+            'package_inventory.json', 'package_inventory.csv']
+        # Two device round-trips in total, however many packages there are
+        assert len(tool.tracer.spans) == 2
+        with open(os.path.join(output_dir, 'package_inventory.json')) as f:
+            inventory = {entry['package']: entry for entry in json.load(f)}
+        assert inventory['com.example.app'] == {
+            'package': 'com.example.app',
+            'path': '/data/app/~~x1/com.example.app-y1/base.apk',
+            'version_code': 42, 'version_name': '4.2.0', 'uid': 10123,
+            'installer': 'com.android.vending',
+            'first_install_time': '2026-01-02 03:04:05',
+            'last_update_time': '2026-10-01 12:00:00',
+            'target_sdk': 34, 'system': False}
+        # Packages only dumpsys knows about are still listed
+        settings = inventory['com.android.settings']
+        assert settings['system'] is True and settings['installer'] is None
+        assert settings['path'] == '/system/priv-app/Settings'
+        with open(os.path.join(output_dir, 'package_inventory.csv'), newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert [row['package'] for row in rows] == ['com.android.settings', 'com.example.app']
+        assert rows[1]['version_code'] == '42'
+    
+    # A pm that rejects the newer options is retried without them, silently
+    old_pm = "import sys\nif '--show-versioncode' in sys.argv:\n    sys.exit(255)\n" + FAKE_ADB
+    with fake_tools(adb=old_pm) as tmp:
+        tool = MobileForensicTool(Platform.ANDROID, extraction_config={
+            'data_extraction': ['package_inventory']})
+        result = tool.extract_data('SERIAL1', os.path.join(tmp, 'out'))
+        assert result['errors'] == []
+        assert len(result['extracted_items']) == 4
+        assert result['extracted_items'][0]['command'][-2:] == ['-f', '-i']
+    
+    # Older pm builds without versionCode/uid options
+    packages = MobileForensicTool._parse_package_list(
+        'package:/system/app/Foo/Foo.apk=com.foo  installer=null\npackage:com.bar\n')
+    assert packages == {'com.foo': {'package': 'com.foo', 'path': '/system/app/Foo/Foo.apk',
+                                    'installer': None},
+                        'com.bar': {'package': 'com.bar'}}
+    print("✓ Package inventory tests passed")
+
+
+def test_dumpsys_snapshot():
+    """Test the per-service dumpsys snapshot with bounded concurrency and timeouts"""
+    print("\nTesting dumpsys snapshot...")
+    import gzip
+    from mobile_forensic_tool import CommandTracer
+    with fake_tools(adb=FAKE_ADB) as tmp:
+        tool = MobileForensicTool(Platform.ANDROID, tracer=CommandTracer(), extraction_config={
+            'data_extraction': [{'step': 'dumpsys', 'max_streams': 2, 'timeout': 1.5}]})
+        output_dir = os.path.join(tmp, 'out')
+        result = tool.extract_data('SERIAL1', output_dir)
+        names = [item['name'] for item in result['extracted_items']]
+        assert names == ['dumpsys_services.txt', 'dumpsys-activity.txt.gz',
+                         'dumpsys-battery.txt.gz', 'dumpsys-meminfo.txt.gz',
+                         'dumpsys-android.hardware.power.IPower_default.txt.gz'], names
+        # The hung service times out alone; the others are kept
+        assert len(result['errors']) == 1 and 'dumpsys-hung.txt.gz' in result['errors'][0]
+        snapshot = result['extracted_items'][0]['snapshot']
+        assert snapshot['services'] == 5 and snapshot['captured'] == 4
+        assert snapshot['failed'] == ['hung']
+        # Four 0.4s dumps share one stream while the other waits out the hung service
+        assert snapshot['seconds'] < 2.5, snapshot
+        with gzip.open(os.path.join(output_dir, 'dumpsys-battery.txt.gz'), 'rt') as f:
+            assert f.readline() == 'DUMP OF SERVICE battery:\n'
+        
+        # Never more than max_streams dumps in flight
+        spans = [span for span in tool.tracer.spans if span['name'].startswith('dumpsys-')]
+        assert len(spans) == 5
+        for span in spans:
+            overlapping = [other for other in spans
+                           if other['start'] <= span['start'] < other['start'] + other['duration']]
+            assert len(overlapping) <= 2
+        
+        # A rerun reuses the listing and the captured dumps; the recorded state stays as captured
+        result = MobileForensicTool(Platform.ANDROID, extraction_config={
+            'data_extraction': [{'step': 'dumpsys', 'timeout': 1.5}]}).extract_data(
+                'SERIAL1', output_dir, incremental=True)
+        assert result['skipped_items'] == names
+        assert result['extracted_items'][0]['snapshot']['failed'] == ['hung']
+        with open(os.path.join(output_dir, '.extraction_state.json')) as f:
+            recorded = json.load(f)['items']['dumpsys_services.txt']['entry']
+        assert 'snapshot' not in recorded
+    print(f"✓ dumpsys snapshot tests passed ({snapshot['seconds']:.2f}s)")
+
+
+def _make_ios_backup(directory, files, extra_entries=0):
+    """Write a synthetic iOS backup: Manifest.db, Manifest.plist and content blobs
+    
+    ``files`` maps ``(domain, path)`` to content; ``extra_entries`` adds
+    manifest rows without content to make the database realistically large.
+    """
+    import plistlib
+    import sqlite3
+    from ios_backup import file_id
+    os.makedirs(directory)
+    with open(os.path.join(directory, 'Manifest.plist'), 'wb') as f:
+        plistlib.dump({'IsEncrypted': False, 'Version': '10.0'}, f)
+    db = sqlite3.connect(os.path.join(directory, 'Manifest.db'))
+    db.executescript('''
+        CREATE TABLE Files (fileID TEXT PRIMARY KEY, domain TEXT, relativePath TEXT,
+                            flags INTEGER, file BLOB);
+        CREATE INDEX FilesDomainIdx ON Files(domain);
+        CREATE INDEX FilesRelativePathIdx ON Files(relativePath);
+        CREATE TABLE Properties (key TEXT PRIMARY KEY, value BLOB);
+    ''')
+    rows = []
+    for (domain, path), content in files.items():
+        identifier = file_id(domain, path)
+        record = {'Size': len(content), 'LastModified': 1760000000, 'Mode': 0o100644,
+                  'UserID': 501, 'GroupID': 501, 'ProtectionClass': 3,
+                  'RelativePath': plistlib.UID(2), '$class': plistlib.UID(3)}
+        blob = plistlib.dumps({
+            '$version': 100000, '$archiver': 'NSKeyedArchiver', '$top': {'root': plistlib.UID(1)},
+            '$objects': ['$null', record, path,
+                         {'$classname': 'MBFile', '$classes': ['MBFile', 'NSObject']}]
+        }, fmt=plistlib.FMT_BINARY)
+        rows.append((identifier, domain, path, 1, blob))
+        os.makedirs(os.path.join(directory, identifier[:2]), exist_ok=True)
+        with open(os.path.join(directory, identifier[:2], identifier), 'wb') as f:
+            f.write(content)
+    for number in range(extra_entries):
+        domain = f'AppDomain-com.example.app{number % 100}'
+        path = f'Library/Caches/{number}.dat'
+        rows.append((file_id(domain, path), domain, path, 2 if number % 10 == 0 else 1, None))
+    db.executemany('INSERT INTO Files VALUES (?, ?, ?, ?, ?)', rows)
+    db.commit()
+    db.close()
+
+
+def test_ios_backup():
+    """Test indexed Manifest.db lookups and memory-mapped reads of an iOS backup"""
+    print("\nTesting iOS backup reader...")
+    import mmap
+    import plistlib
+    import time
+    from ios_backup import BackupError, BackupReader, file_id
+    with tempfile.TemporaryDirectory() as tmp:
+        backup_dir = os.path.join(tmp, 'backup')
+        sms = b'SQLite format 3\x00' + bytes(range(256)) * 64
+        _make_ios_backup(backup_dir, {
+            ('HomeDomain', 'Library/SMS/sms.db'): sms,
+            ('HomeDomain', 'Library/SMS/Attachments/a.jpg'): b'\xff\xd8jpeg',
+            ('HomeDomain', 'Library/Preferences/empty.plist'): b'',
+            ('AppDomain-com.example.app1', 'Documents/notes.txt'): b'notes',
+            ('AppDomain-com.example.app2', 'Documents/todo.txt'): b'todo'
+        }, extra_entries=100000)
+        manifest = os.path.join(backup_dir, 'Manifest.db')
+        manifest_mtime = os.stat(manifest).st_mtime_ns
+        before = sorted(os.listdir(backup_dir))
+        index = os.path.join(tmp, 'backup.idx')
+        
+        with BackupReader(backup_dir, index) as backup:
+            assert backup.rebuilt and backup.count() == 100005
+            entry = backup.get('HomeDomain', 'Library/SMS/sms.db')
+            assert entry == {'file_id': file_id('HomeDomain', 'Library/SMS/sms.db'),
+                             'domain': 'HomeDomain', 'path': 'Library/SMS/sms.db', 'type': 'file'}
+            assert backup.get('HomeDomain', 'Library/SMS/missing.db') is None
+            # Contents are served straight from the mapped blob
+            with backup.open(entry) as data:
+                assert isinstance(data.obj, mmap.mmap) and data[:16] == b'SQLite format 3\x00'
+                assert len(data) == len(sms)
+            assert backup.read(entry) == sms
+            assert backup.read(backup.get('HomeDomain', 'Library/Preferences/empty.plist')) == b''
+            assert backup.metadata(entry) == {'size': len(sms), 'mtime': 1760000000, 'uid': 501,
+                                              'gid': 501, 'protection_class': 3, 'mode': '0o644'}
+            
+            # Prefix listings use the (domain, path) index and are lazy
+            listing = backup.entries('HomeDomain', 'Library/SMS/')
+            assert next(listing)['path'] == 'Library/SMS/Attachments/a.jpg'
+            assert [e['path'] for e in listing] == ['Library/SMS/sms.db']
+            assert [(e['domain'], e['path']) for e in backup.entries(prefix='Documents/')] == [
+                ('AppDomain-com.example.app1', 'Documents/notes.txt'),
+                ('AppDomain-com.example.app2', 'Documents/todo.txt')]
+            assert sum(1 for _ in backup.entries('AppDomain-com.example.app1', kind='file')) == 1001
+            assert sum(1 for _ in backup.entries(kind='dir')) == 10000
+            assert {'domain': 'HomeDomain', 'entries': 3} in backup.domains()
+            plan = ' '.join(row[-1] for row in backup.db.execute(
+                'EXPLAIN QUERY PLAN SELECT file_id FROM main.files WHERE domain = ? AND path = ?',
+                ('HomeDomain', 'x')))
+            assert 'files_domain_path' in plan, plan
+            
+            start = time.perf_counter()
+            for number in range(0, 100000, 50):
+                assert backup.get(f'AppDomain-com.example.app{number % 100}',
+                                  f'Library/Caches/{number}.dat') is not None
+            lookups = time.perf_counter() - start
+            assert lookups < 1, lookups
+        
+        # The evidence directory is untouched and the kept index is reused
+        assert sorted(os.listdir(backup_dir)) == before
+        assert os.stat(manifest).st_mtime_ns == manifest_mtime
+        with BackupReader(backup_dir, index) as backup:
+            assert not backup.rebuilt and backup.count() == 100005
+        os.utime(manifest, ns=(manifest_mtime + 10 ** 9, manifest_mtime + 10 ** 9))
+        with BackupReader(backup_dir, index) as backup:
+            assert backup.rebuilt
+        
+        with open(os.path.join(backup_dir, 'Manifest.plist'), 'wb') as f:
+            plistlib.dump({'IsEncrypted': True}, f)
+        for path in (backup_dir, tmp):
+            try:
+                BackupReader(path)
+                assert False, 'expected BackupError'
+            except BackupError:
+                pass
+    print(f"✓ iOS backup reader tests passed (2000 lookups in {lookups * 1000:.1f}ms)")
+
+
 def run_all_tests():
     """Run all tests"""
     print("=" * 60)
@@ -122,6 +1785,31 @@ def run_all_tests():
         test_bypass_methods_structure()
         test_extraction_structure()
         test_json_serialization()
+        test_getprop_parsing()
+        test_extract_all_devices()
+        test_streaming_capture()
+        test_extraction_manifest()
+        test_async_extraction()
+        test_adb_server_transport()
+        test_watch_devices()
+        test_incremental_extraction()
+        test_block_compression()
+        test_benchmark_harness()
+        test_command_tracing()
+        test_metadata_cache()
+        test_rpc_server()
+        test_log_records()
+        test_case_index()
+        test_live_capture()
+        test_bulk_acquisition()
+        test_extraction_plan()
+        test_ndjson_output()
+        test_artifact_store()
+        test_timeline()
+        test_parallel_log_parsing()
+        test_package_inventory()
+        test_dumpsys_snapshot()
+        test_ios_backup()
         
         print("\n" + "=" * 60)
         print("All tests passed! ✓")
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Forensic timeline
+Turns the artifacts of one or more extraction directories (log lines,
+file modification times from bulk acquisitions, capture times) into
+events on one UTC clock and merges them into a single chronological
+NDJSON or CSV file, sorting externally so memory use stays bounded
+"""
+
+import csv
+import heapq
+import json
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from case_index import artifact_type, parse_properties
+from log_records import LOGCAT_LINE, MONTHS, SYSLOG_LINE, _month_starts, format_time, read_chunks
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9: log times stay on the device clock
+    ZoneInfo = None
+
+
+# Events sorted in memory before a run is spilled to disk
+MAX_EVENTS = 200000
+
+# Device properties naming the device's time zone (Android, iOS)
+TIMEZONE_PROPERTIES = ['persist.sys.timezone', 'TimeZone']
+
+# Device properties copied onto the device_info capture event
+DEVICE_PROPERTIES = ['ro.product.manufacturer', 'ro.product.model', 'ro.build.version.release',
+                     'DeviceName', 'ProductType', 'ProductVersion']
+
+CSV_FIELDS = ['time', 'device_id', 'source', 'type', 'level', 'tag', 'pid', 'text']
+
+INVENTORY_NAME = re.compile(r'^storage_\d+\.files\.ndjson(\.gz)?$')
+
+
+def _epoch_ms(iso: str) -> int:
+    return int(datetime.fromisoformat(iso).timestamp() * 1000)
+
+
+def find_extractions(roots: List[str]) -> Iterator[Tuple[str, Dict[str, any]]]:
+    """``(directory, manifest)`` for every extraction under ``roots``"""
+    for root in roots:
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories.sort()
+            if 'manifest.json' in files:
+                with open(os.path.join(directory, 'manifest.json')) as f:
+                    yield directory, json.load(f)
+
+
+def _device_properties(directory: str, items: List[Dict[str, any]]) -> Dict[str, str]:
+    for item in items:
+        if artifact_type(item['name']) == 'device_info.txt':
+            path = os.path.join(directory, item['name'])
+            if os.path.exists(path):
+                lines = (line for _, data in read_chunks(path)
+                         for line in data.decode('utf-8', 'replace').splitlines())
+                return dict(parse_properties(lines))
+    return {}
+
+
+def _to_utc(zone_name: Optional[str]) -> Optional[Callable[[int], int]]:
+    """Converter from device-local to UTC epoch milliseconds, or None if the zone is unknown"""
+    if ZoneInfo is None or not zone_name:
+        return None
+    try:
+        zone = ZoneInfo(zone_name)
+    except (KeyError, ValueError, OSError):
+        return None
+    offsets = {}
+
+    def convert(local_ms: int) -> int:
+        # The offset only changes on the hour, so one lookup per hour of log
+        hour = local_ms // 3600000
+        offset = offsets.get(hour)
+        if offset is None:
+            moment = (datetime(1970, 1, 1) + timedelta(hours=hour)).replace(tzinfo=zone)
+            offset = offsets[hour] = int(moment.utcoffset().total_seconds() * 1000)
+        return local_ms - offset
+    return convert
+
+
+def _log_events(path: str, name: str, device_id: str, kind: str, captured: Dict[str, any],
+                to_utc: Optional[Callable[[int], int]]) -> Iterator[Dict[str, any]]:
+    """One event per parsed log line
+
+    Lines carry no year: the capture's year is assumed, and a line that
+    would then lie after the capture belongs to the year before.
+    """
+    finished = _epoch_ms(captured['finished_at'])
+    year = int(captured['started_at'][:4])
+    months = {year: _month_starts(year), year - 1: _month_starts(year - 1)}
+    pattern = LOGCAT_LINE if kind == 'logcat' else SYSLOG_LINE
+    for _, data in read_chunks(path):
+        for match in pattern.finditer(data):
+            if kind == 'logcat':
+                month, day, hour, minute, second, millis, pid, tid, level, tag = match.groups()
+                month = int(month)
+                millis = int(millis)
+            else:
+                month, day, hour, minute, second, fraction, tag, pid, level = match.groups()
+                month = MONTHS.get(month, 1)
+                millis = int((fraction or b'0')[:3].ljust(3, b'0'))
+            offset = (((int(day) - 1) * 24 + int(hour)) * 60 + int(minute)) * 60000 \
+                + int(second) * 1000 + millis
+            timestamp = None
+            for candidate in (year, year - 1):
+                local = months[candidate][month] + offset
+                timestamp = to_utc(local) if to_utc else local
+                if timestamp <= finished + 86400000:
+                    break
+            start = match.start()
+            line = data[start:data.index(b'\n', start)]
+            yield {'ts': timestamp, 'device_id': device_id, 'source': name, 'type': 'log',
+                   'level': level.decode('ascii', 'replace'),
+                   'tag': tag.decode('utf-8', 'replace'), 'pid': int(pid),
+                   'text': line.decode('utf-8', 'replace')}
+
+
+def extraction_events(directory: str, manifest: Dict[str, any]) -> Iterator[Dict[str, any]]:
+    """Every event of one extraction, in artifact order (not sorted)
+
+    Log lines are placed on UTC using the device's time zone property
+    when the zone database is available; otherwise they keep the device
+    clock and carry ``"clock": "device"``.
+    """
+    device_id = manifest.get('device_id')
+    items = manifest.get('items', [])
+    properties = _device_properties(directory, items)
+    zone = next((properties[key] for key in TIMEZONE_PROPERTIES if properties.get(key)), None)
+    to_utc = _to_utc(zone)
+    for item in items:
+        name = item['name']
+        path = os.path.join(directory, name)
+        kind = artifact_type(name)
+        capture = {'ts': _epoch_ms(item['started_at']), 'device_id': device_id,
+                   'source': name, 'type': 'capture',
+                   'text': f"captured {name} ({item.get('size', 0)} bytes)",
+                   'sha256': item.get('digests', {}).get('sha256')}
+        if kind == 'device_info.txt':
+            capture['device'] = {key: properties[key]
+                                 for key in DEVICE_PROPERTIES if key in properties}
+            capture['timezone'] = zone
+        yield capture
+        if not os.path.exists(path):
+            continue
+        if kind in ('logcat.txt', 'syslog.txt'):
+            for event in _log_events(path, name, device_id, kind[:-4], item, to_utc):
+                if to_utc is None:
+                    event['clock'] = 'device'
+                yield event
+        elif INVENTORY_NAME.match(name):
+            # One member per line, so a large inventory is never held in memory
+            members = (json.loads(line) for _, data in read_chunks(path)
+                       for line in data.splitlines() if line.strip())
+            for member in members:
+                yield {'ts': member['mtime'] * 1000, 'device_id': device_id, 'source': name,
+                       'type': 'file', 'text': f"modified {member['path']}",
+                       'path': member['path'], 'file_type': member['type'],
+                       'size': member['size'], 'sha256': member.get('sha256')}
+
+
+class TimelineSorter:
+    """External merge sort of timeline events by time
+
+    ``add`` collects events from any number of unsorted sources. Up to
+    ``max_events`` are held in memory; beyond that they are sorted and
+    spilled to run files in ``temp_dir``. A sorted batch that starts no
+    earlier than an existing run ends is appended to that run, so inputs
+    that are already in order (most logs) become one run each. ``merged``
+    then streams all runs through a k-way merge. Events with the same time
+    keep the order they were added in.
+    """
+
+    def __init__(self, max_events: int = MAX_EVENTS, temp_dir: Optional[str] = None):
+        self.max_events = max_events
+        self.count = 0
+        self._buffer = []
+        self._temp = tempfile.TemporaryDirectory(dir=temp_dir, prefix='timeline-')
+        self._runs = []          # [path, last key]
+
+    def __enter__(self) -> 'TimelineSorter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Delete the run files"""
+        self._temp.cleanup()
+
+    @property
+    def run_count(self) -> int:
+        return len(self._runs)
+
+    def add(self, events: Iterable[Dict[str, any]]) -> None:
+        """Queue events (dicts with an integer ``ts`` in epoch milliseconds)"""
+        for event in events:
+            self._buffer.append((event['ts'], self.count, json.dumps(event, separators=(',', ':'))))
+            self.count += 1
+            if len(self._buffer) >= self.max_events:
+                self._spill()
+
+    def _spill(self) -> None:
+        self._buffer.sort()
+        first = self._buffer[0][:2]
+        # Extend the run ending closest before this batch, if there is one
+        candidates = [run for run in self._runs if run[1] <= first]
+        if candidates:
+            run = max(candidates, key=lambda run: run[1])
+        else:
+            run = [os.path.join(self._temp.name, f'run{len(self._runs):05d}'), None]
+            self._runs.append(run)
+        with open(run[0], 'a', encoding='utf-8') as f:
+            for timestamp, sequence, text in self._buffer:
+                f.write(f'{timestamp}\t{sequence}\t{text}\n')
+        run[1] = self._buffer[-1][:2]
+        self._buffer = []
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[Tuple[int, int, str]]:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                timestamp, sequence, text = line.rstrip('\n').split('\t', 2)
+                yield int(timestamp), int(sequence), text
+
+    def merged(self) -> Iterator[str]:
+        """Every event as compact JSON, in time order"""
+        self._buffer.sort()
+        sources = [self._read_run(path) for path, _ in self._runs] + [iter(self._buffer)]
+        for _, _, text in heapq.merge(*sources):
+            yield text
+
+
+def _csv_row(event: Dict[str, any]) -> List[any]:
+    return [event.get(field, '') for field in CSV_FIELDS]
+
+
+def build_timeline(roots: List[str], output: str, output_format: Optional[str] = None,
+                   max_events: int = MAX_EVENTS) -> Dict[str, any]:
+    """Merge the events of every extraction under ``roots`` into ``output``
+
+    ``output_format`` is ``ndjson`` or ``csv`` (default: from the file
+    extension). Each event has ``time`` (UTC, ISO 8601), ``ts`` (epoch
+    milliseconds), ``device_id``, ``source`` artifact, ``type`` (``log``,
+    ``file`` or ``capture``) and ``text``. Returns counts of extractions,
+    events and spilled runs.
+    """
+    output_format = output_format or ('csv' if output.endswith('.csv') else 'ndjson')
+    extractions = 0
+    partial = output + '.part'
+    with TimelineSorter(max_events, os.path.dirname(os.path.abspath(output))) as sorter:
+        for directory, manifest in find_extractions(roots):
+            extractions += 1
+            sorter.add(extraction_events(directory, manifest))
+        with open(partial, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f) if output_format == 'csv' else None
+            if writer is not None:
+                writer.writerow(CSV_FIELDS)
+            for text in sorter.merged():
+                event = json.loads(text)
+                time = format_time(event['ts']).replace(' ', 'T')
+                event = dict(time=time if event.get('clock') == 'device' else time + 'Z', **event)
+                if writer is not None:
+                    writer.writerow(_csv_row(event))
+                else:
+                    f.write(json.dumps(event, separators=(',', ':')) + '\n')
+        os.replace(partial, output)
+        return {'output': output, 'format': output_format, 'extractions': extractions,
+                'events': sorter.count, 'runs': sorter.run_count}